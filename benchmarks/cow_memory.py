@@ -0,0 +1,82 @@
+"""
+Peak memory of the data flow of a DEPlot session, with whole-frame copies (as DEPlot used to do)
+and with the copy-on-write views and row positions of the engine.
+
+Usage: python benchmarks/cow_memory.py --rows 1000000 --models 10
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import enable_copy_on_write, filter_rows, take, split_by_label, quantile_labels, memory_footprint, format_bytes
+
+def make_data(rows, models, sensors, seed=0):
+    """Build a synthetic result dataframe with sensors, a target and the predictions and errors of the models."""
+    rng = np.random.default_rng(seed)
+    data = {f'sensor{i}': rng.normal(size=rows) for i in range(sensors)}
+    data['engine'] = np.repeat(np.arange(rows // 200 + 1), 200)[:rows]
+    target = rng.uniform(0, 200, size=rows)
+    data['RUL'] = target
+    for m in range(models):
+        error = rng.normal(scale=10 + m, size=rows)
+        data[f'RUL_model{m}'] = target + error
+        data[f'error_model{m}'] = error
+    return pd.DataFrame(data)
+
+def copying_session(data, models, quantiles):
+    """Replay the session with the whole-frame copies of the former data flow."""
+    filtered = data.copy()
+    filtered = filtered[filtered['sensor0'] >= -1]
+    quantile_data = data.copy()
+    quantile_data['quantile'] = quantile_labels(quantile_data, 'RUL', None, quantiles)
+    boxes = [quantile_data[quantile_data['quantile'] == i][f'error_{models[0]}'].to_numpy() for i in range(1, quantiles + 1)]
+    timesteps_data = filtered.copy()
+    timesteps_data['quantile'] = quantile_labels(timesteps_data, 'RUL', None, quantiles)
+    bucket = timesteps_data[timesteps_data['quantile'] == 1].reset_index(drop=True).copy()
+    metrics_data = data.copy()
+    return boxes, bucket, metrics_data
+
+def view_session(data, models, quantiles):
+    """Replay the session with copy-on-write views and row positions."""
+    rows = filter_rows(data, {'sensor0': {'min': -1, 'max': None}}, {}, {})
+    columns = ['RUL', f'error_{models[0]}', f'error_{models[1]}']
+    quantile_data = take(data, columns)
+    labels = quantile_labels(quantile_data, 'RUL', None, quantiles)
+    boxes = split_by_label(quantile_data[f'error_{models[0]}'].to_numpy(), labels, quantiles)
+    timesteps_data = take(data, columns, rows)
+    labels = quantile_labels(timesteps_data, 'RUL', None, quantiles)
+    bucket = timesteps_data[labels == 1].reset_index(drop=True)
+    metrics_data = data
+    return boxes, bucket, metrics_data
+
+def measure(session, data, models, quantiles):
+    """Return the peak of memory allocated during a session."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = session(data, models, quantiles)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--models', type=int, default=10)
+    parser.add_argument('--sensors', type=int, default=20)
+    parser.add_argument('--quantiles', type=int, default=100)
+    args = parser.parse_args()
+
+    enable_copy_on_write()
+    data = make_data(args.rows, args.models, args.sensors)
+    size = memory_footprint(data)
+    models = ['model0', 'model1']
+    print(f'Dataset: {args.rows} rows, {len(data.columns)} columns, {format_bytes(size)}')
+    for name, session in [('whole-frame copies', copying_session), ('copy-on-write views', view_session)]:
+        peak = measure(session, data, models, args.quantiles)
+        print(f'{name:>20}: peak {format_bytes(peak)} on top of the dataset, {(size + peak) / size:.2f}x the dataset size')
@@ -0,0 +1,191 @@
+"""
+Time the hot paths of DEPlot on synthetic result files, without any window: loading, quantile binning,
+boxplot statistics of the buckets, domain evolution distances and hulls, filtering, metrics of the model selection
+window and report. Every case runs on every combination of rows, models and individual column, and the results are
+saved as JSON so that two versions can be compared.
+
+Usage: python benchmarks/hot_paths.py --rows 1000 100000 1000000 --models 2 10 --output results.json
+       python benchmarks/hot_paths.py --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import CSVSource, ColumnStore, Ingestion, IndividualLayout, BucketIndex, box_stats, sketch_buckets, quantile_labels
+from engine import filter_rows, mahalanobis_distances, distance_percentiles, hull_edges, report_labels, base_scores, segment_sums, report_row
+from engine import enable_copy_on_write
+from synthetic import make_results, write_results, model_names
+
+def measure(function, repeat: int, setup=None) -> dict:
+    """Run a function repeat times and return the minimum and median durations in seconds. setup is run, untimed, before every run."""
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return {'min': min(durations), 'median': float(np.median(durations)), 'runs': durations}
+
+def loading_cases(rows: int, models: int, individuals: int, directory: str) -> dict:
+    """Cases reading a synthetic file written in directory: load profile of the CSV file, conversion into a column store
+    and reopening of the store."""
+    file_path = os.path.join(directory, f'results_{rows}_{models}_{individuals or 0}.csv')
+    write_results(file_path, rows, models, individuals)
+    individual_name = 'unit' if individuals else None
+    stores = os.path.join(directory, 'stores')
+
+    def load_csv():
+        source = CSVSource(file_path)
+        source.read(source.load_profile('RUL', individual_name))
+
+    def ingest_store():
+        ingestion = Ingestion(CSVSource(file_path), store_root=stores, individual_name=individual_name)
+        ingestion.start()
+        ingestion.join()
+        if ingestion.error is not None:
+            raise ingestion.error
+
+    def open_store():
+        store = ColumnStore.open(file_path, stores)
+        store.read(store.columns)
+
+    return {'load_csv': (load_csv, None), 'ingest_column_store': (ingest_store, None), 'open_column_store': (open_store, None)}
+
+def compute_cases(data: pd.DataFrame, models: list[str], individual_name: str, quantiles: int) -> dict:
+    """Cases computing the views on a dataframe already loaded, as the interface does for two compared models."""
+    errors = [data[f'error_{model}'].to_numpy() for model in models[:2]]
+    layout = IndividualLayout.from_frame(data, individual_name) if individual_name else None
+    keys = np.where(layout.position < 0, np.nan, layout.position) if layout else data['RUL'].to_numpy()
+    index = BucketIndex(keys, ranked=layout is None)
+    points = np.column_stack(errors)
+    _, distances = mahalanobis_distances(points)
+    domain_vars = [col for col in data.columns if not col.startswith('error_') and not col.startswith('RUL')]
+
+    def binning():
+        positions = layout.positions() if layout else None
+        quantile_labels(data, 'RUL', individual_name, quantiles, positions)
+
+    def bucket_index():
+        BucketIndex(keys, ranked=layout is None).labels(quantiles)
+
+    def boxplot_stats():
+        for m, model_errors in enumerate(errors):
+            [box_stats(values) for values in index.buckets(f'error_{m}', model_errors, quantiles)]
+
+    def vectorized_boxplot_stats():
+        for m, model_errors in enumerate(errors):
+            index.box_stats(f'error_{m}', model_errors, quantiles)
+
+    def domain_distances():
+        _, bucket_distances = mahalanobis_distances(points)
+        distance_percentiles(bucket_distances)
+
+    def filtering():
+        filter_rows(data, {'sensor0': {'min': -1.0, 'max': 1.5}}, {'condition': {'A', 'C', 'E'}}, {})
+
+    def selection_metrics():
+        scores = {model: np.sqrt(np.mean(data[f'error_{model}'].to_numpy(dtype=np.float64) ** 2)) for model in models}
+        for model in sorted(models, key=scores.get)[:12]:
+            distances = np.abs(data[f'error_{model}'].to_numpy())
+            np.searchsorted(np.sort(distances), distances, side='right') / len(distances) * 100
+
+    def report():
+        base = {model: base_scores(model_errors) for model, model_errors in zip(models[:2], errors)}
+        for var in domain_vars:
+            labels = report_labels(data[var], 10)
+            report_row(var, models[:2], base, tuple(segment_sums(labels, model_errors) for model_errors in errors))
+
+    return {
+        'quantile_labels': (binning, None),
+        'bucket_index': (bucket_index, None),
+        'bucket_boxplot_stats': (boxplot_stats, lambda: index._sorted.clear()),
+        'vectorized_boxplot_stats': (vectorized_boxplot_stats, None),
+        'sketch_buckets': (lambda: sketch_buckets(keys, errors, quantiles), None),
+        'mahalanobis_distances': (domain_distances, None),
+        'convex_hull': (lambda: hull_edges(points, distances, 80), None),
+        'filter_rows': (filtering, None),
+        'selection_metrics': (selection_metrics, None),
+        'report': (report, None),
+    }
+
+def run(args) -> dict:
+    results = []
+    for rows in args.rows:
+        for models in args.models:
+            if rows * models > args.max_cells:
+                print(f'Skipping {rows:,} rows x {models} models: more than {args.max_cells:,} error values')
+                continue
+            for individuals in ([None, max(1, rows // 200)] if args.individual == 'both' else [None] if args.individual == 'no' else [max(1, rows // 200)]):
+                config = {'rows': rows, 'models': models, 'individual': individuals is not None}
+                data = make_results(rows, models, individuals)
+                cases = compute_cases(data, model_names(models), 'unit' if individuals else None, args.quantiles)
+                with tempfile.TemporaryDirectory() as directory:
+                    if rows * (2 * models + 8) <= args.max_file_cells:
+                        cases.update(loading_cases(rows, models, individuals, directory))
+                    for name, (function, setup) in cases.items():
+                        if args.cases and name not in args.cases:
+                            continue
+                        timing = measure(function, args.repeat, setup)
+                        results.append({'case': name, **config, 'seconds': timing})
+                        print(f"{name:>24} {rows:>10,} rows {models:>4} models {'with' if individuals else 'without':>7} individual: {timing['median'] * 1000:10.2f} ms")
+                del data, cases
+    return {'meta': metadata(args), 'results': results}
+
+def metadata(args) -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {'date': datetime.now().isoformat(timespec='seconds'), 'commit': commit or None, 'python': platform.python_version(),
+            'numpy': np.__version__, 'pandas': pd.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'repeat': args.repeat, 'quantiles': args.quantiles}
+
+def compare(before_path: str, after_path: str, threshold: float) -> bool:
+    """Print the ratio of the median durations of the cases found in both files. Returns whether a case got slower than threshold."""
+    with open(before_path) as f:
+        before = {(r['case'], r['rows'], r['models'], r['individual']): r['seconds']['median'] for r in json.load(f)['results']}
+    with open(after_path) as f:
+        after = {(r['case'], r['rows'], r['models'], r['individual']): r['seconds']['median'] for r in json.load(f)['results']}
+    regression = False
+    for key in sorted(before.keys() & after.keys(), key=str):
+        ratio = after[key] / before[key] if before[key] > 0 else float('inf')
+        slower = ratio > threshold
+        regression |= slower
+        case, rows, models, individual = key
+        print(f"{case:>24} {rows:>10,} rows {models:>4} models {'with' if individual else 'without':>7} individual: "
+              f"{before[key] * 1000:10.2f} ms -> {after[key] * 1000:10.2f} ms  x{ratio:.2f}{'  SLOWER' if slower else ''}")
+    return regression
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--models', type=int, nargs='+', default=[2, 10])
+    parser.add_argument('--individual', choices=['both', 'yes', 'no'], default='both')
+    parser.add_argument('--quantiles', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cases', nargs='*', help='names of the cases to run, all by default')
+    parser.add_argument('--max-cells', type=int, default=500_000_000, help='skip the scales with more error values than this')
+    parser.add_argument('--max-file-cells', type=int, default=100_000_000, help='skip the loading cases for files with more values than this')
+    parser.add_argument('--output', default=None, help='JSON file of the results')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two JSON files of results instead of running')
+    parser.add_argument('--threshold', type=float, default=1.2, help='ratio of durations reported as a regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    enable_copy_on_write()
+    output = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=1)
@@ -0,0 +1,286 @@
+"""
+Replay a scripted DEPlot session several times and track its memory: open a file, select two models, change the
+number of quantiles, click boxes, filter, change the target and generate a report. After every step the resident
+memory (current and peak), the number of live matplotlib figures and the largest allocations since the previous step
+(tracemalloc) are recorded.
+
+The first round warms the caches up. The check fails, with exit code 1, when the resident memory grows by more than
+--budget MB between the end of the first round and the end of the last one, or when figures are left open.
+The interface is driven without user input, dialogs being answered by the script. On a machine without display,
+run it under a virtual display. With --engine, the same steps are replayed without any window through the engine
+(Analysis, filters, report generation) and matplotlib figures drawn with the Agg backend, so that the check runs headless
+and without the interface dependencies, in CI for instance.
+
+Usage: xvfb-run python benchmarks/memory_session.py --rows 200000 --models 10 --rounds 3 --output memory.json
+       python benchmarks/memory_session.py --engine --rows 200000 --models 10 --rounds 3 --output memory.json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from synthetic import write_results, model_names
+
+def current_rss() -> int:
+    """Resident memory of the process in bytes."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+def peak_rss() -> int:
+    """Peak resident memory of the process in bytes."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+
+class SessionRecorder:
+    """Record the memory after every step of the session."""
+    def __init__(self, top: int = 5, trace: bool = True):
+        self.top = top
+        self.trace = trace
+        self.steps = []
+        self._snapshot = None
+        if trace:
+            tracemalloc.start()
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def record(self, round_index: int, step: str, seconds: float):
+        gc.collect()
+        entry = {'round': round_index, 'step': step, 'seconds': seconds, 'rss': current_rss(), 'peak_rss': peak_rss(),
+                 'figures': len(plt.get_fignums())}
+        if self.trace:
+            snapshot = tracemalloc.take_snapshot()
+            entry['traced'] = tracemalloc.get_traced_memory()[0]
+            entry['top_allocations'] = [{'where': str(stat.traceback), 'size_diff': stat.size_diff, 'size': stat.size}
+                                        for stat in snapshot.compare_to(self._snapshot, 'lineno')[:self.top]]
+            self._snapshot = snapshot
+        self.steps.append(entry)
+        print(f"round {round_index} {step:>16}: {seconds:7.2f} s, RSS {entry['rss'] / 2**20:8.1f} MB "
+              f"(peak {entry['peak_rss'] / 2**20:8.1f} MB), {entry['figures']} figures")
+
+def pump(app, seconds: float = 0.0, until=None, timeout: float = 600.0):
+    """Process the events of the interface for some time, or until a condition holds."""
+    start = time.perf_counter()
+    while True:
+        app.update()
+        elapsed = time.perf_counter() - start
+        if until is not None:
+            if until():
+                return
+            if elapsed > timeout:
+                raise TimeoutError('The interface did not reach the expected state')
+        elif elapsed >= seconds:
+            return
+        time.sleep(0.01)
+
+def close_windows(app):
+    """Close the secondary windows as the user would, through their close button."""
+    import tkinter as tk
+    for window in list(app.winfo_children()):
+        if isinstance(window, tk.Toplevel) and window.winfo_exists():
+            command = window.protocol('WM_DELETE_WINDOW')
+            if command:
+                window.tk.call(command)
+            else:
+                window.destroy()
+    pump(app, 0.1)
+
+def replay(app, file_path: str, models: list[str], individual: bool, report_path: str):
+    """Steps of one session, as (name, function) pairs."""
+    q = 20
+
+    def open_file():
+        close_windows(app)
+        app.model_vars = None
+        app.show_dataframe_preview(file_path)
+        app.update_individual_name('unit' if individual else 'None')
+        app.update_target_name('RUL')
+        app.detect_models(regenerate=True)
+        pump(app, until=lambda: getattr(app, 'model_vars', None) is not None)
+
+    def select_models():
+        for model in models:
+            app.model_vars[model].set(True)
+        app.validate_model_selection()
+        pump(app, 0.1)
+
+    def change_quantiles():
+        for quantiles in (10, 50, 100, q):
+            app.quantile_slider.set(quantiles)
+            app.update_quantile_plot(None)
+            pump(app)
+
+    def click_boxes():
+        for box in (0, q // 2, q - 1):
+            app.select_quantile_box(q, box)
+            pump(app)
+
+    def filter_rows():
+        app.require_columns(['sensor0', 'condition'])
+        app.numerical_filters = {'sensor0': {'min': -1.0, 'max': 1.0}}
+        app.categorical_filters = {'condition': {'A', 'B', 'C'}}
+        app.apply_filters()
+        app.numerical_filters, app.categorical_filters = {}, {}
+        app.apply_filters()
+        pump(app)
+
+    def change_target():
+        app.target_name = 'sensor1'
+        app.require_columns([app.target_name])
+        app.refresh_visualizations()
+        pump(app)
+
+    def generate_report():
+        app.generate_report()
+        pump(app, until=lambda: app.report_generation is None)
+        close_windows(app)
+
+    return [('open', open_file), ('select_models', select_models), ('change_quantiles', change_quantiles),
+            ('click_boxes', click_boxes), ('filter', filter_rows), ('change_target', change_target), ('report', generate_report)]
+
+def replay_engine(file_path: str, models: list[str], individual: bool, report_path: str):
+    """Steps of one session replayed through the engine, drawing the plots of the interface on figures closed after use."""
+    from engine import Analysis, CSVSource, ReportGeneration, filter_rows, take
+    q = 20
+    session = {}
+
+    def draw_boxes(analysis, quantiles):
+        figure, ax = plt.subplots()
+        for position, model in enumerate(models):
+            ax.bxp(analysis.box_stats(model, quantiles), positions=np.arange(quantiles) * 3 + position, showfliers=False)
+        figure.canvas.draw()
+        plt.close(figure)
+
+    def open_file():
+        session['source'] = CSVSource(file_path)
+        session['analysis'] = Analysis.load(file_path, 'RUL', 'unit' if individual else None, name=file_path)
+
+    def select_models():
+        session['analysis'].metrics(models)
+        draw_boxes(session['analysis'], 10)
+
+    def change_quantiles():
+        for quantiles in (10, 50, 100, q):
+            draw_boxes(session['analysis'], quantiles)
+
+    def click_boxes():
+        analysis = session['analysis']
+        for box in (1, q // 2 + 1, q):
+            figure, ax = plt.subplots()
+            points = analysis.domain(models, q, box)['points']
+            ax.scatter(points[:, 0], points[:, 1], s=2)
+            for edge in analysis.hull(models, q, box, 80):
+                ax.plot(edge[:, 0], edge[:, 1])
+            figure.canvas.draw()
+            plt.close(figure)
+
+    def filter_data():
+        analysis = session['analysis']
+        data = analysis.data.join(session['source'].read(['sensor0', 'condition']))
+        rows = filter_rows(data, {'sensor0': {'min': -1.0, 'max': 1.0}}, {'condition': {'A', 'B', 'C'}}, {})
+        filtered = Analysis(take(data, list(analysis.data.columns), rows), analysis.target_name, analysis.individual_name)
+        draw_boxes(filtered, q)
+        draw_boxes(analysis, q)
+
+    def change_target():
+        draw_boxes(session['analysis'].for_target('sensor1', session['source'].read(['sensor1'])['sensor1'].to_numpy()), q)
+
+    def generate_report():
+        source = session['source']
+        variables = [col for col in source.columns if col.startswith('sensor') or col == 'condition']
+        generation = ReportGeneration(session['analysis'], variables, models, 10, report_path, read_columns=source.read)
+        generation.start()
+        generation.join()
+        if generation.error is not None:
+            raise generation.error
+
+    return [('open', open_file), ('select_models', select_models), ('change_quantiles', change_quantiles),
+            ('click_boxes', click_boxes), ('filter', filter_data), ('change_target', change_target), ('report', generate_report)]
+
+def script_dialogs(report_path: str):
+    """Answer the dialogs of the interface: the report is saved to report_path, information is ignored and errors stop the session."""
+    from tkinter import filedialog, messagebox
+
+    def error(title, message, **kwargs):
+        raise RuntimeError(f'{title}: {message}')
+    filedialog.asksaveasfilename = lambda **kwargs: report_path
+    messagebox.showinfo = lambda *args, **kwargs: 'ok'
+    messagebox.askyesno = lambda *args, **kwargs: False
+    messagebox.showwarning = lambda *args, **kwargs: 'ok'
+    messagebox.showerror = error
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--models', type=int, default=10)
+    parser.add_argument('--individuals', type=int, default=1000, help='number of individuals, 0 for no individual column')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--budget', type=float, default=50.0, help='allowed growth of the resident memory after the first round, in MB')
+    parser.add_argument('--top', type=int, default=5, help='number of allocations listed per step')
+    parser.add_argument('--no-tracemalloc', action='store_true', help='do not trace the allocations, which slows the session down')
+    parser.add_argument('--output', default=None, help='JSON file of the records')
+    parser.add_argument('--engine', action='store_true', help='replay the session through the engine, without the interface')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The recent files, catalogs and sessions of the interface are written in the temporary directory
+        os.environ['HOME'] = os.environ['APPDATA'] = directory
+        file_path = os.path.join(directory, 'results.csv')
+        write_results(file_path, args.rows, args.models, args.individuals or None)
+        report_path = os.path.join(directory, 'report.csv')
+        models = model_names(args.models)[:2]
+
+        os.chdir(ROOT)
+        if args.engine:
+            plt.switch_backend('Agg')
+            recorder = SessionRecorder(args.top, not args.no_tracemalloc)
+            recorder.record(0, 'start', 0.0)
+            steps = lambda: replay_engine(file_path, models, bool(args.individuals), report_path)
+        else:
+            script_dialogs(report_path)
+            from deplot import QuantileApp
+            recorder = SessionRecorder(args.top, not args.no_tracemalloc)
+            app = QuantileApp()
+            pump(app, 0.2)
+            recorder.record(0, 'start', 0.0)
+            steps = lambda: replay(app, file_path, models, bool(args.individuals), report_path)
+        for round_index in range(1, args.rounds + 1):
+            for step, function in steps():
+                start = time.perf_counter()
+                function()
+                recorder.record(round_index, step, time.perf_counter() - start)
+        if not args.engine:
+            close_windows(app)
+            app.destroy()
+
+    first = [step for step in recorder.steps if step['round'] == 1][-1]
+    last = recorder.steps[-1]
+    growth = (last['rss'] - first['rss']) / 2**20
+    figures_growth = last['figures'] - first['figures']
+    failed = args.rounds > 1 and (growth > args.budget or figures_growth > 0)
+    print(f'RSS growth after the first round: {growth:.1f} MB (budget {args.budget:.1f} MB), '
+          f'figures: {first["figures"]} -> {last["figures"]}, peak RSS {last["peak_rss"] / 2**20:.1f} MB')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'mode': 'engine' if args.engine else 'interface', 'rows': args.rows, 'models': args.models,
+                       'individuals': args.individuals, 'budget_mb': args.budget,
+                       'growth_mb': growth, 'failed': failed, 'steps': recorder.steps}, f, indent=1)
+    if failed:
+        print('FAILED: the memory grows from one round to the next')
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,69 @@
+"""
+Synthetic result files in the format read by DEPlot: domain variables, a target <target>, and for every model
+its predictions <target>_<model> and errors error_<model>, with or without a column grouping individuals.
+The same arguments always give the same file.
+
+Usage: python benchmarks/synthetic.py results.csv --rows 1000000 --models 10 --individuals 1000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+CONDITIONS = np.array(['A', 'B', 'C', 'D', 'E', 'F'])
+
+def model_names(models: int) -> list[str]:
+    width = len(str(models - 1))
+    return [f'model{m:0{width}d}' for m in range(models)]
+
+def make_results(rows: int, models: int, individuals: int = None, sensors: int = 5, target: str = 'RUL',
+                 start: int = 0, total_rows: int = None, seed: int = 0) -> pd.DataFrame:
+    """Build the rows start to start + rows of a synthetic result file of total_rows rows (rows by default).
+    With individuals, the rows are split into trajectories of equal length (the last one taking the remaining rows),
+    the target being the number of remaining time steps; otherwise the target follows a gamma distribution.
+    The errors of every model grow with the target and with the index of the model, with a bias of their own."""
+    total_rows = total_rows or start + rows
+    rng = np.random.default_rng([seed, start])
+    row = np.arange(start, start + rows)
+    data = {}
+    if individuals:
+        length = max(1, total_rows // individuals)
+        unit = np.minimum(row // length, individuals - 1)
+        cycle = row - unit * length
+        lengths = np.where(unit == individuals - 1, total_rows - (individuals - 1) * length, length)
+        data['unit'] = unit
+        data['cycle'] = cycle
+        values = (lengths - cycle - 1).astype(np.float64)
+    else:
+        values = rng.gamma(2.0, 50.0, size=rows)
+    scale = values / (values.mean() if rows else 1) + 0.5
+    for s in range(sensors):
+        data[f'sensor{s}'] = rng.normal(size=rows) + (s % 3) * scale
+    data['condition'] = CONDITIONS[rng.integers(len(CONDITIONS), size=rows)]
+    data[target] = values
+    model_rng = np.random.default_rng(seed)
+    biases = model_rng.normal(scale=2.0, size=models)
+    for m, name in enumerate(model_names(models)):
+        errors = (rng.normal(scale=5.0 + 10.0 * m / max(1, models - 1), size=rows) * scale + biases[m]).astype(np.float32)
+        data[f'{target}_{name}'] = values + errors
+        data[f'error_{name}'] = errors
+    return pd.DataFrame(data, index=pd.RangeIndex(start, start + rows))
+
+def write_results(file_path: str, rows: int, models: int, individuals: int = None, sensors: int = 5, target: str = 'RUL',
+                  chunksize: int = 1_000_000, seed: int = 0):
+    """Write a synthetic result file chunk by chunk, so that files larger than the memory can be written."""
+    for start in range(0, rows, chunksize):
+        chunk = make_results(min(chunksize, rows - start), models, individuals, sensors, target, start, rows, seed)
+        chunk.to_csv(file_path, mode='w' if start == 0 else 'a', header=start == 0, index=False, float_format='%.6g')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('file_path')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--models', type=int, default=2)
+    parser.add_argument('--individuals', type=int, default=None, help='number of individuals, no individual column by default')
+    parser.add_argument('--sensors', type=int, default=5)
+    parser.add_argument('--target', default='RUL')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_results(args.file_path, args.rows, args.models, args.individuals, args.sensors, args.target, seed=args.seed)
@@ -1,8 +1,9 @@
+import hashlib
 import json
 import os
 import pandas as pd
 import matplotlib.pyplot as plt
-from datetime import datetime
+from datetime import date, datetime
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.backend_bases import MouseEvent
 from matplotlib.cm import ScalarMappable
@@ -13,17 +14,24 @@ from tkinter import messagebox
 from tkinter.ttk import Treeview
 import customtkinter as ctk
 import numpy as np
-from scipy.spatial.distance import mahalanobis
 from widgets import CTkRangeSlider, IntSpinbox, NavToolbar
+from engine import quantile_labels, paired_tests, paired_tests_batch, pairwise_win_rates, overall_win_rates
+from engine import CSVSource, column_kind, memory_footprint, format_bytes
+from engine import enable_copy_on_write, filter_rows, take, split_by_label, append_rows, ColumnStore, ColumnStoreWriter, Catalog, Ingestion, FileWatcher
+from engine import IndividualLayout, sketch_buckets, boxplot_stats, join_rows, Session
+from engine import file_fingerprint, timings
+from engine import Analysis, ReportGeneration, ReportStore, Precomputation, Prefetcher, LRUCache, domain_view, api
 from tkcalendar import Calendar
 from tkinter import Menu
-from scipy.spatial import ConvexHull
 from sklearn.metrics import root_mean_squared_error, mean_absolute_error, mean_absolute_percentage_error
 from typing import Callable
+from itertools import combinations
 
 # Set the seaborn theme
 # sns.set_theme()
 
+enable_copy_on_write()
+
 class QuantileApp(ctk.CTk):
     """Main application class for the Quantile Evolution Plot."""
     def __init__(self):
@@ -40,7 +48,19 @@ class QuantileApp(ctk.CTk):
             self.recent_files_path = os.path.join(os.getenv('APPDATA'), 'DEPlot', 'recent_files.json')
         else:
             self.recent_files_path = os.path.join(os.path.expanduser('~'), '.DEPlot', 'recent_files.json')
+        self.stores_path = os.path.join(os.path.dirname(self.recent_files_path), 'stores')
+        self.catalogs_path = os.path.join(os.path.dirname(self.recent_files_path), 'catalogs')
+        self.sessions_path = os.path.join(os.path.dirname(self.recent_files_path), 'sessions')
+        self.reports_path = os.path.join(os.path.dirname(self.recent_files_path), 'reports')
         self.recent_files = []
+        self.use_column_store = False
+        self.analysis = None
+        self.approximate_quantiles = tk.BooleanVar(value=False)
+        self.watch_file = tk.BooleanVar(value=False)
+        self.watcher = None
+        self.joined_rows = None
+        self.report_generation = None
+        self.precomputation = None
 
         self.menubar = tk.Menu(self)
         file_menu = tk.Menu(self.menubar, tearoff=0)
@@ -48,17 +68,34 @@ class QuantileApp(ctk.CTk):
         self.menubar.add_cascade(label="File", menu=file_menu)
 
         file_menu.add_command(label="Open file", command=self.open_file)
+        file_menu.add_command(label="Join another result file", command=self.show_join_window)
+        file_menu.add_command(label="Save session", command=self.save_session)
 
         self.recent_files_menu = tk.Menu(file_menu, tearoff=0)
         file_menu.add_cascade(label='Recent files', menu=self.recent_files_menu)
         file_menu.add_command(label="Exit", command=self.quit)
 
+        self.show_timings = tk.BooleanVar(value=False)
+        self.timings_overlay = None
+        performance_menu = tk.Menu(self.menubar, tearoff=0)
+        performance_menu.add_checkbutton(label="Show timings overlay", variable=self.show_timings, command=self.toggle_timings_overlay)
+        performance_menu.add_command(label="Export timings (Chrome trace)", command=self.export_timings)
+        performance_menu.add_command(label="Clear timings", command=timings.clear)
+        performance_menu.add_command(label="Domain plot cache size", command=self.set_domain_cache_size)
+        self.menubar.add_cascade(label="Performance", menu=performance_menu)
+
         self.config(menu=self.menubar)
 
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.is_simulating = False
 
         self.bind("<Configure>", self.on_resize)
+        self.bind('<Left>', lambda event: self.step_quantile_box(-1, event))
+        self.bind('<Right>', lambda event: self.step_quantile_box(1, event))
+        # Domain evolution plots drawn, or computed ahead for the quantiles next to the selected one, by state of the view
+        self.domain_prefetcher = Prefetcher(LRUCache(max_entries=64, max_bytes=256 << 20))
+        self.domain_rows_key = None
+        self.filter_digest = (None, None)
 
         # if the recent files path does not exist, create it
         if not os.path.exists(os.path.dirname(self.recent_files_path)):
@@ -80,6 +117,56 @@ class QuantileApp(ctk.CTk):
         # quit_button = ctk.CTkButton(self.toolbar, text='Quitter', image=quit_icon, command=self.quit)
         # quit_button.pack(side=tk.LEFT, padx=2, pady=2)
 
+    def toggle_timings_overlay(self):
+        """Show or hide the durations of the last stages over the main window."""
+        if self.show_timings.get():
+            if self.timings_overlay is None:
+                self.timings_overlay = tk.Label(self, justify=tk.LEFT, anchor='ne', font=('Courier', 9), bg='#1e1e1e', fg='#e0e0e0')
+            self.timings_overlay.place(relx=1.0, rely=0.0, anchor='ne')
+            self.timings_overlay.lift()
+            self.update_timings_overlay()
+        elif self.timings_overlay is not None:
+            self.timings_overlay.place_forget()
+
+    def update_timings_overlay(self):
+        """Refresh the overlay with the last, mean and maximum durations of every stage, twice per second while it is shown."""
+        if not self.show_timings.get():
+            return
+        lines = [f"{'stage':<26}{'last':>9}{'mean':>9}{'max':>9}  n"]
+        for name, stats in timings.summary().items():
+            kind = 'R' if stats['category'] == 'render' else 'C'
+            lines.append(f"{kind} {name[:24]:<24}{stats['last']:>7.1f}ms{stats['mean']:>7.1f}ms{stats['max']:>7.1f}ms  {stats['count']}")
+        self.timings_overlay.configure(text='\n'.join(lines))
+        self.timings_overlay.lift()
+        self.after(500, self.update_timings_overlay)
+
+    def set_domain_cache_size(self):
+        """Set the memory used at most by the domain evolution plots kept to be drawn again."""
+        cache = self.domain_prefetcher.cache
+        dialog = ctk.CTkInputDialog(title='Domain plot cache size',
+                                    text=f'Memory of the domain evolution plots kept, in MB ({cache.nbytes / 2**20:.1f} MB used by {len(cache)} plots):')
+        value = dialog.get_input()
+        if not value:
+            return
+        try:
+            size = float(value)
+        except ValueError:
+            messagebox.showerror('Error', 'The size must be a number of MB.')
+            return
+        if size < 0:
+            messagebox.showerror('Error', 'The size must be a positive number of MB.')
+            return
+        cache.resize(max_bytes=int(size * 2**20))
+
+    def export_timings(self):
+        """Save the recorded stages as a Chrome trace."""
+        file_path = filedialog.asksaveasfilename(defaultextension='.json', filetypes=[('Chrome trace', '*.json')], initialfile='deplot_trace.json')
+        if file_path:
+            try:
+                timings.export_chrome_trace(file_path)
+            except OSError as e:
+                messagebox.showerror('Error', f'Unable to save the file:\n{e}')
+
     def show_recent_files(self):
         """Show the recent files menu."""
         self.recent_files_menu.post(self.toolbar.winfo_rootx(), self.toolbar.winfo_rooty() + self.toolbar.winfo_height())
@@ -88,6 +175,12 @@ class QuantileApp(ctk.CTk):
         """Handle the closing of the application."""
         if messagebox.askokcancel("Exit", "Are you sure you want to exit?"):
             self.is_simulating = False
+            self.stop_watch()
+            if hasattr(self, 'quantile_canvas') and self.joined_rows is None:
+                try:
+                    self.save_session(quiet=True)
+                except Exception:
+                    pass
             if hasattr(self, 'after_id') and self.after_id:
                 try:
                     self.after_cancel(self.after_id)
@@ -112,16 +205,20 @@ class QuantileApp(ctk.CTk):
         self.numerical_filters = {}
         self.categorical_filters = {}
         self.datetime_filters = {}
-        self.filtered_data = self.data.copy()
+        self.filter_rows = None
         self.last_plot_params = {'quantiles': 10, 'quantile_to_plot': 0, 'min': -1, 'max': -1}
         if hasattr(self, 'quantile_slider_frame'):
             self.quantile_canvas.get_tk_widget().destroy()
             self.timesteps_canvas.get_tk_widget().destroy()
+            # pyplot keeps every figure until it is closed, destroying the canvases is not enough
+            plt.close(self.quantile_fig)
+            plt.close(self.timesteps_fig)
             self.quantile_toolbar.destroy()
             self.timesteps_toolbar.destroy()
 
-            self.timesteps_slider.configure(from_=self.data[self.target_name].min(), to=self.data[self.target_name].max())
-            self.timesteps_slider_values = (self.data[self.target_name].min(), self.data[self.target_name].max())
+            target_min, target_max = self.get_min_max_values(self.target_name)
+            self.timesteps_slider.configure(from_=target_min, to=target_max)
+            self.timesteps_slider_values = (target_min, target_max)
             self.quantile_slider.configure(from_=1, to=100)
             self.quantile_slider_value = 10
             self.timesteps_slider_label.configure(text=f'{self.target_name} range')
@@ -131,12 +228,17 @@ class QuantileApp(ctk.CTk):
             variables_menu.add_command(label="Select variables", command=self.show_variables_selection_window)
             variables_menu.add_command(label="Change target variable", command=self.change_target_variable)
             variables_menu.add_command(label="Change models to compare", command=lambda: self.detect_models(regenerate=False))
+            variables_menu.add_command(label="Model comparison matrix", command=self.show_pairwise_matrix_window)
+            variables_menu.add_checkbutton(label="Watch file for new rows", variable=self.watch_file, command=self.toggle_watch)
+            variables_menu.add_checkbutton(label="Approximate quantiles (large files)", variable=self.approximate_quantiles, command=lambda: self.plot_quantile_evolution(int(self.quantile_slider.get())))
             self.menubar.add_cascade(label="View", menu=variables_menu)
 
             metrics_menu = tk.Menu(self.menubar, tearoff=0)
             metrics_menu.add_command(label="Show metrics", command=self.show_metrics_window)
             metrics_menu.add_command(label="Calculate quantile metrics", command=self.show_calculate_metrics_window)
             metrics_menu.add_command(label="Generate report", command=self.show_generate_report_window)
+            metrics_menu.add_command(label="Export quantile statistics", command=self.show_export_quantile_stats_window)
+            metrics_menu.add_command(label="Paired significance tests", command=self.show_significance_window)
             self.menubar.add_cascade(label="Metrics", menu=metrics_menu)
             
             self.left_frame = ctk.CTkFrame(self, fg_color='#434343')
@@ -204,30 +306,31 @@ class QuantileApp(ctk.CTk):
             self.timesteps_frame = ctk.CTkFrame(self.right_frame, corner_radius=0)
             self.timesteps_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
-            self.timesteps_slider_values = (tk.DoubleVar(value=float(self.data[self.target_name].min())), tk.DoubleVar(value=float(self.data[self.target_name].max())))
+            target_min, target_max = self.get_min_max_values(self.target_name)
+            self.timesteps_slider_values = (tk.DoubleVar(value=float(target_min)), tk.DoubleVar(value=float(target_max)))
             self.timesteps_slider_label = ctk.CTkLabel(self.timesteps_frame, text=f'{self.target_name} range', font=('Helvetica', 20))
             self.timesteps_slider_label.pack(side=tk.TOP, pady=5)
 
-            self.timesteps_slider = CTkRangeSlider(self.timesteps_frame, orientation='horizontal', from_=float(self.data[self.target_name].min()), to=float(self.data[self.target_name].max()), variables=self.timesteps_slider_values, command=self.update_timesteps_slider, width=600)
+            self.timesteps_slider = CTkRangeSlider(self.timesteps_frame, orientation='horizontal', from_=float(target_min), to=float(target_max), variables=self.timesteps_slider_values, command=self.update_timesteps_slider, width=600)
             self.timesteps_slider.bind("<ButtonRelease-1>", self.update_timesteps_plot)
             self.timesteps_slider.pack(side=tk.TOP, padx=10, pady=10)
             self.timesteps_slider.configure(state='disabled')
 
             self.timesteps_slider_left = ctk.CTkEntry(self.timesteps_frame, width=50)
             self.timesteps_slider_left.pack(side=tk.LEFT, padx=80, pady=10)
-            self.timesteps_slider_left.insert(0, str(self.data[self.target_name].min()))
+            self.timesteps_slider_left.insert(0, str(target_min))
             self.timesteps_slider_left.bind('<FocusOut>', self.update_timesteps_left_entry)
             self.timesteps_slider_left.bind('<Return>', self.update_timesteps_left_entry)
 
             self.timesteps_slider_right = ctk.CTkEntry(self.timesteps_frame, width=50)
             self.timesteps_slider_right.pack(side=tk.RIGHT, padx=80, pady=10)
-            self.timesteps_slider_right.insert(0, str(self.data[self.target_name].max()))
+            self.timesteps_slider_right.insert(0, str(target_max))
             self.timesteps_slider_right.bind('<FocusOut>', self.update_timesteps_right_entry)
             self.timesteps_slider_right.bind('<Return>', self.update_timesteps_right_entry)
 
         # Create figure and canvas for quantile evolution
         self.quantile_fig, self.quantile_ax = plt.subplots(figsize=(8, 8))
-        self.quantile_canvas = FigureCanvasTkAgg(self.quantile_fig, master=self.left_frame)
+        self.quantile_canvas = timings.instrument_canvas(FigureCanvasTkAgg(self.quantile_fig, master=self.left_frame), 'draw_quantiles')
         self.quantile_toolbar = NavToolbar(self.quantile_canvas, self.left_frame)
         self.quantile_canvas.draw()
         self.quantile_canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
@@ -240,7 +343,7 @@ class QuantileApp(ctk.CTk):
         
         # Create figure and canvas for timesteps
         self.timesteps_fig, self.timesteps_ax = plt.subplots(figsize=(9, 9))
-        self.timesteps_canvas = FigureCanvasTkAgg(self.timesteps_fig, master=self.right_frame)
+        self.timesteps_canvas = timings.instrument_canvas(FigureCanvasTkAgg(self.timesteps_fig, master=self.right_frame), 'draw_domain')
         self.timesteps_toolbar = NavToolbar(self.timesteps_canvas, self.right_frame)
         self.timesteps_canvas.draw()
         self.timesteps_canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
@@ -250,12 +353,15 @@ class QuantileApp(ctk.CTk):
             spine.set_edgecolor('white')
         self.timesteps_ax.tick_params(axis='x', colors='white')
         self.timesteps_ax.tick_params(axis='y', colors='white')
+        self.timesteps_canvas.mpl_connect('pick_event', self.on_pick_point)
 
         self.selected_box = None
 
         self.quantile_slider.configure(state='normal')
         self.timesteps_slider.configure(state='normal')
         self.update_idletasks()
+        # The other targets are prepared once the views are drawn
+        self.after_idle(self.start_precomputation)
 
     def update_convex_hull_percentage(self):
         """Update the convex hull percentage."""
@@ -289,6 +395,11 @@ class QuantileApp(ctk.CTk):
         index_check = ctk.CTkCheckBox(left_frame, text="Contains an index column", variable=index_var, command=lambda: update_preview(index_var.get()))
         index_check.pack(anchor='w')
 
+        store_var = ctk.BooleanVar(value=False)
+        store_check = ctk.CTkCheckBox(left_frame, text="Memory-mapped column store", variable=store_var, command=lambda: setattr(self, 'use_column_store', store_var.get()))
+        store_check.pack(anchor='w', pady=(5, 0))
+        self.use_column_store = False
+
         individual_label = ctk.CTkLabel(left_frame, text='Individual:')
         individual_label.pack(anchor='w')
         individual_combobox = ctk.CTkComboBox(left_frame, state='readonly', values=['None'], command=lambda event: self.update_individual_name(individual_combobox.get()))
@@ -316,6 +427,7 @@ class QuantileApp(ctk.CTk):
 
         tree.pack(fill=tk.BOTH, expand=True)
 
+        @timings.timed('update_preview')
         def update_preview(index=False, update_combobox=False):
             """Update the preview of the dataframe."""
             separator = separator_entry.get()
@@ -323,9 +435,8 @@ class QuantileApp(ctk.CTk):
                 self.sep = separator
                 self.has_index = index
                 try:
-                    self.df = pd.read_csv(file_path, sep=separator, index_col=None if not index else 0)
-                    if 'Unnamed: 0' in self.df.columns:
-                        self.df.rename(columns={'Unnamed: 0': 'index'}, inplace=True)
+                    self.source = CSVSource(file_path, sep=separator, has_index=index)
+                    self.df = self.source.read(self.source.columns, nrows=5)
                     tree['columns'] = list(self.df.columns)
                     tree['show'] = 'headings'
 
@@ -369,10 +480,14 @@ class QuantileApp(ctk.CTk):
             self.variables_selection_window.lift()
             return
         
-        variables = [col for col in self.data.columns if 'error' not in col and col != self.individual_name and self.target_name not in col]
-        categorical_vars = [col for col in variables if self.data[col].dtype == 'object' and 'date' not in col.lower()]
-        numerical_vars = [col for col in variables if self.data[col].dtype in ['int64', 'float64']]
-        datetime_vars = [col for col in variables if self.data[col].dtype == 'datetime64[ns]' or 'date' in col.lower()]
+        variables = [col for col in self.source.columns if 'error' not in col and col != self.individual_name and self.target_name not in col]
+        kinds = {col: self.catalog.kind(col) for col in variables}
+        if None in kinds.values():
+            sample = self.source.sample()
+            kinds = {col: kinds[col] or column_kind(sample[col], col) for col in variables}
+        categorical_vars = [col for col in variables if kinds[col] == 'categorical']
+        numerical_vars = [col for col in variables if kinds[col] == 'numerical']
+        datetime_vars = [col for col in variables if kinds[col] == 'datetime']
 
         if not categorical_vars and not numerical_vars and not datetime_vars:
             messagebox.showerror('Error', 'No variables to select.')
@@ -382,11 +497,6 @@ class QuantileApp(ctk.CTk):
         self.variables_selection_window.title(f'Select the variables to filter')
         self.variables_selection_window.geometry('800x600')
 
-        variables = [col for col in self.data.columns if 'error' not in col and col != self.individual_name and self.target_name not in col]
-        categorical_vars = [col for col in variables if self.data[col].dtype == 'object' and 'date' not in col.lower()]
-        numerical_vars = [col for col in variables if self.data[col].dtype in ['int64', 'float64']]
-        datetime_vars = [col for col in variables if self.data[col].dtype == 'datetime64[ns]' or 'date' in col.lower()]
-
         left_frame = ctk.CTkFrame(self.variables_selection_window)
         left_frame.pack(side=tk.LEFT, fill=tk.Y, padx=10, pady=10)
 
@@ -403,6 +513,9 @@ class QuantileApp(ctk.CTk):
         self.summary_tree.heading('Variable', text='Variable')
         self.summary_tree.heading('Filter', text='Filter')
         self.summary_tree.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        if self.numerical_filters or self.categorical_filters or self.datetime_filters:
+            # Filters restored with a session are listed once the window is drawn
+            self.variables_selection_window.after(100, self.update_summary)
 
         self.categorical_frame = ctk.CTkFrame(left_frame)
         self.categorical_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
@@ -556,6 +669,10 @@ class QuantileApp(ctk.CTk):
 
     def get_min_max_dates(self, var):
         """ Get the minimum and maximum dates for a datetime variable. """
+        summary = self.catalog.min_max_dates(var)
+        if summary is not None:
+            return summary
+        self.require_columns([var])
         var_date = pd.to_datetime(self.data[var])
         min_date = var_date.min()
         max_date = var_date.max()
@@ -633,12 +750,20 @@ class QuantileApp(ctk.CTk):
 
     def get_min_max_values(self, var):
         """ Get the minimum and maximum values for a numerical variable. """
+        summary = self.catalog.min_max(var)
+        if summary is not None:
+            return summary
+        self.require_columns([var])
         min_val = self.data[var].min()
         max_val = self.data[var].max()
         return min_val, max_val
 
     def get_categories(self, var):
         """ Get the categories for a categorical variable. """
+        categories = self.catalog.categories(var)
+        if categories is not None:
+            return categories
+        self.require_columns([var])
         return self.data[var].unique()
 
     def update_categorical_filter(self, var, category, selected):
@@ -653,23 +778,9 @@ class QuantileApp(ctk.CTk):
         self.update_summary(var)
 
     def apply_filters(self):
-        """ Apply the filters to the data. """
-        self.filtered_data = self.data.copy()
-        for var, bounds in self.numerical_filters.items():
-            if bounds['min'] is not None:
-                self.filtered_data = self.filtered_data[self.filtered_data[var] >= bounds['min']]
-            if bounds['max'] is not None:
-                self.filtered_data = self.filtered_data[self.filtered_data[var] <= bounds['max']]
-        for var, categories in self.categorical_filters.items():
-            if categories:
-                self.filtered_data = self.filtered_data[self.filtered_data[var].isin(categories)]
-        for var, dates in self.datetime_filters.items():
-            if dates['start'] is not None:
-                start_date = pd.to_datetime(dates['start'])
-                self.filtered_data = self.filtered_data[pd.to_datetime(self.filtered_data[var]) >= start_date]
-            if dates['end'] is not None:
-                end_date = pd.to_datetime(dates['end'])
-                self.filtered_data = self.filtered_data[pd.to_datetime(self.filtered_data[var]) <= end_date]
+        """ Apply the filters to the data. Only the positions of the kept rows are stored. """
+        with timings.stage('apply_filters'):
+            self.filter_rows = filter_rows(self.data, self.numerical_filters, self.categorical_filters, self.datetime_filters)
         self.update_display()
 
     def create_remove_button(self, item, var, filter_desc):
@@ -781,8 +892,9 @@ class QuantileApp(ctk.CTk):
     def detect_models(self, regenerate=False):
         """ Detect the models in the dataframe. """
         if regenerate:
-            self.data = self.df.copy()
             self.dataframe_preview.destroy()
+            self.load_data(on_done=self.detect_models)
+            return
         self.all_models = [col.split('error_')[1] for col in self.data.columns if 'error_' in col]
         if self.target_name is None:
             messagebox.showerror('Error', 'Please select a target column.')
@@ -795,12 +907,284 @@ class QuantileApp(ctk.CTk):
         self.generate_selection_figures()
         self.show_model_selection_window()
 
+    def load_data(self, on_done: Callable, session: Session = None):
+        """Load the file in chunks on a background thread, showing the progress, then call on_done.
+        Large files can be converted into a memory-mapped column store, which is directly opened the next times.
+        The columns saved with a session of the unchanged file are used as they are, without parsing it."""
+        self.stop_watch()
+        self.stop_precomputation()
+        self.domain_prefetcher.clear()
+        self.joined_rows = None
+        self.pairwise_cache = {}
+        self.analysis = None
+        self.bucket_medians = (None,)
+        self.sketch_cache = {}
+        if session is not None and not self.use_column_store:
+            with timings.stage('open_session_data'):
+                data = session.frame()
+            needed = [self.target_name, *(f'error_{model}' for model in self.models)] + ([self.individual_name] if self.individual_name else [])
+            if data is not None and all(col in data.columns for col in needed):
+                self.data = data
+                self.source = CSVSource(self.file_path, sep=self.sep, has_index=self.has_index)
+                self.data_offset = session.source['size']
+                self.catalog = Catalog.from_dict(session.state['catalog'])
+                on_done()
+                return
+        if self.use_column_store:
+            with timings.stage('open_column_store'):
+                store = ColumnStore.open(self.file_path, self.stores_path, sep=self.sep, has_index=self.has_index)
+                if store is not None:
+                    self.data = store.read(store.columns)
+            if store is not None:
+                self.source = store
+                self.data_offset = store.meta['source']['size']
+                self.catalog = store.catalog or Catalog.from_frame(self.data, self.individual_name)
+                on_done()
+                return
+
+        try:
+            source = CSVSource(self.file_path, sep=self.sep, has_index=self.has_index)
+        except Exception as e:
+            messagebox.showerror('Error', f'Failed to read CSV file: {e}')
+            return
+        individual_name = self.individual_name if self.individual_name in source.columns else None
+        columns = None if self.use_column_store else source.load_profile(self.target_name, individual_name)
+        catalog = None if self.use_column_store else Catalog.open(self.file_path, self.catalogs_path, individual_name)
+        ingestion = Ingestion(source, columns, store_root=self.stores_path if self.use_column_store else None, individual_name=individual_name, catalog=catalog)
+
+        progress_window = ctk.CTkToplevel(self)
+        progress_window.title(f'Loading {os.path.basename(self.file_path)}')
+        progress_window.geometry('450x150')
+        progress_label = ctk.CTkLabel(progress_window, text='Starting...')
+        progress_label.pack(pady=10)
+        progress_bar = ctk.CTkProgressBar(progress_window, width=400)
+        progress_bar.set(0)
+        progress_bar.pack(pady=5)
+
+        def cancel():
+            ingestion.cancel()
+            progress_label.configure(text='Cancelling...')
+
+        ctk.CTkButton(progress_window, text='Cancel', command=cancel).pack(pady=10)
+        progress_window.protocol("WM_DELETE_WINDOW", cancel)
+
+        def poll():
+            if ingestion.is_alive():
+                if not ingestion.cancelled:
+                    progress_bar.set(ingestion.bytes_read / max(1, ingestion.total_bytes))
+                    progress_label.configure(text=f'{format_bytes(ingestion.bytes_read)} of {format_bytes(ingestion.total_bytes)} read, {ingestion.rows:,} rows')
+                progress_window.after(100, poll)
+                return
+            progress_window.destroy()
+            if ingestion.error is not None:
+                messagebox.showerror('Error', f'Failed to read CSV file: {ingestion.error}')
+                return
+            if ingestion.cancelled:
+                return
+            if isinstance(ingestion.result, ColumnStore):
+                self.source = ingestion.result
+                self.data = self.source.read(self.source.columns)
+            else:
+                self.source = source
+                self.data = ingestion.result
+            self.catalog = ingestion.catalog
+            self.data_offset = ingestion.end_offset
+            if ingestion.summarize:
+                self.catalog.save(self.file_path, self.catalogs_path)
+            on_done()
+
+        ingestion.start()
+        progress_window.after(100, poll)
+        progress_window.after(100, progress_window.lift)
+
+    def toggle_watch(self):
+        """Start or stop following the rows appended to the file."""
+        if self.watch_file.get() and self.joined_rows is not None:
+            self.watch_file.set(False)
+            messagebox.showerror('Error', 'Files joined with another result file cannot be watched.')
+            return
+        if self.watch_file.get():
+            if self.watcher is not None:
+                self.watcher.stop()
+            source = CSVSource(self.file_path, sep=self.sep, has_index=self.has_index)
+            self.watcher = FileWatcher(source, self.data_offset)
+            self.watcher.start()
+            self.after(500, self.poll_watch)
+        else:
+            self.stop_watch()
+
+    def stop_watch(self):
+        """Stop following the file, if it is followed."""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        self.watch_file.set(False)
+
+    def poll_watch(self):
+        """Apply the rows read by the watcher since the last poll and refresh the views, at most once per poll."""
+        watcher = self.watcher
+        if watcher is None:
+            return
+        chunks = watcher.pending()
+        if chunks:
+            self.append_watched_rows(chunks)
+        if watcher.error is not None:
+            self.stop_watch()
+            messagebox.showerror('Error', f'Stopped watching the file: {watcher.error}')
+            return
+        self.after(500, self.poll_watch)
+
+    def append_watched_rows(self, chunks: list):
+        """Add rows appended to the file to the data, the column store, the catalog and the quantile structures."""
+        chunk = pd.concat([rows for rows, _, _ in chunks])
+        # The targets prepared for the previous rows are of no use anymore
+        self.stop_precomputation()
+        self.data_offset, fingerprint = chunks[-1][1], chunks[-1][2]
+        self.catalog.update(chunk)
+        if isinstance(self.source, ColumnStore):
+            writer = ColumnStoreWriter.resume(self.source, fingerprint)
+            writer.append(chunk)
+            self.source = writer.close(self.catalog)
+            self.data = self.source.read(self.source.columns)
+        else:
+            self.data = append_rows(self.data, chunk)
+            self.catalog.save(self.file_path, self.catalogs_path)
+
+        if self.analysis is not None:
+            self.analysis.extend(self.data)
+        self.pairwise_cache = {}
+        self.sketch_cache = {}
+        self.bucket_medians = (None,)
+        if self.filter_rows is not None:
+            self.filter_rows = filter_rows(self.data, self.numerical_filters, self.categorical_filters, self.datetime_filters)
+        self.calculate_max_timesteps()
+
+        self.plot_quantile_evolution(int(self.quantile_slider.get()), width=1)
+        if self.timesteps_axes is not None:
+            self.clear_last_plot()
+            self.timesteps_axes = self.plot_timesteps(**self.last_plot_params)
+
+    def read_columns(self, columns: list[str]) -> pd.DataFrame:
+        """Read columns of the file for the rows of the data, without adding them to the data."""
+        if self.joined_rows is None:
+            # Rows appended to the file since the data was read are left to the watch
+            loaded = self.source.read(columns, nrows=len(self.data))
+        else:
+            loaded = self.source.read(columns).iloc[self.joined_rows]
+        return loaded.set_axis(self.data.index)
+
+    def require_columns(self, columns: list[str]):
+        """Load the columns of the file that were left out of the load profile."""
+        missing = [col for col in columns if col not in self.data.columns and col in self.source.columns]
+        if missing:
+            loaded = self.read_columns(missing)
+            self.data = pd.concat([self.data, loaded], axis=1)
+            unknown = [col for col in missing if col not in self.catalog]
+            if unknown:
+                self.catalog.add_columns(loaded[unknown])
+
+    def get_prediction_target_name(self, model: str) -> str:
+        """Get the name of the column holding the real values predicted by a model."""
+        columns = list(self.source.columns) + [col for col in self.data.columns if col not in self.source.columns]
+        return [col for col in columns if model in col and col != f"error_{model}"][0].split(f'_{model}')[0]
+
+    def show_join_window(self):
+        """Select another result file whose models are joined to the loaded data, to compare runs of the same models."""
+        if not hasattr(self, 'data') or not hasattr(self, 'all_models'):
+            messagebox.showerror('Error', 'Open a result file first.')
+            return
+        file_path = filedialog.askopenfilename(filetypes=[('CSV files', '*.csv')])
+        if not file_path:
+            return
+
+        join_window = ctk.CTkToplevel(self)
+        join_window.title(f'Join {os.path.basename(file_path)}')
+        join_window.geometry('400x330')
+
+        ctk.CTkLabel(join_window, text='Label of the models of this file:').pack(pady=(10, 0))
+        label_entry = ctk.CTkEntry(join_window)
+        label_entry.insert(0, os.path.splitext(os.path.basename(file_path))[0])
+        label_entry.pack()
+        ctk.CTkLabel(join_window, text='Separator:').pack(pady=(10, 0))
+        separator_entry = ctk.CTkEntry(join_window, width=50)
+        separator_entry.insert(0, self.sep)
+        separator_entry.pack()
+        index_var = ctk.BooleanVar(value=self.has_index)
+        ctk.CTkCheckBox(join_window, text='Contains an index column', variable=index_var).pack(pady=(10, 0))
+
+        keys = {'Index': 'index'}
+        if self.individual_name is not None:
+            keys[f'{self.individual_name} and time step'] = 'timestep'
+        ctk.CTkLabel(join_window, text='Match rows on:').pack(pady=(10, 0))
+        on_var = ctk.StringVar(value=list(keys)[-1])
+        ctk.CTkComboBox(join_window, values=list(keys), variable=on_var, state='readonly').pack()
+        methods = {'Hash join': 'hash', 'Sort-merge join': 'merge'}
+        method_var = ctk.StringVar(value='Hash join')
+        ctk.CTkComboBox(join_window, values=list(methods), variable=method_var, state='readonly').pack(pady=5)
+
+        def confirm():
+            arguments = (file_path, label_entry.get().strip() or 'joined', separator_entry.get(), index_var.get(), keys[on_var.get()], methods[method_var.get()])
+            join_window.destroy()
+            self.join_file(*arguments)
+
+        ctk.CTkButton(join_window, text='Confirm', command=confirm).pack(pady=10)
+
+    def join_file(self, file_path: str, label: str, sep: str = ',', has_index: bool = False, on: str = 'index', method: str = 'hash'):
+        """Add the error and prediction columns of the models of another result file to the data, as models named model@label.
+        Rows are matched on the index, or on the individual and the time step, and only the matched rows are kept.
+        The other file is read from its column store when the column store is used, and only the needed columns are read."""
+        try:
+            source = None
+            if self.use_column_store:
+                source = ColumnStore.open(file_path, self.stores_path, sep=sep, has_index=has_index)
+            if source is None:
+                source = CSVSource(file_path, sep=sep, has_index=has_index)
+            models = [col.split('error_')[1] for col in source.columns if col.startswith('error_')]
+            predictions = [f'{self.target_name}_{model}' for model in models if f'{self.target_name}_{model}' in source.columns]
+            key_columns = [self.individual_name] if on == 'timestep' else []
+            other = source.read(key_columns + [f'error_{model}' for model in models] + predictions)
+            if on == 'timestep':
+                positions = self.get_positions()
+                other_positions = IndividualLayout.from_frame(other, self.individual_name).position
+                left_keys = [self.data[self.individual_name].to_numpy(), np.where(positions < 0, np.nan, positions)]
+                right_keys = [other[self.individual_name].to_numpy(), np.where(other_positions < 0, np.nan, other_positions)]
+            else:
+                left_keys, right_keys = [self.data.index.to_numpy()], [other.index.to_numpy()]
+            left_rows, right_rows = join_rows(left_keys, right_keys, method)
+        except Exception as e:
+            messagebox.showerror('Error', f'Failed to join {os.path.basename(file_path)}: {e}')
+            return
+        if len(left_rows) == 0:
+            messagebox.showerror('Error', f'No row of {os.path.basename(file_path)} matches the loaded data.')
+            return
+
+        self.stop_watch()
+        dropped = len(left_rows) < len(self.data)
+        if dropped:
+            self.data = take(self.data, list(self.data.columns), left_rows)
+            self.joined_rows = left_rows if self.joined_rows is None else self.joined_rows[left_rows]
+        joined = {}
+        for col in [f'error_{model}' for model in models] + predictions:
+            joined[f'{col}@{label}'] = other[col].to_numpy()[right_rows]
+        self.data = self.data.assign(**joined)
+        if dropped:
+            # The statistics of the columns already known were computed on rows that are no longer loaded
+            self.catalog = Catalog.from_frame(self.data, self.individual_name)
+        else:
+            self.catalog.add_columns(pd.DataFrame(joined))
+        self.stop_precomputation()
+        self.domain_prefetcher.clear()
+        self.analysis = None
+        self.bucket_medians = (None,)
+        self.pairwise_cache = {}
+        self.sketch_cache = {}
+        self.filter_rows = None
+        self.detect_models()
+
+    @timings.timed()
     def generate_selection_figures(self, sort_metric='RMSE', sort_order='Ascending'):
         """Pre-generate the figures for the model selection window."""
-        if hasattr(self, 'selection_fig_scatter') and self.selection_fig_scatter:
-            plt.close(self.selection_fig_scatter)
-        if hasattr(self, 'selection_fig_boxplot') and self.selection_fig_boxplot:
-            plt.close(self.selection_fig_boxplot)
+        self.close_selection_figures()
 
         # --- Data Preparation ---
         all_models = [col.split('error_')[1] for col in self.data.columns if 'error_' in col]
@@ -824,13 +1208,14 @@ class QuantileApp(ctk.CTk):
         models_in_data = [col.split('error_')[1] for col in self.data.columns if 'error_' in col]
         if models_in_data:
             ref_model = models_in_data[0]
-            pred_candidates = [c for c in self.data.columns if ref_model in c and 'error_' not in c]
+            pred_candidates = [c for c in self.source.columns if ref_model in c and 'error_' not in c]
             if pred_candidates:
                 target_col = pred_candidates[0].replace(f'_{ref_model}', '')
             else:
                 target_col = self.target_name
         else:
             target_col = self.target_name
+        self.require_columns([target_col])
             
         real_values = self.data[target_col]
 
@@ -892,6 +1277,13 @@ class QuantileApp(ctk.CTk):
         
         self.selection_fig_boxplot.tight_layout()
 
+    def close_selection_figures(self):
+        """Close the figures of the model selection window, which hold a point per row and model."""
+        for name in ('selection_fig_scatter', 'selection_fig_boxplot'):
+            if getattr(self, name, None) is not None:
+                plt.close(getattr(self, name))
+                setattr(self, name, None)
+
     def show_model_selection_window(self):
         """Show the window to select the models to compare."""
         self.selection_window = ctk.CTkToplevel(self)
@@ -911,12 +1303,12 @@ class QuantileApp(ctk.CTk):
         self.tabview.add("Predicted vs Real")
         self.tabview.add("Errors Boxplot")
         
-        self.canvas_scatter = FigureCanvasTkAgg(self.selection_fig_scatter, master=self.tabview.tab("Predicted vs Real"))
+        self.canvas_scatter = timings.instrument_canvas(FigureCanvasTkAgg(self.selection_fig_scatter, master=self.tabview.tab("Predicted vs Real")), 'draw_selection_scatter')
         self.toolbar_scatter = NavToolbar(self.canvas_scatter, self.tabview.tab("Predicted vs Real"))
         self.canvas_scatter.draw()
         self.canvas_scatter.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
-        self.canvas_boxplot = FigureCanvasTkAgg(self.selection_fig_boxplot, master=self.tabview.tab("Errors Boxplot"))
+        self.canvas_boxplot = timings.instrument_canvas(FigureCanvasTkAgg(self.selection_fig_boxplot, master=self.tabview.tab("Errors Boxplot")), 'draw_selection_boxplot')
         self.toolbar_boxplot = NavToolbar(self.canvas_boxplot, self.tabview.tab("Errors Boxplot"))
         self.canvas_boxplot.draw()
         self.canvas_boxplot.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
@@ -934,6 +1326,9 @@ class QuantileApp(ctk.CTk):
         self.sort_order_var = ctk.StringVar(value="Ascending")
         ctk.CTkComboBox(sort_frame, values=["Ascending", "Descending"], variable=self.sort_order_var, command=self.update_sorting, width=110).pack(side=tk.LEFT, padx=5)
 
+        ctk.CTkLabel(right_frame, text=f'{len(self.data.columns)} of {len(self.source.columns)} columns loaded, '
+                                       f'{format_bytes(memory_footprint(self.data))} in memory').pack(padx=5)
+
         # --- Selection Logic ---
         ctk.CTkLabel(right_frame, text='Select two models to compare:', font=('Helvetica', 16, 'bold')).pack(pady=10)
 
@@ -983,12 +1378,12 @@ class QuantileApp(ctk.CTk):
 
         self.generate_selection_figures(sort_metric=metric, sort_order=order)
         
-        self.canvas_scatter = FigureCanvasTkAgg(self.selection_fig_scatter, master=self.tabview.tab("Predicted vs Real"))
+        self.canvas_scatter = timings.instrument_canvas(FigureCanvasTkAgg(self.selection_fig_scatter, master=self.tabview.tab("Predicted vs Real")), 'draw_selection_scatter')
         self.toolbar_scatter = NavToolbar(self.canvas_scatter, self.tabview.tab("Predicted vs Real"))
         self.canvas_scatter.draw()
         self.canvas_scatter.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
-        self.canvas_boxplot = FigureCanvasTkAgg(self.selection_fig_boxplot, master=self.tabview.tab("Errors Boxplot"))
+        self.canvas_boxplot = timings.instrument_canvas(FigureCanvasTkAgg(self.selection_fig_boxplot, master=self.tabview.tab("Errors Boxplot")), 'draw_selection_boxplot')
         self.toolbar_boxplot = NavToolbar(self.canvas_boxplot, self.tabview.tab("Errors Boxplot"))
         self.canvas_boxplot.draw()
         self.canvas_boxplot.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
@@ -997,10 +1392,53 @@ class QuantileApp(ctk.CTk):
         """Calculate the maximum number of timesteps in the dataframe.
         If the dataframe has an individual name, the maximum number of timesteps is the maximum number of timesteps for an individual.
         Otherwise, the maximum number of timesteps is the length of the dataframe."""
-        if self.individual_name is None:
+        if self.catalog.individual_name == self.individual_name and self.catalog.rows == len(self.data):
+            self.max_timesteps = self.catalog.max_timesteps
+        elif self.individual_name is None:
             self.max_timesteps = len(self.data)
         else:
-            self.max_timesteps = self.data.groupby(self.individual_name).size().max()
+            self.max_timesteps = int(self.get_layout().lengths.max())
+
+    def get_analysis(self) -> Analysis:
+        """Get the computations on the loaded data for the current target and individual column, shared with engine.api:
+        the per-individual layout and the sorted order of the buckets are built once, the results kept in the engine cache."""
+        if self.analysis is None:
+            self.analysis = Analysis(self.data, self.target_name, self.individual_name)
+        self.analysis.data, self.analysis.target_name, self.analysis.individual_name = self.data, self.target_name, self.individual_name
+        return self.analysis
+
+    def start_precomputation(self):
+        """Prepare in the background the bucket index and the boxplot statistics of the selected models for every other
+        numerical column that can be chosen as target, so that changing the target is immediate."""
+        self.stop_precomputation()
+        if not hasattr(self, 'data') or not getattr(self, 'models', None) or self.approximate_quantiles.get() or self.watch_file.get():
+            return
+        targets = [col for col in self.source.columns if col not in (self.target_name, self.individual_name)
+                   and not col.startswith('error_') and not col.startswith('Unnamed') and self.catalog.kind(col) == 'numerical']
+        quantiles = sorted({10, int(self.quantile_slider.get())})
+        self.precomputation = Precomputation(self.get_analysis(), targets, self.models, quantiles, read_columns=self.read_columns)
+        if self.report_generation is not None:
+            self.precomputation.pause()
+        self.precomputation.start()
+
+    def stop_precomputation(self):
+        if self.precomputation is not None:
+            self.precomputation.stop()
+            self.precomputation = None
+
+    def get_layout(self):
+        """Get the per-individual layout of the rows, built once per loaded file and individual column."""
+        return self.get_analysis().layout()
+
+    def get_bucket_index(self):
+        """Get the rows sorted by the key of the quantile buckets (target, or time step within the individual),
+        built once per target so that changing the number of quantiles never sorts the data again."""
+        return self.get_analysis().bucket_index()
+
+    def get_positions(self, rows=None):
+        """Get the time step of the given rows (all by default) within their individual, or None without individual column."""
+        layout = self.get_layout()
+        return None if layout is None else layout.positions(rows)
 
     def validate_model_selection(self):
         """Validate the model selection and configure the UI."""
@@ -1019,6 +1457,7 @@ class QuantileApp(ctk.CTk):
             self.timesteps_axes = None
             self.calculate_max_timesteps()
             self.selection_window.destroy()
+            self.close_selection_figures()
             self.configure_ui()
             self.setup_plot_timesteps()
             if self.max_timesteps < 300:
@@ -1069,7 +1508,7 @@ class QuantileApp(ctk.CTk):
         self.timesteps_ax.yaxis.label.set_color('tab:green')
 
         self.timesteps_ax.legend(handles=[all_points, abs_better, ord_better, equal_points], loc='lower right')
-        self.colorbar = plt.colorbar(ScalarMappable(norm=Normalize(0, 100), cmap='Spectral'), ax=self.timesteps_ax)
+        self.colorbar = self.timesteps_fig.colorbar(ScalarMappable(norm=Normalize(0, 100), cmap='Spectral'), ax=self.timesteps_ax)
         self.colorbar.set_label('Percentile')
         self.colorbar.ax.yaxis.label.set_color('white')
         self.colorbar.ax.yaxis.set_tick_params(color='white')
@@ -1078,35 +1517,49 @@ class QuantileApp(ctk.CTk):
         # self.timesteps_fig.tight_layout()
         self.timesteps_ax.figure.canvas.draw()
 
+    @timings.timed()
     def plot_quantile_evolution(self, quantile=10, width=0.8, min_timesteps=-1, max_timesteps=-1):
         """Plot the quantile evolution on the provided axis."""
         self.quantile_ax.cla()
         
+        data = take(self.data, [self.target_name, self.individual_name, 'error_' + self.models[0], 'error_' + self.models[1]])
         if min_timesteps == -1 and max_timesteps == -1:
-            data = self.data.copy()
+            pass
         elif min_timesteps == -1:
-            data = self.data.loc[:max_timesteps].copy()
+            data = data.loc[:max_timesteps]
         elif max_timesteps == -1:
-            data = self.data.loc[min_timesteps:].copy()
+            data = data.loc[min_timesteps:]
         else:
-            data = self.data.loc[min_timesteps:max_timesteps].copy()
+            data = data.loc[min_timesteps:max_timesteps]
         self.quantile_ax.set_xlim(0, quantile + 1)
 
-        boxplot_data = [{}, {}]
         self.quantile_ax.axhline(y=0, color='black', linestyle='-')
-        if self.individual_name is None:
-            data['quantile'] = pd.qcut(data[self.target_name].rank(method='first'), quantile, labels=False) + 1
+        if self.approximate_quantiles.get() and min_timesteps == -1 and max_timesteps == -1:
+            with timings.stage('quantile_binning'):
+                stats = self.get_sketch_stats(quantile)
+            bp1 = self.quantile_ax.bxp(stats[0], positions=range(1, quantile + 1), widths=width, patch_artist=True, showfliers=False,
+                    boxprops=dict(facecolor='none', hatch='///', edgecolor='tab:orange'), medianprops=dict(color='black'))
+            bp2 = self.quantile_ax.bxp(stats[1], positions=range(1, quantile + 1), widths=width, patch_artist=True, showfliers=False,
+                    boxprops=dict(facecolor='none', hatch='\\\\\\', edgecolor='tab:green'), medianprops=dict(color='black'))
+        elif min_timesteps == -1 and max_timesteps == -1:
+            with timings.stage('quantile_binning'):
+                stats = [self.get_box_stats(model, quantile) for model in self.models]
+            bp1 = self.quantile_ax.bxp(stats[0], positions=range(1, quantile + 1), widths=width, patch_artist=True, showfliers=False,
+                    boxprops=dict(facecolor='none', hatch='///', edgecolor='tab:orange'), medianprops=dict(color='black'))
+            bp2 = self.quantile_ax.bxp(stats[1], positions=range(1, quantile + 1), widths=width, patch_artist=True, showfliers=False,
+                    boxprops=dict(facecolor='none', hatch='\\\\\\', edgecolor='tab:green'), medianprops=dict(color='black'))
         else:
-            data['quantile'] = pd.qcut(data.groupby(self.individual_name).cumcount(), quantile, labels=False) + 1
-        for i in range(1, quantile + 1):
-            data_per = data[data['quantile'] == i].drop(columns=['quantile'])
-            boxplot_data[0][i] = data_per['error_' + self.models[0]].to_numpy()
-            boxplot_data[1][i] = data_per['error_' + self.models[1]].to_numpy()
-
-        bp1 = self.quantile_ax.boxplot(boxplot_data[0].values(), positions=sorted(list(boxplot_data[0].keys())), widths=width, patch_artist=True, showfliers=False, 
-                boxprops=dict(facecolor='none', hatch='///', edgecolor='tab:orange'), medianprops=dict(color='black'))
-        bp2 = self.quantile_ax.boxplot(boxplot_data[1].values(), positions=sorted(list(boxplot_data[1].keys())), widths=width, patch_artist=True, showfliers=False, 
-                boxprops=dict(facecolor='none', hatch='\\\\\\', edgecolor='tab:green'), medianprops=dict(color='black'))
+            boxplot_data = [{}, {}]
+            with timings.stage('quantile_binning'):
+                labels = quantile_labels(data, self.target_name, self.individual_name, quantile)
+                for model_index, model in enumerate(self.models):
+                    for i, errors in enumerate(split_by_label(data['error_' + model].to_numpy(), labels, quantile), start=1):
+                        boxplot_data[model_index][i] = errors
+
+            bp1 = self.quantile_ax.boxplot(boxplot_data[0].values(), positions=sorted(list(boxplot_data[0].keys())), widths=width, patch_artist=True, showfliers=False, 
+                    boxprops=dict(facecolor='none', hatch='///', edgecolor='tab:orange'), medianprops=dict(color='black'))
+            bp2 = self.quantile_ax.boxplot(boxplot_data[1].values(), positions=sorted(list(boxplot_data[1].keys())), widths=width, patch_artist=True, showfliers=False, 
+                    boxprops=dict(facecolor='none', hatch='\\\\\\', edgecolor='tab:green'), medianprops=dict(color='black'))
 
         self.quantile_ax.set_xticks(range(0, quantile + 1, max(1, quantile // 5)))
         self.quantile_ax.set_xticklabels(range(0, quantile + 1, max(1, quantile // 5)))
@@ -1116,8 +1569,10 @@ class QuantileApp(ctk.CTk):
         self.quantile_ax.xaxis.label.set_color('white')
         self.quantile_ax.yaxis.label.set_color('white')
         self.quantile_ax.legend([bp1['boxes'][0], bp2['boxes'][0]], self.models, loc='lower right')
+        self.annotate_significance(quantile)
 
         self.selected_box = None
+        self.selected_quantile = None
         self.highlight_rect = None
 
         def on_click(event : MouseEvent):
@@ -1145,28 +1600,57 @@ class QuantileApp(ctk.CTk):
             """Select the boxplot that was clicked on."""
             for i, (box1, box2) in enumerate(zip(bp1['boxes'], bp2['boxes'])):
                 if box1.contains(event)[0] or box2.contains(event)[0]:
-                    if self.timesteps_axes is not None:
-                        for ax in self.timesteps_axes:
-                            try:
-                                ax.remove()
-                            except:
-                                pass
-                    self.timesteps_axes = self.plot_timesteps(quantiles=quantile, quantile_to_plot=i+1)
-                    self.selected_box = (box1, box2)
-                    box1.set_facecolor((1, 0.647, 0, 0.5))
-                    box1.set_edgecolor('red')
-                    box1.set_linewidth(2)
-                    box2.set_facecolor((0, 0.502, 0, 0.5))
-                    box2.set_edgecolor('red')
-                    box2.set_linewidth(2)
-                    self.quantile_ax.figure.canvas.draw()
+                    self.select_quantile_box(quantile, i)
                     return
 
-        self.quantile_ax.figure.canvas.mpl_connect('button_press_event', on_click)
+        self.quantile_boxes = list(zip(bp1['boxes'], bp2['boxes']))
+
+        if getattr(self, 'quantile_click_cid', None) is not None:
+            self.quantile_ax.figure.canvas.mpl_disconnect(self.quantile_click_cid)
+        self.quantile_click_cid = self.quantile_ax.figure.canvas.mpl_connect('button_press_event', on_click)
         self.quantile_ax.figure.canvas.draw()
 
         self.simulate_button_click = self.simulate_button.configure(command=lambda: self.simulate_all_clicks(bp1['boxes']))
 
+    def select_quantile_box(self, quantile, i):
+        """Highlight the boxes of the i-th quantile and plot its errors in the domain evolution plot."""
+        box1, box2 = self.quantile_boxes[i]
+        if self.timesteps_axes is not None:
+            for ax in self.timesteps_axes:
+                try:
+                    ax.remove()
+                except:
+                    pass
+        self.timesteps_axes = self.plot_timesteps(quantiles=quantile, quantile_to_plot=i+1)
+        self.selected_box = (box1, box2)
+        self.selected_quantile = (quantile, i)
+        box1.set_facecolor((1, 0.647, 0, 0.5))
+        box1.set_edgecolor('red')
+        box1.set_linewidth(2)
+        box2.set_facecolor((0, 0.502, 0, 0.5))
+        box2.set_edgecolor('red')
+        box2.set_linewidth(2)
+        self.quantile_ax.figure.canvas.draw()
+        self.after_idle(lambda: self.prefetch_quantile_boxes(quantile, i))
+
+    def get_box_stats(self, model, quantile):
+        """Get the boxplot statistics of a model on every quantile, computed once per bucket index and number of quantiles."""
+        return self.get_analysis().box_stats(model, quantile)
+
+    def get_sketch_stats(self, quantile):
+        """Get the boxplot statistics of both models on every quantile from mergeable sketches,
+        without sorting the target nor keeping the errors of a bucket in memory."""
+        key = (self.target_name, self.individual_name, quantile, tuple(self.models))
+        if key not in self.sketch_cache:
+            if self.individual_name is not None:
+                keys = np.where(self.get_positions() < 0, np.nan, self.get_positions())
+            else:
+                keys = self.data[self.target_name].to_numpy()
+            errors = [self.data['error_' + model].to_numpy() for model in self.models]
+            _, sketches = sketch_buckets(keys, errors, quantile)
+            self.sketch_cache[key] = [[boxplot_stats(sketch) for sketch in model_sketches] for model_sketches in sketches]
+        return self.sketch_cache[key]
+
     def simulate_all_clicks(self, boxes, index=0):
         """Simulate all the clicks on the boxplots."""
         if not self.is_simulating:
@@ -1253,70 +1737,77 @@ class QuantileApp(ctk.CTk):
         event.ydata = center_y
         self.quantile_ax.figure.canvas.callbacks.process('button_press_event', event)
 
+    def domain_view_task(self, quantiles=10, quantile_to_plot=0, min=-1, max=-1, inputs=None) -> tuple:
+        """Key of the content of the domain evolution plot for the current data, models, filters, display mode and convex hull
+        percentage, and the function computing it. The inputs (filtered rows and their time steps, which can be given) are
+        read here, so that the function can run on a worker thread."""
+        data, positions = inputs if inputs is not None else self.domain_view_inputs()
+        models, target_name, individual_name = list(self.models), self.target_name, self.individual_name
+        display_mode, percentage = self.display_mode.get(), int(self.convex_hull_percentage.get())
+        key = ('view', self.domain_view_rows_key(quantiles, quantile_to_plot, min, max), percentage)
+
+        def compute(distances=None, percentiles=None):
+            return domain_view(data, models, target_name, individual_name, positions, quantiles, quantile_to_plot, min, max,
+                               display_mode, percentage, distances, percentiles)
+        return key, compute
+
+    def domain_view_rows_key(self, quantiles=10, quantile_to_plot=0, min=-1, max=-1) -> tuple:
+        """Identify the rows of a domain evolution plot: data, models, filters, display mode, quantile and range."""
+        return (tuple(self.models), self.target_name, self.individual_name, len(self.data), self.filter_state(), self.display_mode.get(),
+                quantiles, quantile_to_plot, float(min), float(max))
+
+    def domain_view_inputs(self) -> tuple:
+        """Filtered rows of the columns of the domain evolution plot, with their time steps."""
+        data = take(self.data, [self.target_name, self.individual_name, 'error_' + self.models[0], 'error_' + self.models[1]], self.filter_rows)
+        return data, self.get_positions(self.filter_rows)
+
+    def prefetch_quantile_boxes(self, quantile, i):
+        """Compute on a worker, while the interface is idle, the domain evolution plots of the quantiles next to the i-th one,
+        the next ones first, since the user steps through the quantiles or lets them scroll."""
+        if getattr(self, 'selected_quantile', None) != (quantile, i):
+            return
+        inputs = self.domain_view_inputs()
+        buckets = [bucket for bucket in (i + 2, i, i + 3) if 1 <= bucket <= quantile]
+        self.domain_prefetcher.prefetch([self.domain_view_task(quantile, bucket, inputs=inputs) for bucket in buckets])
+
+    def step_quantile_box(self, offset, event=None):
+        """Select the quantile before or after the selected one, with the arrow keys."""
+        if event is not None and isinstance(event.widget, (tk.Entry, tk.Text)):
+            return
+        if self.is_simulating or getattr(self, 'selected_quantile', None) is None or self.selected_box is None:
+            return
+        quantile, i = self.selected_quantile
+        if 0 <= i + offset < len(self.quantile_boxes):
+            self.clear_last_plot()
+            self.select_quantile_box(quantile, i + offset)
+
+    @timings.timed()
     def plot_timesteps(self, quantiles=10, quantile_to_plot=0, min=-1, max=-1) -> list[plt.Artist]:
-        """Plot the timesteps of the errors for the models on the provided axis."""
+        """Plot the timesteps of the errors for the models on the provided axis.
+        The content prefetched or already drawn for the same state is taken from the cache, otherwise it is computed."""
         self.last_plot_params = {'quantiles': quantiles, 'quantile_to_plot': quantile_to_plot, 'min': min, 'max': max}
         axes = []
 
-        data = self.filtered_data.copy()
-        if self.display_mode.get() == "timesteps" or quantiles > 1:
-            if self.individual_name is not None:
-                if min <= 0 and max == -1:
-                    pass
-                elif min <= 0:
-                    data = data.groupby(self.individual_name).head(max).reset_index(drop=True)
-                elif max == -1:
-                    data = data.groupby(self.individual_name).tail(len(data) - min).reset_index(drop=True)
-                else:
-                    data = data.groupby(self.individual_name).apply(lambda x: x.iloc[min:max], include_groups=False).reset_index(drop=True)
-            else:
-                if min == -1 and max == -1:
-                    pass
-                elif min == -1:
-                    data = data.loc[:max].copy()
-                elif max == -1:
-                    data = data.loc[min:].copy()
-                else:
-                    data = data.loc[min:max].copy()
-        elif self.display_mode.get() == "target":
-            if min is not None and max is not None:
-                data = data[(data[self.target_name] >= min) & (data[self.target_name] <= max)]
-
-        if quantiles > 1:
-            if self.individual_name is None:
-                data['quantile'] = pd.qcut(data[self.target_name].rank(method='first'), quantiles, labels=False) + 1
-            else:
-                data['quantile'] = pd.qcut(data.groupby(self.individual_name).cumcount(), quantiles, labels=False) + 1
-            data_per = data[data['quantile'] == quantile_to_plot].reset_index(drop=True)
-            data_per.drop(columns=['quantile'], inplace=True)
-        else:
-            data_per = data.reset_index(drop=True).copy()
-
-        x_per = data_per['error_'+self.models[0]]
-        y_per = data_per['error_'+self.models[1]]
-
-        median_per = (data_per['error_'+self.models[0]].median(), data_per['error_'+self.models[1]].median())
-        cov_per = np.linalg.inv(np.cov(data_per[['error_'+self.models[0], 'error_'+self.models[1]]], rowvar=False))
-        distance_per = []
-        for row in data_per[['error_'+self.models[0], 'error_'+self.models[1]]].values:
-            distance_per.append(mahalanobis(row, median_per, cov_per))
-        data_per['distance'] = distance_per
-
-        data_per = data_per.sort_values(by='distance')
-        data_per['percentile'] = data_per['distance'].apply(lambda x: (len(data_per[data_per['distance'] <= x]) / len(data_per)) * 100)
-        data_per = data_per.sort_index()
-
-        axes.append(self.timesteps_ax.scatter(x_per, y_per, s=200, c=data_per['percentile'], cmap='Spectral'))
-        axes.append(self.timesteps_ax.plot(median_per[0], median_per[1], 'x', color='black', markersize=10, alpha=0.7)[0])
-
-        percentage = int(self.convex_hull_percentage.get())
-        if percentage > 0:
-            threshold = np.percentile(data_per['distance'], percentage)
-            points_within_threshold = data_per[data_per['distance'] <= threshold][['error_'+self.models[0], 'error_'+self.models[1]]].values
-            if len(points_within_threshold) > 2:
-                hull = ConvexHull(points_within_threshold)
-                for simplex in hull.simplices:
-                    axes.append(self.timesteps_ax.plot(points_within_threshold[simplex, 0], points_within_threshold[simplex, 1], 'k-', lw=1)[0])
+        view_key, compute = self.domain_view_task(quantiles, quantile_to_plot, min, max)
+        rows_key = view_key[1]
+        view = self.domain_prefetcher.get(view_key)
+        if view is None:
+            # The distances do not depend on the convex hull percentage
+            distances = self.domain_prefetcher.get(('distances', rows_key))
+            view = compute(distances['distances'], distances['percentiles']) if distances is not None else compute()
+            self.domain_prefetcher.put(view_key, view)
+        if ('distances', rows_key) not in self.domain_prefetcher.cache:
+            self.domain_prefetcher.put(('distances', rows_key), {'distances': view['distances'], 'percentiles': view['percentiles']})
+        self.domain_rows_key = rows_key
+
+        points = view['points']
+        axes.append(self.timesteps_ax.scatter(points[:, 0], points[:, 1], s=200, c=view['percentiles'], cmap='Spectral', picker=self.individual_name is not None))
+        self.picked_scatter = axes[-1]
+        self.picked_individuals = view['individuals']
+        axes.append(self.timesteps_ax.plot(view['median'][0], view['median'][1], 'x', color='black', markersize=10, alpha=0.7)[0])
+
+        for edge in view['edges']:
+            axes.append(self.timesteps_ax.plot(edge[:, 0], edge[:, 1], 'k-', lw=1)[0])
 
         if quantile_to_plot == 0 and self.display_mode.get() == "timesteps" and (min != -1 or max != -1):
             self.timesteps_ax.set_title(f'Evolution of errors from timesteps {min} to {max}')
@@ -1324,13 +1815,105 @@ class QuantileApp(ctk.CTk):
             self.timesteps_ax.set_title(f'Evolution of errors for target range {min} to {max}')
         else:
             self.timesteps_ax.set_title(f'Evolution of errors for quantile {quantile_to_plot}\n'
-                                        f'Values between {data_per[self.target_name].min()} and {data_per[self.target_name].max()}',
+                                        f'Values between {view["target_range"][0]} and {view["target_range"][1]}',
                                         fontsize=12, color='white', loc='center')
         self.timesteps_ax.title.set_color('white')
 
         self.timesteps_ax.figure.canvas.draw()
         return axes
 
+    def filter_state(self) -> str:
+        """Digest of the rows kept by the filters, the same from one session to the next, computed once per filtering."""
+        if self.filter_rows is None:
+            return None
+        if self.filter_digest[0] is not self.filter_rows:
+            self.filter_digest = (self.filter_rows, hashlib.sha1(self.filter_rows.tobytes()).hexdigest())
+        return self.filter_digest[1]
+
+    def on_pick_point(self, event):
+        """Open the trajectory of the individual of the point clicked in the domain evolution plot."""
+        if self.individual_name is None or event.artist is not getattr(self, 'picked_scatter', None) or len(event.ind) == 0:
+            return
+        self.show_individual_window(self.picked_individuals[event.ind[0]])
+
+    def show_individual_window(self, individual):
+        """Show the errors of both models along the time steps of one individual,
+        with the median errors of the quantile buckets of the quantile evolution plot."""
+        layout = self.get_layout()
+        names = {str(value): value for value in layout.individuals}
+        if hasattr(self, 'individual_window') and self.individual_window.winfo_exists():
+            self.individual_names = names
+            self.individual_combobox.configure(values=list(names))
+            self.individual_var.set(str(individual))
+            self.update_individual_plot()
+            self.individual_window.lift()
+            return
+
+        self.individual_window = ctk.CTkToplevel(self)
+        self.individual_window.title(f"{self.individual_name} trajectory")
+        self.individual_window.geometry("900x600")
+
+        controls_frame = ctk.CTkFrame(self.individual_window)
+        controls_frame.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+        ctk.CTkLabel(controls_frame, text=f"{self.individual_name}:").pack(side=tk.LEFT, padx=5)
+        self.individual_var = ctk.StringVar(value=str(individual))
+        self.individual_combobox = ctk.CTkComboBox(controls_frame, values=list(names), variable=self.individual_var, state='readonly', command=lambda _: self.update_individual_plot())
+        self.individual_combobox.pack(side=tk.LEFT, padx=5)
+
+        def step(offset):
+            keys = list(self.individual_names)
+            index = (keys.index(self.individual_var.get()) + offset) % len(keys)
+            self.individual_var.set(keys[index])
+            self.update_individual_plot()
+
+        ctk.CTkButton(controls_frame, text="Previous", width=80, command=lambda: step(-1)).pack(side=tk.LEFT, padx=5)
+        ctk.CTkButton(controls_frame, text="Next", width=80, command=lambda: step(1)).pack(side=tk.LEFT, padx=5)
+
+        self.individual_fig = plt.figure(figsize=(9, 5))
+        self.individual_fig.set_facecolor('#4a4a4a')
+        canvas = timings.instrument_canvas(FigureCanvasTkAgg(self.individual_fig, master=self.individual_window), 'draw_individual')
+        NavToolbar(canvas, self.individual_window).update()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.individual_window.protocol("WM_DELETE_WINDOW", lambda: [plt.close(self.individual_fig), self.individual_window.destroy()])
+        self.individual_names = names
+        self.update_individual_plot()
+
+    def get_bucket_medians(self, quantile):
+        """Get the quantile label of every row and the median error of both models on every bucket."""
+        key = (self.target_name, self.individual_name, quantile, tuple(self.models))
+        if getattr(self, 'bucket_medians', (None,))[0] != key:
+            labels = self.get_bucket_index().labels(quantile)
+            medians = np.array([[np.median(errors) if len(errors) else np.nan for errors in self.get_bucket_index().buckets('error_' + model, self.data['error_' + model].to_numpy(), quantile)]
+                                for model in self.models])
+            self.bucket_medians = (key, labels, medians)
+        return self.bucket_medians[1:]
+
+    def update_individual_plot(self):
+        """Plot the trajectory of the individual selected in the drill-down window."""
+        individual = self.individual_names[self.individual_var.get()]
+        rows = self.get_layout().rows_of(individual)
+        quantile = int(self.quantile_slider.get())
+        labels, medians = self.get_bucket_medians(quantile)
+        timesteps = np.arange(len(rows))
+
+        self.individual_fig.clear()
+        ax = self.individual_fig.add_subplot(111)
+        ax.axhline(y=0, color='black', linestyle='-', linewidth=1)
+        for model_index, (model, color) in enumerate(zip(self.models, ['tab:orange', 'tab:green'])):
+            errors = self.data['error_' + model].to_numpy()[rows]
+            ax.plot(timesteps, errors, color=color, label=model)
+            bucket_medians = medians[model_index][np.clip(labels[rows] - 1, 0, quantile - 1)]
+            ax.step(timesteps, np.where(labels[rows] > 0, bucket_medians, np.nan), where='mid', color=color, linestyle='--', alpha=0.7, label=f'{model} median of the quantile')
+        ax.set_title(f'Errors of {self.individual_name} {individual} ({len(rows)} time steps)', color='white')
+        ax.set_xlabel('Time step')
+        ax.set_ylabel('Errors')
+        ax.xaxis.label.set_color('white')
+        ax.yaxis.label.set_color('white')
+        ax.tick_params(colors='white')
+        ax.legend(loc='lower right')
+        self.individual_fig.tight_layout()
+        self.individual_fig.canvas.draw()
+
     def clear_last_plot(self):
         """Remove the last plot from the timesteps axis."""
         if self.selected_box is not None:
@@ -1381,10 +1964,15 @@ class QuantileApp(ctk.CTk):
             self.models = file_info['models']
             self.individual_name = file_info['individual_name']
             self.target_name = file_info['target_name']
+            self.use_column_store = file_info.get('column_store', False)
             self.timesteps_axes = None
         except KeyError:
             messagebox.showerror('Error', 'An error occured while loading the file, please reload it.')
-        self.data = pd.read_csv(self.file_path, sep=self.sep, index_col=0 if self.has_index else None)
+        session = Session.open(self.file_path, self.sessions_path)
+        self.load_data(on_done=lambda: self.show_recent_file(file_info, session), session=session)
+
+    def show_recent_file(self, file_info : dict, session: Session = None):
+        """Show the views of a recent file once its data is loaded, restoring its saved session."""
         if pd.api.types.is_datetime64_any_dtype(self.data[self.target_name]) or 'date' in self.target_name.lower():
             self.data[self.target_name] = pd.to_datetime(self.data[self.target_name], format='mixed')
         self.update_recent_files(file_info)
@@ -1392,12 +1980,107 @@ class QuantileApp(ctk.CTk):
         self.title(f"DEPlot - {self.file_path} - {self.models[0]} vs {self.models[1]}")
         self.configure_ui()
         self.setup_plot_timesteps()
+        if session is not None and [session.state['models'], session.state['target_name'], session.state['individual_name']] == [list(self.models), self.target_name, self.individual_name]:
+            self.restore_session(session)
+            return
         if self.max_timesteps < 300:
             self.quantile_slider.set(10)
         else:
             self.quantile_slider.set(100)
         self.update_quantile_plot(None)
 
+    def save_session(self, quiet=False):
+        """Save the state of the views with the arrays computed for them (filtered rows, sorted orders, bucket edges,
+        boxplot statistics, distances, column summary), restored as they are when the file is reopened."""
+        if not hasattr(self, 'quantile_canvas') or not hasattr(self, 'models'):
+            if not quiet:
+                messagebox.showerror('Error', 'Open a result file first.')
+            return
+        if self.joined_rows is not None:
+            if not quiet:
+                messagebox.showerror('Error', 'Sessions of files joined with another result file cannot be saved.')
+            return
+        quantiles = int(self.quantile_slider.get())
+        state = {
+            'models': list(self.models),
+            'target_name': self.target_name,
+            'individual_name': self.individual_name,
+            'numerical_filters': {var: {key: None if value is None else float(value) for key, value in bounds.items()} for var, bounds in self.numerical_filters.items()},
+            'categorical_filters': {var: [value.item() if isinstance(value, np.generic) else value for value in categories] for var, categories in self.categorical_filters.items()},
+            'datetime_filters': {var: {key: None if value is None else value.isoformat() for key, value in dates.items()} for var, dates in self.datetime_filters.items()},
+            'quantiles': quantiles,
+            'hull_percentage': int(self.convex_hull_percentage.get()),
+            'display_mode': self.display_mode.get(),
+            'approximate': self.approximate_quantiles.get(),
+            'range': [value.get() if isinstance(value, tk.Variable) else float(value) for value in self.timesteps_slider_values],
+            'plot': {key: float(value) if key in ('min', 'max') else int(value) for key, value in self.last_plot_params.items()},
+            'catalog': self.catalog.to_dict(),
+        }
+        arrays = {}
+        if self.filter_rows is not None:
+            arrays['filter_rows'] = self.filter_rows
+        analysis = self.get_analysis()
+        arrays.update(analysis.to_arrays())
+        if 'buckets.order' in arrays:
+            state['bucket_key'] = [self.target_name, self.individual_name, len(self.data)]
+            state['box_stats'] = {model: analysis.cached_box_stats(model, quantiles) for model in self.models
+                                  if analysis.cached_box_stats(model, quantiles) is not None}
+        distances = self.domain_prefetcher.cache.get(('distances', self.domain_rows_key)) if self.domain_rows_key is not None else None
+        if distances is not None:
+            state['distances'] = [list(self.domain_rows_key[0])] + list(self.domain_rows_key[1:])
+            arrays['distances.distance'], arrays['distances.percentile'] = distances['distances'], distances['percentiles']
+        # Rows appended to the file and not read yet would make the arrays wrong: only the state is kept then
+        fingerprint = file_fingerprint(self.file_path)
+        source = fingerprint if fingerprint['size'] == self.data_offset else None
+        session = Session(state, arrays, source)
+        if not isinstance(self.source, ColumnStore):
+            # The loaded columns are saved too, so that reopening the file does not parse it again
+            session.store_frame(self.data)
+        session.save(self.file_path, self.sessions_path)
+
+    def restore_session(self, session: Session):
+        """Restore the views of a saved session. The computed arrays are used as they are when the file did not change,
+        otherwise the filters are applied again and the views computed from the data."""
+        state = session.state
+        self.numerical_filters = {var: dict(bounds) for var, bounds in state['numerical_filters'].items()}
+        self.categorical_filters = {var: set(categories) for var, categories in state['categorical_filters'].items()}
+        self.datetime_filters = {var: {key: None if value is None else date.fromisoformat(value) for key, value in dates.items()}
+                                 for var, dates in state['datetime_filters'].items()}
+        self.require_columns(list(self.numerical_filters) + list(self.categorical_filters) + list(self.datetime_filters))
+        if session.computed:
+            self.catalog = Catalog.from_dict(state['catalog'])
+            self.filter_rows = session.arrays.get('filter_rows')
+            # The bucket index is only used for the target, individual column and rows it was sorted on
+            buckets = session.prefixed('buckets') if state.get('bucket_key') == [self.target_name, self.individual_name, len(self.data)] else None
+            self.get_analysis().restore(session.prefixed('layout'), buckets, state.get('box_stats'), state['quantiles'])
+            if 'distances.distance' in session.arrays:
+                rows_key = (tuple(state['distances'][0]),) + tuple(state['distances'][1:])
+                self.domain_prefetcher.put(('distances', rows_key), {'distances': session.arrays['distances.distance'],
+                                                                     'percentiles': session.arrays['distances.percentile']})
+        else:
+            self.filter_rows = filter_rows(self.data, self.numerical_filters, self.categorical_filters, self.datetime_filters)
+
+        self.convex_hull_percentage.set(str(state['hull_percentage']))
+        self.approximate_quantiles.set(state['approximate'])
+        self.display_mode.set(state['display_mode'])
+        if state['display_mode'] == 'timesteps':
+            self.timesteps_slider.configure(from_=0, to=self.max_timesteps)
+            self.timesteps_slider_label.configure(text='Number of time steps')
+        self.timesteps_slider_values = tuple(state['range'])
+        self.timesteps_slider.set(self.timesteps_slider_values)
+        self.update_timesteps_left_entry(None)
+        self.update_timesteps_right_entry(None)
+
+        quantiles = state['quantiles']
+        self.quantile_slider.set(quantiles)
+        self.update_quantile_slider(None)
+        self.plot_quantile_evolution(quantiles, width=1)
+        plot = state['plot']
+        if plot['quantiles'] == quantiles and 0 < plot['quantile_to_plot'] <= quantiles:
+            self.select_quantile_box(quantiles, plot['quantile_to_plot'] - 1)
+        else:
+            self.timesteps_axes = self.plot_timesteps(**plot)
+
     def update_recent_files(self, file_info : dict = None):
         """Update the recent files list."""
         if file_info is None:
@@ -1408,7 +2091,8 @@ class QuantileApp(ctk.CTk):
                 'sep': self.sep,
                 'models': self.models,
                 'individual_name': self.individual_name,
-                'target_name': self.target_name
+                'target_name': self.target_name,
+                'column_store': self.use_column_store
             }
         if file_info not in self.recent_files:
             self.recent_files.append(file_info)
@@ -1427,9 +2111,15 @@ class QuantileApp(ctk.CTk):
     def update_quantile_slider(self, event : tk.Event):
         """Update the quantile slider value."""
         if event is None or type(event) == float:
+            previous = self.quantile_slider_value
             self.quantile_slider_value = round(self.quantile_slider.get())
             self.quantile_slider_entry.delete(0, tk.END)
             self.quantile_slider_entry.insert(0, str(self.quantile_slider_value))
+            if type(event) == float and self.quantile_slider_value != previous:
+                # Live preview while dragging: only the last position is drawn once the interface is idle
+                if getattr(self, 'quantile_preview_job', None) is not None:
+                    self.after_cancel(self.quantile_preview_job)
+                self.quantile_preview_job = self.after(50, self.preview_quantile_plot)
         else:
             self.quantile_slider_value = int(self.quantile_slider_entry.get())
             self.quantile_slider.set(self.quantile_slider_value)
@@ -1488,8 +2178,17 @@ class QuantileApp(ctk.CTk):
         self.clear_last_plot()
         self.timesteps_axes = self.plot_timesteps(1, min=min_timesteps, max=max_timesteps)
 
+    def preview_quantile_plot(self):
+        """Draw the quantile plot for the current position of the slider while it is dragged."""
+        self.quantile_preview_job = None
+        if not self.is_simulating and not self.approximate_quantiles.get():
+            self.plot_quantile_evolution(int(self.quantile_slider.get()), width=1)
+
     def update_quantile_plot(self, event : tk.Event):
         """Update the quantile plot."""
+        if getattr(self, 'quantile_preview_job', None) is not None:
+            self.after_cancel(self.quantile_preview_job)
+            self.quantile_preview_job = None
         quantile = int(self.quantile_slider.get())
         self.plot_quantile_evolution(quantile, width=1)
 
@@ -1502,8 +2201,8 @@ class QuantileApp(ctk.CTk):
             self.update_timesteps_left_entry(None)
             self.update_timesteps_right_entry(None)
         else:
-            self.timesteps_slider_values = (self.data[self.target_name].min(), self.data[self.target_name].max())
-            self.timesteps_slider.configure(from_=self.data[self.target_name].min(), to=self.data[self.target_name].max())
+            self.timesteps_slider_values = self.get_min_max_values(self.target_name)
+            self.timesteps_slider.configure(from_=self.timesteps_slider_values[0], to=self.timesteps_slider_values[1])
             self.timesteps_slider_label.configure(text=f'{self.target_name} range')
             self.update_timesteps_left_entry(None)
             self.update_timesteps_right_entry(None)
@@ -1529,7 +2228,7 @@ class QuantileApp(ctk.CTk):
         target_combobox = ctk.CTkComboBox(
             target_window,
             state="readonly",
-            values=list(self.data.columns),
+            values=list(self.source.columns),
             command=lambda event: self.update_target_name(target_combobox.get())
         )
         target_combobox.set(self.target_name)
@@ -1537,6 +2236,7 @@ class QuantileApp(ctk.CTk):
 
         def confirm_target_change():
             self.target_name = target_combobox.get()
+            self.require_columns([self.target_name])
             target_window.destroy()
             self.refresh_visualizations()
 
@@ -1544,7 +2244,7 @@ class QuantileApp(ctk.CTk):
 
     def refresh_visualizations(self):
         """Rafraîchit toutes les visualisations en fonction de la nouvelle variable target."""
-        self.filtered_data = self.data.copy()
+        self.filter_rows = None
         self.configure_ui()
         self.setup_plot_timesteps()
         self.update_quantile_plot(None)
@@ -1586,25 +2286,21 @@ class QuantileApp(ctk.CTk):
         Then, we then use the predictions of the model that has the lowest metric value for each quantile.
         Finally, we compute the overall error metrics for the new predictions.
         """
-        new_errors = []
+        predicted_value_name = self.get_prediction_target_name(self.models[0])
+        self.require_columns([predicted_value_name])
         quantile = int(self.quantile_slider.get())
-        data = self.data.copy()
-        if self.individual_name is None:
-            data['quantile'] = pd.qcut(data[self.target_name].rank(method='first'), quantile, labels=False) + 1
-        else:
-            data['quantile'] = pd.qcut(data.groupby(self.individual_name).cumcount(), quantile, labels=False) + 1
+        labels = self.get_bucket_index().labels(quantile)
+        real_values = self.data[predicted_value_name].to_numpy()
+        error_model_1 = self.data['error_' + self.models[0]].to_numpy()
+        error_model_2 = self.data['error_' + self.models[1]].to_numpy()
+        use_model_1 = np.zeros(quantile + 1, dtype=bool)
         for i in range(1, quantile + 1):
-            data_per = data[data['quantile'] == i].drop(columns=['quantile'])
-            error_model_1 = data_per['error_' + self.models[0]]
-            error_model_2 = data_per['error_' + self.models[1]]
-            predicted_value_name = [col for col in self.data.columns if self.models[0] in col and col != f"error_{self.models[0]}"][0].split(f'_{self.models[0]}')[0]
-            metric_model_1 = metric(data_per[predicted_value_name], data_per[predicted_value_name] - error_model_1)
-            metric_model_2 = metric(data_per[predicted_value_name], data_per[predicted_value_name] - error_model_2)
-            if metric_model_1 <= metric_model_2:
-                new_errors.extend(error_model_1.tolist())
-            else:
-                new_errors.extend(error_model_2.tolist())
-        self.data['errors_combined'] = new_errors
+            in_quantile = labels == i
+            metric_model_1 = metric(real_values[in_quantile], real_values[in_quantile] - error_model_1[in_quantile])
+            metric_model_2 = metric(real_values[in_quantile], real_values[in_quantile] - error_model_2[in_quantile])
+            use_model_1[i] = metric_model_1 <= metric_model_2
+        # The combined errors keep the order of the rows, the model being chosen per quantile
+        self.data['errors_combined'] = np.where(use_model_1[labels], error_model_1, error_model_2)
         messagebox.showinfo('New Metrics', f'New combined error metrics for target {self.target_name}:\n\n'
                                         f'MAE: {mean_absolute_error(self.data[predicted_value_name], self.data[predicted_value_name] - self.data["errors_combined"]):.4f}\n'
                                         f'RMSE: {root_mean_squared_error(self.data[predicted_value_name], self.data[predicted_value_name] - self.data["errors_combined"]):.4f}\n'
@@ -1657,7 +2353,8 @@ class QuantileApp(ctk.CTk):
         ctk.CTkButton(report_window, text="Generate Report", command=generate_and_close, fg_color="green", hover_color="darkgreen").pack(pady=15)
 
     def generate_report(self, models: list[str] = None):
-        """Generate a comparison report for the selected models."""
+        """Generate a comparison report for the selected models on a background thread. The rows are saved as soon as
+        every domain variable is done and drawn on the bar chart, and a stopped report can be resumed."""
         if models is None:
             models = self.models
 
@@ -1670,104 +2367,163 @@ class QuantileApp(ctk.CTk):
         if not file_path:
             return
 
-        excluded = [col for col in self.data.columns if [col for col in self.data.columns if self.models[0] in col and col != f"error_{self.models[0]}"][0].split(f'_{self.models[0]}')[0] in col]
-        
-        domain_vars = sorted(list(set([
-            col for col in self.data.columns 
-            if col not in excluded 
-            and 'error_' not in col 
-            and not col.startswith('Unnamed')
-        ])))
-
+        domain_vars = self.report_variables()
         if not domain_vars:
             messagebox.showwarning("Warning", "No domain variables found for analysis.")
             return
 
-        results = []
-        n_quantiles = int(self.quantile_slider.get())
+        source = self.report_source()
+        analysis = self.get_analysis()
+        try:
+            analysis.report_store = ReportStore.open(self.file_path, self.reports_path, source)
+        except OSError as e:
+            # The report is then computed without saving its segments
+            analysis.report_store = None
+            messagebox.showwarning("Warning", f"Unable to open the report store, the segments will not be saved:\n{e}")
+        generation = ReportGeneration(analysis, domain_vars, models, int(self.quantile_slider.get()), file_path,
+                                      read_columns=self.read_columns, source=source, sep=';', decimal=',') # Format excel-friendly
+        checkpoint = generation.checkpoint()
+        if checkpoint is not None and not messagebox.askyesno(
+                "Resume Report", f"A previous generation of this report stopped after {len(checkpoint['done'])} of {len(domain_vars)} variables.\n"
+                                 "Resume it? Otherwise it starts over."):
+            generation.discard_checkpoint()
+        self.report_generation = generation
+
+        progress_window = ctk.CTkToplevel(self)
+        progress_window.title(f'Generating {os.path.basename(file_path)}')
+        progress_window.geometry('450x150')
+        progress_label = ctk.CTkLabel(progress_window, text='Starting...')
+        progress_label.pack(pady=10)
+        progress_bar = ctk.CTkProgressBar(progress_window, width=400)
+        progress_bar.set(0)
+        progress_bar.pack(pady=5)
+
+        def cancel():
+            generation.cancel()
+            progress_label.configure(text='Cancelling...')
+
+        ctk.CTkButton(progress_window, text='Cancel', command=cancel).pack(pady=10)
+        progress_window.protocol("WM_DELETE_WINDOW", cancel)
+
+        shown = 0
+        update_plot = None
+
+        def show_rows():
+            # The bar chart is opened with the first row, then redrawn when rows were added since the last poll
+            nonlocal shown, update_plot
+            if len(generation.rows) == shown:
+                return
+            shown = len(generation.rows)
+            df_results = pd.DataFrame(generation.rows)
+            if update_plot is None:
+                update_plot = self.show_hybrid_rmse_plot(df_results)
+            else:
+                update_plot(df_results)
+
+        def poll():
+            if generation.is_alive():
+                if not generation.cancelled:
+                    processed = len(generation.done) + len(generation.failures)
+                    progress_bar.set(processed / max(1, generation.total))
+                    progress_label.configure(text=f'{processed} of {generation.total} variables, {len(generation.failures)} failed')
+                    show_rows()
+                progress_window.after(100, poll)
+                return
+            progress_window.destroy()
+            self.report_generation = None
+            if self.precomputation is not None:
+                self.precomputation.resume()
+            show_rows()
+            if generation.error is not None:
+                messagebox.showerror("Error", f"Unable to generate the report:\n{generation.error}")
+            elif generation.cancelled:
+                messagebox.showinfo("Information", f"Report stopped after {len(generation.done)} of {generation.total} variables:\n{file_path}\n\n"
+                                                   "Generate it again to the same file to resume it.")
+            elif generation.failures:
+                failures = '\n'.join(f'{variable}: {message}' for variable, message in list(generation.failures.items())[:10])
+                more = f'\n... and {len(generation.failures) - 10} more' if len(generation.failures) > 10 else ''
+                messagebox.showwarning("Warning", f"Report generated without {len(generation.failures)} variables:\n{failures}{more}\n\n"
+                                                  f"Generate it again to the same file to retry them:\n{file_path}")
+            elif generation.rows:
+                messagebox.showinfo("Success", f"Report generated successfully:\n{file_path}")
+            else:
+                messagebox.showinfo("Information", "No results generated.")
+
+        if self.precomputation is not None:
+            self.precomputation.pause()
+        generation.start()
+        progress_window.after(100, poll)
+        progress_window.after(100, progress_window.lift)
+
+    def report_source(self) -> dict:
+        """Version of the data the report is computed on: the file, and the rows kept by the joins."""
+        joined = None if self.joined_rows is None else hashlib.sha1(np.ascontiguousarray(self.joined_rows).tobytes()).hexdigest()
+        return {'file': file_fingerprint(self.file_path), 'rows': len(self.data), 'joined_rows': joined}
+
+    def report_variables(self) -> list[str]:
+        """Domain variables of the comparison report: the columns of the file other than the predictions, the target and the errors."""
+        excluded = [col for col in self.source.columns if self.get_prediction_target_name(self.models[0]) in col]
         
-        metrics_map = {
-            "RMSE": root_mean_squared_error,
-            "MAE": mean_absolute_error
-        }
-
-        y_true_global = self.data[[col for col in self.data.columns if models[0] in col and col != f"error_{models[0]}"][0].split(f'_{models[0]}')[0]]
-        print([col for col in self.data.columns if models[0] in col and col != f"error_{models[0]}"][0].split(f'_{models[0]}')[0])
-        y_pred_global_m0 = y_true_global + self.data[f'error_{models[0]}']
-        y_pred_global_m1 = y_true_global + self.data[f'error_{models[1]}']
-
-        base_metrics = {}
-        for metric_name, metric_func in metrics_map.items():
-            base_metrics[f"{models[0]}_{metric_name}"] = metric_func(y_true_global, y_pred_global_m0)
-            base_metrics[f"{models[1]}_{metric_name}"] = metric_func(y_true_global, y_pred_global_m1)
+        return sorted(list(set([
+            col for col in self.source.columns 
+            if col not in excluded 
+            and 'error_' not in col 
+            and not col.startswith('Unnamed')
+        ])))
 
-        for var_name in domain_vars:
-            row_data = {"Variable": var_name}
-            if var_name == self.target_name:
-                temp_df = self.data[[var_name, f'error_{models[0]}', f'error_{models[1]}']].copy()
-            else:
-                temp_df = self.data[[self.target_name, var_name, f'error_{models[0]}', f'error_{models[1]}']].copy()
-            
-            is_numeric = pd.api.types.is_numeric_dtype(temp_df[var_name])
-            
-            try:
-                if is_numeric and temp_df[var_name].nunique() > n_quantiles:
-                    temp_df['bucket'] = pd.qcut(temp_df[var_name].rank(method='first'), n_quantiles, labels=False)
-                else:
-                    # create bucket based on unique values
-                    temp_df['bucket'] = temp_df[var_name].astype('category').cat.codes
-            except Exception as e:
-                print(f"Segmentation error on {var_name}: {e}")
-                continue
-
-            for metric_name, metric_func in metrics_map.items():
-                y_true_segments = []
-                y_pred_hybrid_segments = []
-
-                for _, group in temp_df.groupby('bucket'):
-                    y_t = group[self.target_name]
-                    y_p0 = y_t + group[f'error_{models[0]}']
-                    y_p1 = y_t + group[f'error_{models[1]}']
-
-                    score0 = metric_func(y_t, y_p0)
-                    score1 = metric_func(y_t, y_p1)
-
-                    y_true_segments.extend(y_t.tolist())
-                    if score0 < score1:
-                        y_pred_hybrid_segments.extend(y_p0.tolist())
-                    else:
-                        y_pred_hybrid_segments.extend(y_p1.tolist())
-
-                hybrid_score = metric_func(y_true_segments, y_pred_hybrid_segments)
-                gain = ((min(base_metrics[f"{models[0]}_{metric_name}"], base_metrics[f"{models[1]}_{metric_name}"]) - hybrid_score) /
-                        min(base_metrics[f"{models[0]}_{metric_name}"], base_metrics[f"{models[1]}_{metric_name}"])) * 100
-                
-                m0_score = base_metrics[f"{models[0]}_{metric_name}"]
-                m1_score = base_metrics[f"{models[1]}_{metric_name}"]
-
-                row_data[f"Hybrid_{metric_name}"] = hybrid_score
-                row_data[f"Gain_{metric_name} (%)"] = gain
-                row_data[f"{models[0]}_{metric_name}"] = m0_score
-                row_data[f"{models[1]}_{metric_name}"] = m1_score
-
-            results.append(row_data)
-
-        if results:
-            df_results = pd.DataFrame(results)
-            cols_order = ['Variable'] + [c for c in df_results.columns if c != 'Variable']
-            df_results = df_results[cols_order]
-            
+    def show_export_quantile_stats_window(self):
+        """Show a window to export the statistics of the quantile evolution plot for a range of numbers of quantiles."""
+        export_window = ctk.CTkToplevel(self)
+        export_window.title("Export Quantile Statistics")
+        export_window.geometry("400x220")
+
+        ctk.CTkLabel(export_window, text="Numbers of quantiles to export:", font=("Helvetica", 12)).pack(pady=10)
+        range_frame = ctk.CTkFrame(export_window, fg_color="transparent")
+        range_frame.pack(pady=5)
+        ctk.CTkLabel(range_frame, text="From").pack(side=tk.LEFT, padx=5)
+        from_entry = ctk.CTkEntry(range_frame, width=60)
+        from_entry.insert(0, str(int(self.quantile_slider.get())))
+        from_entry.pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(range_frame, text="to").pack(side=tk.LEFT, padx=5)
+        to_entry = ctk.CTkEntry(range_frame, width=60)
+        to_entry.insert(0, str(int(self.quantile_slider.get())))
+        to_entry.pack(side=tk.LEFT, padx=5)
+
+        all_models_var = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(export_window, text="Export all the models", variable=all_models_var).pack(pady=5)
+
+        def export_and_close():
             try:
-                df_results.to_csv(file_path, index=False, sep=';', decimal=',') # Format excel-friendly
-                messagebox.showinfo("Success", f"Report generated successfully:\n{file_path}")
-                self.show_hybrid_rmse_plot(df_results)
-            except Exception as e:
-                messagebox.showerror("Error", f"Unable to save the file:\n{e}")
-        else:
-            messagebox.showinfo("Information", "No results generated.")
+                first, last = int(from_entry.get()), int(to_entry.get())
+            except ValueError:
+                messagebox.showerror("Error", "The numbers of quantiles must be integers.")
+                return
+            if not 1 <= first <= last:
+                messagebox.showerror("Error", "Enter a range of numbers of quantiles from 1.")
+                return
+            models = self.all_models if all_models_var.get() else self.models
+            self.export_quantile_stats(models, range(first, last + 1))
+            export_window.destroy()
+
+        ctk.CTkButton(export_window, text="Export", command=export_and_close).pack(pady=10)
 
-    def show_hybrid_rmse_plot(self, df_results):
-        """Display a visual plot of Hybrid_RMSE or Hybrid_MAE results."""
+    def export_quantile_stats(self, models: list[str], quantiles: range):
+        """Save the statistics of the errors of the models on every quantile (boxplot statistics, target range, counts, MAE, RMSE)
+        for every number of quantiles, computed from the buckets of the loaded data without drawing them."""
+        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv"), ("Parquet files", "*.parquet")],
+                                                 title="Save Quantile Statistics As", initialfile="quantile_statistics.csv")
+        if not file_path:
+            return
+        try:
+            self.require_columns([f'error_{model}' for model in models])
+            api.export_quantile_stats(file_path, self.get_analysis(), models=models, quantiles=quantiles, sep=';', decimal=',')
+            messagebox.showinfo("Success", f"Quantile statistics saved to:\n{file_path}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Unable to save the file:\n{e}")
+
+    def show_hybrid_rmse_plot(self, df_results) -> Callable:
+        """Display a visual plot of Hybrid_RMSE or Hybrid_MAE results.
+        Returns the function redrawing the plot with new results, or None when there is nothing to plot."""
         available_metrics = []
         if 'Hybrid_RMSE' in df_results.columns:
             available_metrics.append('Hybrid_RMSE')
@@ -1797,6 +2553,7 @@ class QuantileApp(ctk.CTk):
         ctk.CTkComboBox(controls_frame, values=["Ascending", "Descending"], variable=sort_var, command=lambda _: update_plot()).pack(side=tk.LEFT, padx=5)
         
         fig, ax = plt.subplots(figsize=(10, 6))
+        plot_window.protocol("WM_DELETE_WINDOW", lambda: [plt.close(fig), plot_window.destroy()])
         fig.set_facecolor('#4a4a4a')
         ax.tick_params(colors='white', labelsize=12)
         ax.xaxis.label.set_color('white')
@@ -1806,12 +2563,17 @@ class QuantileApp(ctk.CTk):
         for spine in ax.spines.values():
             spine.set_color('white')
         
-        canvas = FigureCanvasTkAgg(fig, master=plot_window)
+        canvas = timings.instrument_canvas(FigureCanvasTkAgg(fig, master=plot_window), 'draw_report')
         toolbar = NavToolbar(canvas, plot_window)
         toolbar.update()
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
-        def update_plot(_=None):
+        def update_plot(results=None):
+            nonlocal df_results
+            if results is not None:
+                df_results = results
+            if not plot_window.winfo_exists():
+                return
             order = sort_var.get()
             ascending = (order == "Ascending")
             
@@ -1839,6 +2601,7 @@ class QuantileApp(ctk.CTk):
             canvas.draw()
         
         update_plot()
+        return update_plot
 
     def show_metrics_window(self):
         """Show a window with the metrics for the selected models."""
@@ -1846,12 +2609,7 @@ class QuantileApp(ctk.CTk):
         metrics_window.title("Metrics")
         metrics_window.geometry("400x300")
 
-        quantile = int(self.quantile_slider.get())
-        data = self.data.copy()
-        if self.individual_name is None:
-            data['quantile'] = pd.qcut(data[self.target_name].rank(method='first'), quantile, labels=False) + 1
-        else:
-            data['quantile'] = pd.qcut(data.groupby(self.individual_name).cumcount(), quantile, labels=False) + 1
+        data = self.data
 
         metrics_text = ""
         for model in self.models:
@@ -1866,5 +2624,199 @@ class QuantileApp(ctk.CTk):
         metrics_label = ctk.CTkLabel(metrics_window, text=metrics_text, font=("Helvetica", 12), justify=tk.LEFT)
         metrics_label.pack(pady=10, padx=10)
 
-app = QuantileApp()
-app.mainloop()
\ No newline at end of file
+    def get_pairwise_matrix(self, quantile):
+        """Get the pairwise comparison of all the models, computed once per dataset and number of quantiles."""
+        if not hasattr(self, 'pairwise_cache'):
+            self.pairwise_cache = {}
+        models = [col.split('error_')[1] for col in self.data.columns if col.startswith('error_')]
+        key = (self.target_name, self.individual_name, quantile, tuple(models))
+        if key not in self.pairwise_cache:
+            labels = self.get_bucket_index().labels(quantile)
+            errors = self.data[[f'error_{model}' for model in models]].to_numpy()
+            self.pairwise_cache[key] = (models, *pairwise_win_rates(errors, labels, quantile))
+        return self.pairwise_cache[key]
+
+    def show_pairwise_matrix_window(self):
+        """Show a heatmap comparing every pair of models. Clicking a cell opens that pair in the main view."""
+        quantile = int(self.quantile_slider.get())
+        models, counts, win_rates, median_diff = self.get_pairwise_matrix(quantile)
+
+        matrix_window = ctk.CTkToplevel(self)
+        matrix_window.title(f"Model Comparison Matrix - {quantile} quantiles")
+        matrix_window.geometry("900x800")
+
+        controls_frame = ctk.CTkFrame(matrix_window)
+        controls_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        ctk.CTkLabel(controls_frame, text="Value:").pack(side=tk.LEFT, padx=5)
+        value_var = ctk.StringVar(value="Win rate")
+        ctk.CTkComboBox(controls_frame, values=["Win rate", "Median difference"], variable=value_var, state='readonly', command=lambda _: update_plot()).pack(side=tk.LEFT, padx=5)
+
+        ctk.CTkLabel(controls_frame, text="Quantile:").pack(side=tk.LEFT, padx=5)
+        quantile_var = ctk.StringVar(value="All")
+        ctk.CTkComboBox(controls_frame, values=["All"] + [str(i) for i in range(1, quantile + 1)], variable=quantile_var, state='readonly', command=lambda _: update_plot()).pack(side=tk.LEFT, padx=5)
+
+        fig = plt.figure(figsize=(9, 8))
+        fig.set_facecolor('#4a4a4a')
+        canvas = FigureCanvasTkAgg(fig, master=matrix_window)
+        toolbar = NavToolbar(canvas, matrix_window)
+        toolbar.update()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        matrix_window.protocol("WM_DELETE_WINDOW", lambda: [plt.close(fig), matrix_window.destroy()])
+
+        def update_plot():
+            fig.clear()
+            ax = fig.add_subplot(111)
+            if value_var.get() == "Win rate":
+                if quantile_var.get() == "All":
+                    values = overall_win_rates(counts, win_rates)
+                else:
+                    values = win_rates[int(quantile_var.get()) - 1].copy()
+                np.fill_diagonal(values, np.nan)
+                image = ax.imshow(values, cmap='RdYlGn', vmin=0, vmax=1)
+                label = 'Fraction of rows where |error (row)| < |error (column)|'
+            else:
+                if quantile_var.get() == "All":
+                    values = np.nanmedian(median_diff, axis=0)
+                else:
+                    values = median_diff[int(quantile_var.get()) - 1].copy()
+                np.fill_diagonal(values, np.nan)
+                extrema = np.nanmax(np.abs(values)) or 1
+                image = ax.imshow(values, cmap='RdYlGn_r', vmin=-extrema, vmax=extrema)
+                label = 'Median of |error (row)| - |error (column)|'
+            if len(models) <= 15:
+                for i in range(len(models)):
+                    for j in range(len(models)):
+                        if i != j:
+                            ax.text(j, i, f'{values[i, j]:.2f}', ha='center', va='center', fontsize=8)
+            ax.set_xticks(range(len(models)))
+            ax.set_xticklabels(models, rotation=45, ha='right')
+            ax.set_yticks(range(len(models)))
+            ax.set_yticklabels(models)
+            ax.tick_params(colors='white')
+            colorbar = fig.colorbar(image, ax=ax)
+            colorbar.set_label(label, color='white')
+            colorbar.ax.yaxis.set_tick_params(color='white', labelcolor='white')
+            fig.tight_layout()
+            canvas.draw()
+
+        def on_click(event : MouseEvent):
+            if event.inaxes is None or event.inaxes is not fig.axes[0] or event.xdata is None:
+                return
+            i, j = int(round(event.ydata)), int(round(event.xdata))
+            if i == j or not (0 <= i < len(models) and 0 <= j < len(models)):
+                return
+            self.models = [models[i], models[j]]
+            plt.close(fig)
+            matrix_window.destroy()
+            self.refresh_visualizations()
+            self.update_recent_files()
+
+        canvas.mpl_connect('button_press_event', on_click)
+        update_plot()
+
+    def show_significance_window(self):
+        """Show a window to run paired significance tests on every quantile."""
+        significance_window = ctk.CTkToplevel(self)
+        significance_window.title("Paired Significance Tests")
+        significance_window.geometry("400x380")
+
+        ctk.CTkLabel(significance_window, text="Test:").pack(pady=(10, 0))
+        test_var = ctk.StringVar(value="Wilcoxon")
+        ctk.CTkComboBox(significance_window, values=["Wilcoxon", "Diebold-Mariano"], variable=test_var, state='readonly').pack(pady=5)
+
+        ctk.CTkLabel(significance_window, text="Loss:").pack()
+        loss_var = ctk.StringVar(value="absolute")
+        ctk.CTkComboBox(significance_window, values=["absolute", "squared"], variable=loss_var, state='readonly').pack(pady=5)
+
+        ctk.CTkLabel(significance_window, text="Multiple testing correction:").pack()
+        correction_var = ctk.StringVar(value="holm")
+        ctk.CTkComboBox(significance_window, values=["holm", "fdr_bh", "bonferroni", "none"], variable=correction_var, state='readonly').pack(pady=5)
+
+        alpha_frame = ctk.CTkFrame(significance_window, fg_color="transparent")
+        alpha_frame.pack(pady=5)
+        ctk.CTkLabel(alpha_frame, text="Significance level:").pack(side=tk.LEFT, padx=5)
+        alpha_entry = ctk.CTkEntry(alpha_frame, width=60)
+        alpha_entry.insert(0, '0.05')
+        alpha_entry.pack(side=tk.LEFT, padx=5)
+
+        all_pairs_var = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(significance_window, text="Test all model pairs", variable=all_pairs_var).pack(pady=5)
+
+        def run_and_close():
+            try:
+                alpha = float(alpha_entry.get())
+            except ValueError:
+                messagebox.showerror("Error", "The significance level must be a number.")
+                return
+            test = 'wilcoxon' if test_var.get() == "Wilcoxon" else 'dm'
+            self.compute_significance(test, loss_var.get(), correction_var.get(), alpha, all_pairs_var.get())
+            significance_window.destroy()
+
+        ctk.CTkButton(significance_window, text="Run tests", command=run_and_close).pack(pady=10)
+
+    def compute_significance(self, test='wilcoxon', loss='absolute', correction='holm', alpha=0.05, all_pairs=False):
+        """Run the paired tests on every quantile bucket of the quantile evolution plot."""
+        quantile = int(self.quantile_slider.get())
+        labels = self.get_bucket_index().labels(quantile)
+        if all_pairs:
+            errors = {model: self.data[f'error_{model}'].to_numpy() for model in self.all_models}
+            pairs = [tuple(self.models)] + [pair for pair in combinations(self.all_models, 2) if set(pair) != set(self.models)]
+            results = paired_tests_batch(errors, labels, quantile, pairs, test=test, loss=loss, correction=correction, alpha=alpha)
+        else:
+            results = paired_tests(self.data[f'error_{self.models[0]}'], self.data[f'error_{self.models[1]}'], labels, quantile,
+                                   test=test, loss=loss, correction=correction, alpha=alpha)
+            results.insert(0, 'model_2', self.models[1])
+            results.insert(0, 'model_1', self.models[0])
+        self.significance_results = {'quantiles': quantile, 'models': tuple(self.models), 'table': results}
+        self.plot_quantile_evolution(quantile, width=1)
+        self.show_significance_results()
+
+    def annotate_significance(self, quantile):
+        """Mark the quantiles where one of the compared models is significantly better."""
+        results = getattr(self, 'significance_results', None)
+        if results is None or results['quantiles'] != quantile or set(results['models']) != set(self.models):
+            return
+        table = results['table']
+        table = table[(table['model_1'] == self.models[0]) & (table['model_2'] == self.models[1]) |
+                      (table['model_1'] == self.models[1]) & (table['model_2'] == self.models[0])]
+        colors = {self.models[0]: 'tab:orange', self.models[1]: 'tab:green'}
+        transform = self.quantile_ax.get_xaxis_transform()
+        for _, row in table[table['significant']].iterrows():
+            winner = row['model_1'] if row['better'] == 1 else row['model_2']
+            self.quantile_ax.text(row['quantile'], 0.97, '*', transform=transform, ha='center', va='top',
+                                  fontsize=14, fontweight='bold', color=colors[winner])
+
+    def show_significance_results(self):
+        """Show the table of the paired tests with an export button."""
+        table = self.significance_results['table']
+        results_window = ctk.CTkToplevel(self)
+        results_window.title(f"Paired tests - {self.significance_results['quantiles']} quantiles")
+        results_window.geometry("900x500")
+
+        columns = ['model_1', 'model_2', 'quantile', 'n', 'mean_loss_diff', 'p_value', 'p_adjusted', 'better']
+        tree = Treeview(results_window, columns=columns, show='headings')
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, anchor='center', width=100)
+        for _, row in table.iterrows():
+            better = {0: '-', 1: row['model_1'], 2: row['model_2']}[row['better']]
+            tree.insert('', 'end', values=[row['model_1'], row['model_2'], row['quantile'], row['n'],
+                                           f"{row['mean_loss_diff']:.4f}", f"{row['p_value']:.3g}", f"{row['p_adjusted']:.3g}", better])
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        def export():
+            file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")],
+                                                     title="Save Significance Tests As", initialfile="significance_tests.csv")
+            if not file_path:
+                return
+            try:
+                table.to_csv(file_path, index=False, sep=';', decimal=',')
+            except Exception as e:
+                messagebox.showerror("Error", f"Unable to save the file:\n{e}")
+
+        ctk.CTkButton(results_window, text="Export", command=export).pack(pady=10)
+
+if __name__ == '__main__':
+    app = QuantileApp()
+    app.mainloop()
@@ -0,0 +1,25 @@
+__version__ = '1.0'
+
+from .binning import quantile_labels
+from .significance import paired_tests, paired_tests_batch, adjust_pvalues
+from .pairwise import pairwise_win_rates, overall_win_rates
+from .loading import CSVSource, downcast, memory_footprint, format_bytes, column_kind, file_fingerprint
+from .dataset import enable_copy_on_write, take, filter_mask, filter_rows, split_by_label, append_rows
+from .colstore import ColumnStore, ColumnStoreWriter
+from .catalog import Catalog
+from .ingest import Ingestion
+from .layout import IndividualLayout, timestep_window
+from .sketch import KLLSketch, sketch_buckets, boxplot_stats
+from .buckets import BucketIndex, box_stats
+from .watch import FileWatcher
+from .join import join_rows, JOIN_METHODS
+from .session import Session
+from .timing import StageTimings, timings
+from .domain import mahalanobis_distances, distance_percentiles, hull_edges, domain_view
+from .report import REPORT_METRICS, report_labels, base_scores, segment_sums, hybrid_scores, report_row
+from .cache import LRUCache, sizeof
+from .prefetch import Prefetcher
+from .analysis import Analysis
+from .reportstore import ReportStore
+from .reporting import ReportGeneration
+from .precompute import Precomputation
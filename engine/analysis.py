@@ -0,0 +1,282 @@
+import itertools
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .buckets import BucketIndex
+from .cache import LRUCache
+from .colstore import ColumnStore
+from .domain import mahalanobis_distances, distance_percentiles, hull_edges
+from .layout import IndividualLayout
+from .loading import CSVSource
+from . import report
+from .timing import timings
+
+def _bucket_extrema(values: np.ndarray, bounds: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Minimum and maximum of the values of every bucket (slices of values between consecutive bounds), NaN for empty buckets."""
+    values = np.asarray(values, dtype=np.float64)
+    empty = bounds[1:] == bounds[:-1]
+    if len(values) == 0:
+        return np.full(len(empty), np.nan), np.full(len(empty), np.nan)
+    starts = np.minimum(bounds[:-1], len(values) - 1)
+    low, high = np.fmin.reduceat(values, starts), np.fmax.reduceat(values, starts)
+    # reduceat gives the value at the start for empty buckets
+    return np.where(empty, np.nan, low), np.where(empty, np.nan, high)
+
+# Results shared by the interface and the API in a process
+results = LRUCache(max_entries=1024, max_bytes=1 << 30)
+_names = itertools.count()
+
+class Analysis:
+    """Computations behind the views of a result file loaded once: boxplot statistics of the quantile buckets of the quantile
+    evolution plot, rows of a bucket with their Mahalanobis distances and convex hull for the domain evolution plot, and metrics
+    of the models. The layout of the individuals and the sorted order of the buckets are built once, the results are kept
+    in an LRU cache shared by default by every analysis of the process. The target and individual column can be changed,
+    the structures that depend on them being built again on their next use. An analysis can be used from several threads."""
+    def __init__(self, data: pd.DataFrame, target_name: str, individual_name: str = None, name: str = None, cache: LRUCache = None,
+                 index_bytes: int = 512 << 20):
+        self.data = data
+        self.target_name = target_name
+        self.individual_name = individual_name
+        self.name = name if name is not None else f'analysis{next(_names)}'
+        self.cache = cache if cache is not None else results
+        self._layout = None
+        self._bucket_index = (None, None)
+        # Bucket indexes of the targets used or precomputed, so that going back to a target does not sort it again
+        self.indexes = LRUCache(max_entries=64, max_bytes=index_bytes)
+        self._lock = threading.RLock()
+        # Segments and sums of the comparison report saved on disk, see ReportStore
+        self.report_store = None
+
+    @classmethod
+    def load(cls, file_path: str, target_name: str, individual_name: str = None, models: list[str] = None, sep: str = ',',
+             has_index: bool = False, store_root: str = None, name: str = None, cache: LRUCache = None):
+        """Load the columns needed by the views from a result file, from its column store when one is up to date in store_root."""
+        store = ColumnStore.open(file_path, store_root, sep=sep, has_index=has_index) if store_root is not None else None
+        source = store if store is not None else CSVSource(file_path, sep=sep, has_index=has_index)
+        with timings.stage('ingestion'):
+            if store is not None:
+                columns = [col for col in store.columns if col in {target_name, individual_name} or col.startswith('error_')
+                           and (models is None or col[len('error_'):] in models)]
+                data = store.read(columns)
+            else:
+                data = source.read(source.load_profile(target_name, individual_name, models))
+        return cls(data, target_name, individual_name, name if name is not None else file_path, cache)
+
+    @property
+    def models(self) -> list[str]:
+        """Names of the models having an error column."""
+        return [col[len('error_'):] for col in self.data.columns if col.startswith('error_')]
+
+    @property
+    def key(self) -> tuple:
+        """Identify the dataset and the bucket keys in the cache."""
+        return (self.name, self.target_name, self.individual_name, len(self.data))
+
+    def errors(self, model: str) -> np.ndarray:
+        if f'error_{model}' not in self.data.columns:
+            raise KeyError(f'Unknown model: {model}')
+        return self.data[f'error_{model}'].to_numpy()
+
+    def layout(self) -> IndividualLayout:
+        """Per-individual layout of the rows, None without individual column."""
+        if self.individual_name is None:
+            return None
+        with self._lock:
+            if self._layout is None or self._layout.name != self.individual_name or len(self._layout) != len(self.data):
+                self._layout = IndividualLayout.from_frame(self.data, self.individual_name)
+            return self._layout
+
+    def _index_key(self) -> tuple:
+        # With an individual column, the buckets are the time steps whatever the target
+        return (None if self.individual_name is not None else self.target_name, self.individual_name, len(self.data))
+
+    def _stats_key(self) -> tuple:
+        # The boxplot statistics only depend on the buckets, shared by every target with an individual column
+        return (self.name, *self._index_key())
+
+    def bucket_index(self) -> BucketIndex:
+        """Rows sorted by the key of the quantile buckets (target, or time step within the individual),
+        sorted once per target so that changing the number of quantiles never sorts the data again.
+        The indexes of the previous targets are kept in indexes, up to its size."""
+        key = self._index_key()
+        with self._lock:
+            if self._bucket_index[0] != key:
+                index = self.indexes.get(key)
+                if index is None:
+                    layout = self.layout()
+                    if layout is not None:
+                        index = BucketIndex(np.where(layout.position < 0, np.nan, layout.position), ranked=False)
+                    else:
+                        index = BucketIndex(self.data[self.target_name].to_numpy(), ranked=True)
+                    self.indexes.put(key, index, size=index.nbytes)
+                self._bucket_index = (key, index)
+            return self._bucket_index[1]
+
+    def for_target(self, target_name: str, values=None):
+        """Analysis of the same data for another target, sharing the layout, the bucket indexes and the cache, so that
+        what it computes is found by this analysis once its target is changed. The values of the target can be given
+        when it is not a column of the data."""
+        data = self.data if values is None else self.data.assign(**{target_name: values})
+        other = Analysis(data, target_name, self.individual_name, self.name, self.cache)
+        other._layout, other.indexes = self.layout(), self.indexes
+        return other
+
+    def extend(self, data: pd.DataFrame):
+        """Use the data with rows appended at the end, merging them into the layout and the bucket index already built
+        instead of sorting all the rows again."""
+        with self._lock:
+            previous_rows = len(self.data)
+            self.data = data
+            if self._layout is not None and self._layout.name in data.columns and len(self._layout) == previous_rows:
+                self._layout.extend(data[self._layout.name].to_numpy()[previous_rows:])
+            key, index = self._bucket_index
+            if index is not None and key[2] == previous_rows:
+                target_name, individual_name, _ = key
+                if individual_name is not None:
+                    positions = self.layout().position[previous_rows:]
+                    index.extend(np.where(positions < 0, np.nan, positions))
+                else:
+                    index.extend(data[target_name].to_numpy()[previous_rows:])
+                self.indexes.discard(lambda other: other == key)
+                self._bucket_index = ((target_name, individual_name, len(data)), index)
+                self.indexes.put(self._bucket_index[0], index, size=index.nbytes)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """Arrays of the layout and of the bucket index built for the current data, target and individual column,
+        prefixed with 'layout.' and 'buckets.', to save them with a session."""
+        arrays = {}
+        if self._layout is not None and self._layout.name == self.individual_name and len(self._layout) == len(self.data):
+            arrays.update({f'layout.{name}': array for name, array in self._layout.to_arrays().items()})
+        if self._bucket_index[0] == self._index_key():
+            arrays.update({f'buckets.{name}': array for name, array in self._bucket_index[1].to_arrays().items()})
+        return arrays
+
+    def restore(self, layout: dict[str, np.ndarray] = None, buckets: dict[str, np.ndarray] = None, box_stats: dict[str, list] = None, quantiles: int = None):
+        """Use a layout and a bucket index saved with to_arrays for the current data, target and individual column,
+        and the boxplot statistics of models computed on quantiles with them."""
+        with self._lock:
+            if layout:
+                self._layout = IndividualLayout.from_arrays(layout, self.individual_name)
+            if buckets:
+                self._bucket_index = (self._index_key(), BucketIndex.from_arrays(buckets))
+                self.indexes.put(self._bucket_index[0], self._bucket_index[1], size=self._bucket_index[1].nbytes)
+                for model, stats in (box_stats or {}).items():
+                    self.cache.put(('box_stats', self._stats_key(), model, quantiles), stats)
+
+    def cached_box_stats(self, model: str, quantiles: int) -> list[dict]:
+        """Boxplot statistics of a model already computed, None when they are not in the cache."""
+        return self.cache.get(('box_stats', self._stats_key(), model, quantiles))
+
+    def box_stats(self, model: str, quantiles: int) -> list[dict]:
+        """Boxplot statistics of the errors of a model on every quantile, as drawn by the quantile evolution plot."""
+        def compute():
+            with timings.stage('quantile_binning'):
+                stats = self.bucket_index().box_stats(f'error_{model}', self.errors(model), quantiles)
+            return [{'med': float(stats['med'][b]), 'q1': float(stats['q1'][b]), 'q3': float(stats['q3'][b]), 'whislo': float(stats['whislo'][b]),
+                     'whishi': float(stats['whishi'][b]), 'fliers': [], 'n': int(stats['n'][b])} for b in range(quantiles)]
+        return self.cache.get_or_compute(('box_stats', self._stats_key(), model, quantiles), compute)
+
+    def precompute(self, models: list[str], quantiles: list[int]):
+        """Build the bucket index and the boxplot statistics of the models on every number of quantiles given, ahead of their use."""
+        index = self.bucket_index()
+        for count in quantiles:
+            for model in models:
+                self.box_stats(model, count)
+        # The columns reordered for the statistics are counted in the size of the index
+        self.indexes.put(self._index_key(), index, size=index.nbytes)
+
+    def quantile_stats(self, models: list[str], quantiles: int) -> pd.DataFrame:
+        """Statistics of the errors of the models on every quantile, one row per quantile and model: boxplot statistics,
+        range of the target, number of rows, mean error, MAE and RMSE. They are computed for all the quantiles at once,
+        from the values sorted once per column and from prefix sums."""
+        return self.cache.get_or_compute(('quantile_stats', self.key, tuple(models), quantiles), lambda: self._quantile_stats(models, quantiles))
+
+    def _quantile_stats(self, models: list[str], quantiles: int) -> pd.DataFrame:
+        index = self.bucket_index()
+        bounds = index.bounds(quantiles)
+        target_min, target_max = _bucket_extrema(index.sorted_values(self.target_name, self.data[self.target_name].to_numpy()), bounds)
+        tables = []
+        for model in models:
+            stats = index.box_stats(f'error_{model}', self.errors(model), quantiles)
+            sums = index.sums(f'error_{model}', self.errors(model), quantiles)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                tables.append(pd.DataFrame({
+                    'quantile': np.arange(1, quantiles + 1), 'model': model, 'count': sums['count'],
+                    'target_min': target_min, 'target_max': target_max,
+                    'median': stats['med'], 'q1': stats['q1'], 'q3': stats['q3'], 'whislo': stats['whislo'], 'whishi': stats['whishi'],
+                    'mean': sums['sum'] / sums['count'], 'MAE': sums['abs_sum'] / sums['count'],
+                    'RMSE': np.sqrt(sums['squared_sum'] / sums['count'])}))
+        return pd.concat(tables, ignore_index=True)
+
+    def quantile_tables(self, models: list[str], quantiles) -> pd.DataFrame:
+        """quantile_stats for every number of quantiles given (for instance range(1, 101)) in a single table, whose first
+        column holds the number of quantiles. The tables already in the cache are reused, the other ones are not kept."""
+        tables = []
+        with timings.stage('quantile_tables'):
+            for count in quantiles:
+                table = self.cache.get(('quantile_stats', self.key, tuple(models), count))
+                tables.append((table if table is not None else self._quantile_stats(models, count)).assign(quantiles=count))
+        table = pd.concat(tables, ignore_index=True)
+        return table[['quantiles'] + [col for col in table.columns if col != 'quantiles']]
+
+    def bucket_rows(self, quantiles: int, bucket: int) -> np.ndarray:
+        """Positions of the rows of a bucket (1 to quantiles) in file order, all the rows with a single quantile."""
+        if quantiles <= 1:
+            return np.arange(len(self.data))
+        if not 1 <= bucket <= quantiles:
+            raise ValueError(f'The bucket must be between 1 and {quantiles}')
+        index = self.bucket_index()
+        bounds = index.bounds(quantiles)
+        return np.sort(index.order[bounds[bucket - 1]:bounds[bucket]])
+
+    def domain(self, models: list[str], quantiles: int, bucket: int) -> dict[str, np.ndarray]:
+        """Points of a bucket in the domain evolution plot: rows, errors of both models, their median, and the Mahalanobis
+        distance of every point to the median with its percentile."""
+        def compute():
+            rows = self.bucket_rows(quantiles, bucket)
+            points = np.column_stack([self.errors(model)[rows] for model in models[:2]]).astype(np.float64)
+            with timings.stage('mahalanobis'):
+                center, distances = mahalanobis_distances(points) if len(points) > 2 else (np.nanmedian(points, axis=0), np.zeros(len(points)))
+                percentiles = distance_percentiles(distances)
+            return {'rows': rows, 'points': points, 'center': center, 'distances': distances, 'percentiles': percentiles}
+        return self.cache.get_or_compute(('domain', self.key, tuple(models[:2]), quantiles, bucket), compute)
+
+    def hull(self, models: list[str], quantiles: int, bucket: int, percentage: float) -> np.ndarray:
+        """Edges of the convex hull of the percentage of the points of a bucket closest to their median."""
+        def compute():
+            domain = self.domain(models, quantiles, bucket)
+            with timings.stage('convex_hull'):
+                return hull_edges(domain['points'], domain['distances'], percentage)
+        return self.cache.get_or_compute(('hull', self.key, tuple(models[:2]), quantiles, bucket, float(percentage)), compute)
+
+    def scores(self, model: str) -> dict[str, float]:
+        """RMSE and MAE of a model on all the rows."""
+        return self.cache.get_or_compute(('scores', self.key, model), lambda: report.base_scores(self.errors(model)))
+
+    def metrics(self, models: list[str] = None) -> pd.DataFrame:
+        """RMSE and MAE of the models (all by default) on all the rows, one row per model."""
+        models = self.models if models is None else models
+        return pd.DataFrame([{'model': model, **self.scores(model)} for model in models])
+
+    def report_row(self, variable: str, models: list[str], quantiles: int = 10, values=None) -> dict:
+        """Row of the comparison report of two models for a domain variable of the data: scores of the hybrid oracle taking
+        the best model on every segment of the variable, gain over the best model and scores of both models.
+        The values of the variable, one per row of the data, can be given when it is not a column of the data."""
+        def compute():
+            store = self.report_store
+            if store is None:
+                with timings.stage('report_segments'):
+                    labels = report.report_labels(self.data[variable] if values is None else values, quantiles)
+                    sums = tuple(report.segment_sums(labels, self.errors(model)) for model in models[:2])
+                return report.report_row(variable, models[:2], {model: self.scores(model) for model in models[:2]}, sums)
+            with timings.stage('report_segments'):
+                sums = store.segment_sums(variable, models[:2], quantiles, lambda: self.data[variable] if values is None else values, self.errors)
+            return report.report_row(variable, models[:2], {model: store.scores(model, lambda: self.scores(model)) for model in models[:2]}, sums)
+        return self.cache.get_or_compute(('report_row', self.key, variable, tuple(models[:2]), quantiles), compute)
+
+    def report_saved(self, variable: str, models: list[str], quantiles: int = 10) -> bool:
+        """Whether the row of the comparison report for a variable is computed without reading the variable, its segments
+        or sums being saved in the report store."""
+        return self.report_store is not None and self.report_store.contains(variable, models[:2], quantiles)
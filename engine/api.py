@@ -0,0 +1,103 @@
+"""
+Computations of DEPlot on a dataframe, without any window, for notebooks and evaluation pipelines. The dataframe holds a target
+column, an optional individual column and the errors error_<model> of the models (prediction - target). The results are the
+numbers drawn by the interface, computed by the same engine and kept in the same cache: the structures built for a dataframe
+(individual layout, sorted order of the buckets) and the results are reused by the next calls on that dataframe, which must
+not be modified in place meanwhile. An Analysis, such as the one of the interface, can be given instead of the dataframe.
+
+    from engine import api
+    stats = api.quantile_stats(data, 'RUL', 'unit', ['model0', 'model1'], quantiles=20)
+    points = api.domain(data, 'RUL', 'unit', ['model0', 'model1'], quantiles=20, bucket=3)
+"""
+import numpy as np
+import pandas as pd
+
+from .analysis import Analysis
+from .cache import LRUCache
+
+# Analyses of the last dataframes given, so that their sorted orders are built once
+_analyses = LRUCache(max_entries=8)
+
+def analysis(data, target: str = None, individual: str = None) -> Analysis:
+    """Get the analysis of a dataframe for a target and an individual column, built on the first call only."""
+    if isinstance(data, Analysis):
+        return data
+    key = (id(data), target, individual)
+    found = _analyses.get(key)
+    if found is None or found.data is not data:
+        found = Analysis(data, target, individual)
+        _analyses.put(key, found, size=0)
+    return found
+
+def _models(found: Analysis, models: list[str], count: int = None) -> list[str]:
+    models = found.models if models is None else list(models)
+    unknown = [model for model in models if model not in found.models]
+    if unknown:
+        raise KeyError(f'No error column for the models: {", ".join(unknown)}')
+    if count is not None and len(models) < count:
+        raise ValueError(f'{count} models are needed, got {len(models)}')
+    return models if count is None else models[:count]
+
+def box_stats(data, target: str = None, individual: str = None, models: list[str] = None, quantiles: int = 10) -> dict[str, list[dict]]:
+    """Boxplot statistics of the errors of the models (all by default) on every quantile, as given to Axes.bxp
+    by the quantile evolution plot."""
+    found = analysis(data, target, individual)
+    return {model: found.box_stats(model, quantiles) for model in _models(found, models)}
+
+def quantile_stats(data, target: str = None, individual: str = None, models: list[str] = None, quantiles: int = 10) -> pd.DataFrame:
+    """Statistics of the errors of the models (all by default) on every quantile, one row per quantile and model:
+    number of rows, range of the target, median, quartiles, whiskers, mean error, MAE and RMSE."""
+    found = analysis(data, target, individual)
+    return found.quantile_stats(_models(found, models), quantiles)
+
+def quantile_labels(data, target: str = None, individual: str = None, quantiles: int = 10) -> np.ndarray:
+    """Quantile of every row (1 to quantiles), 0 for rows with a missing target or without individual."""
+    return analysis(data, target, individual).bucket_index().labels(quantiles)
+
+def domain(data, target: str = None, individual: str = None, models: list[str] = None, quantiles: int = 1, bucket: int = 1) -> pd.DataFrame:
+    """Points of the domain evolution plot of two models (the first two by default) on a quantile (all the rows with a single
+    quantile): errors of both models, Mahalanobis distance to their median and percentile of the distance, one row per row
+    of the data in the quantile, with its index."""
+    found = analysis(data, target, individual)
+    models = _models(found, models, 2)
+    result = found.domain(models, quantiles, bucket)
+    return pd.DataFrame({f'error_{models[0]}': result['points'][:, 0], f'error_{models[1]}': result['points'][:, 1],
+                         'distance': result['distances'], 'percentile': result['percentiles']},
+                        index=found.data.index[result['rows']])
+
+def hull(data, target: str = None, individual: str = None, models: list[str] = None, quantiles: int = 1, bucket: int = 1,
+         percentage: float = 80) -> np.ndarray:
+    """Convex hull of the percentage of the points of a quantile closest to their median, as the array of its edges
+    (edge, vertex, coordinate) drawn by the domain evolution plot."""
+    found = analysis(data, target, individual)
+    return found.hull(_models(found, models, 2), quantiles, bucket, percentage)
+
+def metrics(data, target: str = None, individual: str = None, models: list[str] = None) -> pd.DataFrame:
+    """RMSE and MAE of the models (all by default) on all the rows, one row per model."""
+    found = analysis(data, target, individual)
+    return found.metrics(_models(found, models)).set_index('model')
+
+def hybrid_report(data, target: str = None, individual: str = None, models: list[str] = None, variables: list[str] = None,
+                  quantiles: int = 10) -> pd.DataFrame:
+    """Comparison report of two models (the first two by default), one row per domain variable (all the columns other than
+    the target, the errors and the predictions by default): scores of the hybrid oracle taking the best model on every segment
+    of the variable, gain over the best model and scores of both models, as saved by the interface."""
+    found = analysis(data, target, individual)
+    models = _models(found, models, 2)
+    if variables is None:
+        variables = sorted(col for col in found.data.columns if col != found.target_name and not col.startswith('error_') and not col.startswith('Unnamed')
+                           and not any(col.endswith(f'_{model}') for model in found.models))
+    return pd.DataFrame([found.report_row(variable, models, quantiles) for variable in variables]).set_index('Variable')
+
+def export_quantile_stats(file_path: str, data, target: str = None, individual: str = None, models: list[str] = None,
+                          quantiles=range(1, 101), **csv_options) -> pd.DataFrame:
+    """Write quantile_stats for every number of quantiles given, in a single table whose column quantiles holds the number
+    of quantiles, to a Parquet file (.parquet, which needs pyarrow or fastparquet) or to a CSV file written with csv_options.
+    Returns the table."""
+    found = analysis(data, target, individual)
+    table = found.quantile_tables(_models(found, models), [quantiles] if isinstance(quantiles, int) else quantiles)
+    if file_path.lower().endswith('.parquet'):
+        table.to_parquet(file_path, index=False)
+    else:
+        table.to_csv(file_path, index=False, **csv_options)
+    return table
@@ -0,0 +1,15 @@
+import numpy as np
+import pandas as pd
+
+def quantile_labels(data: pd.DataFrame, target_name: str, individual_name: str = None, quantiles: int = 10, positions: np.ndarray = None) -> np.ndarray:
+    """Assign every row to its data quantile (1 to quantiles) as done by the quantile evolution plot.
+    Without an individual column the rows are ranked by target value, otherwise by time step within each individual.
+    positions can hold the time steps already computed by an IndividualLayout, instead of counting them again.
+    Rows with a missing target, or without individual, get the label 0."""
+    if individual_name is None:
+        labels = pd.qcut(data[target_name].rank(method='first'), quantiles, labels=False)
+    else:
+        if positions is None:
+            positions = data.groupby(individual_name).cumcount()
+        labels = pd.qcut(np.where(np.asarray(positions) < 0, np.nan, positions), quantiles, labels=False)
+    return np.nan_to_num(np.asarray(labels, dtype=np.float64), nan=-1).astype(np.int64) + 1
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+
+# pd.qcut takes the quantiles with np.quantile from pandas 3, with np.percentile (probabilities times 100) before
+_PERCENT = int(pd.__version__.split('.')[0]) < 3
+
+def _lerp(low: np.ndarray, high: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Linear interpolation computed as numpy does for percentiles, so that the edges are the same as pd.qcut ones."""
+    diff = high - low
+    return np.where(t >= 0.5, high - diff * (1 - t), low + diff * t)
+
+class BucketIndex:
+    """Rows sorted once by the key ranked to build the quantile buckets, so that every bucket is a contiguous slice of the order.
+    With ranked keys (the target), rows are ranked as rank(method='first') does, ties being split by row order. Otherwise
+    (the time steps) the buckets are cut on the key values as pd.qcut does. Both give the labels of quantile_labels.
+    Changing the number of buckets only costs a binary search per edge, and the statistics of a bucket are read
+    from the values of a column reordered once, without any sort."""
+    def __init__(self, keys: np.ndarray, ranked: bool = True):
+        keys = np.asarray(keys, dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(keys))
+        self.order = valid[np.argsort(keys[valid], kind='stable')]
+        self.n_rows = len(keys)
+        self.ranked = ranked
+        self.key_values = keys[self.order]
+        self.sorted_keys = np.arange(1, len(self.order) + 1, dtype=np.float64) if ranked else self.key_values
+        self._bounds = {}
+        self._sorted = {}
+        self._prefix = {}
+        self._by_value = {}
+
+    def extend(self, keys: np.ndarray):
+        """Add rows appended at the end of the dataset, merging their keys into the order instead of sorting it again.
+        The reordered columns and prefix sums are dropped, they are built again on their next use."""
+        keys = np.asarray(keys, dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(keys))
+        chunk_order = valid[np.argsort(keys[valid], kind='stable')]
+        # Equal keys already known keep their rank before the new rows, as rank(method='first') does
+        insert_at = np.searchsorted(self.key_values, keys[chunk_order], side='right')
+        self.order = np.insert(self.order, insert_at, self.n_rows + chunk_order)
+        self.key_values = np.insert(self.key_values, insert_at, keys[chunk_order])
+        self.sorted_keys = np.arange(1, len(self.order) + 1, dtype=np.float64) if self.ranked else self.key_values
+        self.n_rows += len(keys)
+        self._bounds, self._sorted, self._prefix, self._by_value = {}, {}, {}, {}
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the order, the keys and the columns reordered so far."""
+        arrays = [self.order, self.key_values] + ([self.sorted_keys] if self.ranked else []) + list(self._sorted.values())
+        arrays += [array for prefix in self._prefix.values() for array in prefix.values()]
+        arrays += [array for by_value in self._by_value.values() for array in by_value]
+        return sum(array.nbytes for array in arrays)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """Arrays describing the index and the bucket edges already found, to save it with a session."""
+        arrays = {'order': self.order, 'key_values': self.key_values, 'shape': np.array([self.n_rows, self.ranked])}
+        arrays.update({f'bounds_{quantiles}': bounds for quantiles, bounds in self._bounds.items()})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]):
+        """Rebuild an index saved with to_arrays, without sorting the rows again."""
+        index = cls.__new__(cls)
+        index.order = arrays['order']
+        index.key_values = arrays['key_values']
+        index.n_rows, index.ranked = int(arrays['shape'][0]), bool(arrays['shape'][1])
+        index.sorted_keys = np.arange(1, len(index.order) + 1, dtype=np.float64) if index.ranked else index.key_values
+        index._bounds = {int(name.split('_')[1]): bounds for name, bounds in arrays.items() if name.startswith('bounds_')}
+        index._sorted = {}
+        index._prefix = {}
+        index._by_value = {}
+        return index
+
+    def bounds(self, quantiles: int) -> np.ndarray:
+        """Start of every bucket in the order, followed by the number of ranked rows."""
+        if quantiles not in self._bounds:
+            n = len(self.order)
+            bounds = np.zeros(quantiles + 1, dtype=np.int64)
+            if n > 0:
+                # Same probabilities and interpolation as pd.qcut, so that the edges are equal to the last bit
+                probabilities = np.linspace(0, 1, quantiles + 1)
+                np.putmask(probabilities, quantiles * probabilities != np.arange(quantiles + 1), np.nextafter(probabilities, 1))
+                if _PERCENT:
+                    probabilities = probabilities * 100 / 100
+                virtual = (n - 1) * probabilities
+                low = np.floor(virtual).astype(np.int64)
+                high = np.minimum(low + 1, n - 1)
+                edges = _lerp(self.sorted_keys[low], self.sorted_keys[high], virtual - low)
+                bounds[1:-1] = np.searchsorted(self.sorted_keys, edges[1:-1], side='right')
+                bounds[-1] = n
+            self._bounds[quantiles] = bounds
+        return self._bounds[quantiles]
+
+    def labels(self, quantiles: int) -> np.ndarray:
+        """Bucket of every row (1 to quantiles), 0 for rows with a missing key."""
+        labels = np.zeros(self.n_rows, dtype=np.int64)
+        labels[self.order] = np.repeat(np.arange(1, quantiles + 1), np.diff(self.bounds(quantiles)))
+        return labels
+
+    def sorted_values(self, name: str, values: np.ndarray = None) -> np.ndarray:
+        """Values of a column in the order of the buckets, reordered on the first call only."""
+        if name not in self._sorted:
+            self._sorted[name] = np.asarray(values)[self.order]
+        return self._sorted[name]
+
+    def buckets(self, name: str, values: np.ndarray = None, quantiles: int = 10) -> list[np.ndarray]:
+        """Values of a column on every bucket, as views of the reordered column."""
+        values = self.sorted_values(name, values)
+        bounds = self.bounds(quantiles)
+        return [values[bounds[b]:bounds[b + 1]] for b in range(quantiles)]
+
+    def sums(self, name: str, values: np.ndarray = None, quantiles: int = 10) -> dict[str, np.ndarray]:
+        """Number of rows and sums of e, |e| and e² of a column on every bucket, read from prefix sums built once per column."""
+        if name not in self._prefix:
+            sorted_values = self.sorted_values(name, values).astype(np.float64)
+            self._prefix[name] = {key: np.concatenate(([0], np.cumsum(array))) for key, array in
+                                  (('sum', sorted_values), ('abs_sum', np.abs(sorted_values)), ('squared_sum', sorted_values ** 2))}
+        bounds = self.bounds(quantiles)
+        result = {key: prefix[bounds[1:]] - prefix[bounds[:-1]] for key, prefix in self._prefix[name].items()}
+        result['count'] = np.diff(bounds)
+        return result
+
+    def sorted_by_value(self, name: str, values: np.ndarray = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Positions in the order of the buckets of the values of a column that are not missing, sorted by value,
+        these values, and the positions of the missing values, found on the first call only."""
+        if name not in self._by_value:
+            sorted_values = self.sorted_values(name, values)
+            missing = np.isnan(sorted_values)
+            valid = np.flatnonzero(~missing)
+            positions = valid[np.argsort(sorted_values[valid], kind='stable')]
+            self._by_value[name] = (positions, sorted_values[positions].astype(np.float64), np.flatnonzero(missing))
+        return self._by_value[name]
+
+    def box_stats(self, name: str, values: np.ndarray = None, quantiles: int = 10, whis: float = 1.5) -> dict[str, np.ndarray]:
+        """Statistics of box_stats for a column on every bucket at once, as arrays (med, q1, q3, whislo, whishi, n).
+        The values sorted once by value are grouped by bucket with a stable counting sort, which keeps them sorted within
+        every bucket: quartiles and whiskers are then read at their rank in the bucket, without sorting nor copying the values."""
+        positions, by_value, missing = self.sorted_by_value(name, values)
+        bounds = self.bounds(quantiles)
+        bucket = np.repeat(np.arange(quantiles, dtype=np.min_scalar_type(quantiles)), np.diff(bounds))[positions]
+        # Stable sorts of small integers are radix sorts, in linear time
+        grouped = np.argsort(bucket, kind='stable')
+        counts = np.diff(bounds) - np.bincount(np.searchsorted(bounds, missing, side='right') - 1, minlength=quantiles)
+        stats = {'n': counts}
+        if len(grouped) == 0:
+            stats.update({key: np.full(quantiles, np.nan) for key in ('med', 'q1', 'q3', 'whislo', 'whishi')})
+            return stats
+        empty = counts == 0
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        safe_starts = np.minimum(starts, len(grouped) - 1)
+        last = np.maximum(counts - 1, 0)
+        for key, probability in (('q1', 0.25), ('med', 0.5), ('q3', 0.75)):
+            # Same positions and interpolation as np.percentile
+            virtual = last * probability
+            low = np.floor(virtual).astype(np.int64)
+            high = np.minimum(low + 1, last)
+            stats[key] = np.where(empty, np.nan, _lerp(by_value[grouped[safe_starts + low]], by_value[grouped[safe_starts + high]], virtual - low))
+        iqr = stats['q3'] - stats['q1']
+        # Within a bucket, the ranks in by_value are increasing: the whiskers are the first rank above the low fence
+        # and the last rank below the high fence
+        low_ranks = np.searchsorted(by_value, stats['q1'] - whis * iqr, side='left')
+        high_ranks = np.searchsorted(by_value, stats['q3'] + whis * iqr, side='right')
+        whislo, whishi = np.array(stats['q1']), np.array(stats['q3'])
+        for b in np.flatnonzero(~empty):
+            ranks = grouped[starts[b]:ends[b]]
+            first, stop = np.searchsorted(ranks, low_ranks[b]), np.searchsorted(ranks, high_ranks[b])
+            if first < len(ranks):
+                whislo[b] = min(whislo[b], by_value[ranks[first]])
+            if stop > 0:
+                whishi[b] = max(whishi[b], by_value[ranks[stop - 1]])
+        stats['whislo'], stats['whishi'] = whislo, whishi
+        return stats
+
+def box_stats(values: np.ndarray, whis: float = 1.5) -> dict:
+    """Statistics drawn by Axes.bxp for the values of a bucket, the same as Axes.boxplot without fliers.
+    Quartiles are found by selection (np.percentile), in linear time."""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {'med': np.nan, 'q1': np.nan, 'q3': np.nan, 'whislo': np.nan, 'whishi': np.nan, 'fliers': [], 'n': 0}
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    low, high = values[values >= q1 - whis * iqr], values[values <= q3 + whis * iqr]
+    return {'med': median, 'q1': q1, 'q3': q3, 'whislo': min(q1, low.min()) if len(low) else q1, 'whishi': max(q3, high.max()) if len(high) else q3,
+            'fliers': [], 'n': len(values)}
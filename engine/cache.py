@@ -0,0 +1,96 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+def sizeof(value) -> int:
+    """Approximate number of bytes held by a computed result: arrays, dataframes and the containers holding them."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage())
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+class LRUCache:
+    """Results of the computations shared by every view, the least recently used ones being dropped beyond max_entries
+    entries or max_bytes bytes (no limit with None). It can be used from several threads."""
+    def __init__(self, max_entries: int = 256, max_bytes: int = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Get a result, marking it as the most recently used one."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value, size: int = None):
+        """Keep a result, dropping the least recently used ones when the cache is full.
+        A result larger than max_bytes on its own is not kept."""
+        size = sizeof(value) if size is None else size
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                self.nbytes -= self._entries.popitem(last=False)[1][1]
+
+    def get_or_compute(self, key, compute):
+        """Get a result, computing and keeping it on a miss."""
+        value = self.get(key, self)
+        if value is self:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def discard(self, predicate):
+        """Drop the results whose key matches a predicate, for instance the ones of a dataset that changed."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self.nbytes -= self._entries.pop(key)[1]
+
+    def resize(self, max_entries: int = None, max_bytes: int = None):
+        """Change the limits of the cache (no byte limit with max_bytes None), dropping the least recently used results beyond them."""
+        with self._lock:
+            self.max_entries = self.max_entries if max_entries is None else max_entries
+            self.max_bytes = max_bytes
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                self.nbytes -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        """Number of entries, bytes, hits and misses of the cache."""
+        return {'entries': len(self._entries), 'bytes': self.nbytes, 'max_entries': self.max_entries, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,141 @@
+import json
+import os
+
+import pandas as pd
+
+from .loading import column_kind, file_fingerprint, store_path_for
+
+class Catalog:
+    """Summary of the columns of a dataset (type, min/max, categories, number of distinct and missing values,
+    time steps per individual), built incrementally from the chunks of the file so that the widgets never rescan the data."""
+    def __init__(self, individual_name: str = None, max_categories: int = 1000):
+        self.individual_name = individual_name
+        self.max_categories = max_categories
+        self.rows = 0
+        self.columns = {}
+        self.individual_lengths = {}
+        self._distinct = {}
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, individual_name: str = None):
+        """Build the catalog of a dataframe already in memory."""
+        catalog = cls(individual_name)
+        catalog.update(data)
+        return catalog
+
+    @classmethod
+    def open(cls, file_path: str, root: str, individual_name: str = None):
+        """Open the catalog saved for a file, or return None when there is none, when the file changed since
+        or when the lengths were counted for another individual column."""
+        try:
+            with open(store_path_for(file_path, root) + '.json', 'r') as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if content.get('source') != file_fingerprint(file_path) or content.get('individual_name') != individual_name:
+            return None
+        return cls.from_dict(content)
+
+    def save(self, file_path: str, root: str):
+        """Save the catalog of a file inside the root directory of the catalogs."""
+        os.makedirs(root, exist_ok=True)
+        with open(store_path_for(file_path, root) + '.json', 'w') as f:
+            json.dump({**self.to_dict(), 'source': file_fingerprint(file_path)}, f)
+
+    def update(self, chunk: pd.DataFrame):
+        """Add the rows of a chunk to the summary."""
+        self.add_columns(chunk)
+        if self.individual_name is not None and self.individual_name in chunk.columns:
+            for individual, length in chunk[self.individual_name].value_counts(sort=False).items():
+                key = str(individual)
+                self.individual_lengths[key] = self.individual_lengths.get(key, 0) + int(length)
+        self.rows += len(chunk)
+
+    def add_columns(self, chunk: pd.DataFrame):
+        """Summarize the columns of a chunk, for instance columns loaded after the catalog was built."""
+        for col in chunk.columns:
+            series = chunk[col]
+            info = self.columns.setdefault(col, {})
+            if 'dtype' not in info or pd.api.types.is_float_dtype(series):
+                info['dtype'] = str(series.dtype)
+            info.setdefault('kind', column_kind(series, col))
+            info['nulls'] = info.get('nulls', 0) + int(series.isna().sum())
+            if series.isna().all():
+                info.setdefault('cardinality', 0)
+                continue
+            if info['kind'] == 'numerical':
+                if pd.api.types.is_integer_dtype(series):
+                    low, high = int(series.min()), int(series.max())
+                else:
+                    low, high = float(series.min()), float(series.max())
+                info['min'] = low if info.get('min') is None else min(info['min'], low)
+                info['max'] = high if info.get('max') is None else max(info['max'], high)
+            elif info['kind'] == 'datetime':
+                dates = pd.to_datetime(series, errors='coerce')
+                if dates.notna().any():
+                    low, high = dates.min().isoformat(), dates.max().isoformat()
+                    info['min_date'] = low if info.get('min_date') is None else min(info['min_date'], low)
+                    info['max_date'] = high if info.get('max_date') is None else max(info['max_date'], high)
+            if info['kind'] == 'categorical':
+                if 'categories' not in info or info['categories'] is not None:
+                    categories = info.get('categories') or []
+                    known = set(categories)
+                    categories += [value for value in pd.unique(series.dropna()) if value not in known]
+                    info['categories'] = categories if len(categories) <= self.max_categories else None
+                info['cardinality'] = None if info['categories'] is None else len(info['categories'])
+            elif 'cardinality' not in info or info['cardinality'] is not None:
+                # Distinct values are only counted up to max_categories, a larger cardinality is reported as None
+                distinct = self._distinct.setdefault(col, set())
+                distinct.update(pd.unique(series.dropna().to_numpy()))
+                if len(distinct) > self.max_categories:
+                    del self._distinct[col]
+                    info['cardinality'] = None
+                else:
+                    info['cardinality'] = len(distinct)
+
+    def __contains__(self, col: str) -> bool:
+        return col in self.columns
+
+    def kind(self, col: str):
+        """Return the kind of a column ('categorical', 'numerical', 'datetime' or 'other'), or None when the column is not summarized."""
+        return self.columns.get(col, {}).get('kind')
+
+    def min_max(self, col: str):
+        """Return the minimum and maximum of a numerical column, or None when the column is not summarized."""
+        info = self.columns.get(col, {})
+        if info.get('min') is None:
+            return None
+        return info['min'], info['max']
+
+    def min_max_dates(self, col: str):
+        """Return the first and last dates of a datetime column, or None when the column is not summarized."""
+        info = self.columns.get(col, {})
+        if info.get('min_date') is None:
+            return None
+        return pd.Timestamp(info['min_date']), pd.Timestamp(info['max_date'])
+
+    def categories(self, col: str):
+        """Return the categories of a text column, or None when the column is not summarized or has too many values."""
+        return self.columns.get(col, {}).get('categories')
+
+    @property
+    def max_timesteps(self):
+        """Maximum number of time steps of an individual, or the number of rows without individuals."""
+        if self.individual_name is None or not self.individual_lengths:
+            return self.rows
+        return max(self.individual_lengths.values())
+
+    def to_dict(self) -> dict:
+        """Convert the catalog to a JSON serializable dictionary."""
+        columns = {col: {key: (list(map(str, value)) if key == 'categories' and value is not None else value) for key, value in info.items()}
+                   for col, info in self.columns.items()}
+        return {'individual_name': self.individual_name, 'rows': self.rows, 'columns': columns, 'individual_lengths': self.individual_lengths}
+
+    @classmethod
+    def from_dict(cls, content: dict):
+        """Rebuild a catalog saved with to_dict."""
+        catalog = cls(content['individual_name'])
+        catalog.rows = content['rows']
+        catalog.columns = content['columns']
+        catalog.individual_lengths = content['individual_lengths']
+        return catalog
@@ -0,0 +1,215 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .catalog import Catalog
+from .loading import CSVSource, file_fingerprint, store_path_for
+
+INDEX_COLUMN = '__index__'
+
+def codes_dtype(n_categories: int) -> np.dtype:
+    """Smallest integer type able to hold the codes of a categorical column, as chosen by pandas."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+class ColumnStore:
+    """A result file converted once into one raw binary file per column, opened with np.memmap.
+    Opening a store only maps the files: the pages of a column are read by the operating system when a view touches them.
+    Text columns are stored as categorical codes, error columns as float32."""
+    META = 'meta.json'
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, self.META), 'r') as f:
+            self.meta = json.load(f)
+        self.rows = self.meta['rows']
+        self.columns = [col for col in self.meta['columns'] if col != INDEX_COLUMN]
+        self.has_index = INDEX_COLUMN in self.meta['columns']
+
+    @classmethod
+    def open(cls, file_path: str, root: str, sep: str = ',', has_index: bool = False):
+        """Open the store of a file, or return None when it does not exist or is out of date."""
+        path = store_path_for(file_path, root)
+        try:
+            store = cls(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        expected = {**file_fingerprint(file_path), 'sep': sep, 'has_index': has_index}
+        if store.meta.get('source') != expected:
+            return None
+        return store
+
+    @classmethod
+    def build(cls, file_path: str, root: str, sep: str = ',', has_index: bool = False, chunksize: int = 500_000):
+        """Convert a CSV file into a column store, reading it chunk by chunk."""
+        writer = ColumnStoreWriter.for_file(file_path, root, sep, has_index)
+        for chunk, _ in CSVSource(file_path, sep=sep, has_index=has_index).read_chunks(chunksize=chunksize):
+            writer.append(chunk)
+        return writer.close()
+
+    @property
+    def catalog(self):
+        """The catalog of the columns written with the store, or None for stores built without one."""
+        if 'catalog' not in self.meta:
+            return None
+        return Catalog.from_dict(self.meta['catalog'])
+
+    def array(self, column: str) -> np.ndarray:
+        """Map a column file in memory (read only)."""
+        info = self.meta['columns'][column]
+        if self.rows == 0:
+            return np.empty(0, dtype=info['dtype'])
+        return np.memmap(os.path.join(self.path, info['file']), dtype=info['dtype'], mode='r', shape=(self.rows,))
+
+    def series(self, column: str) -> pd.Series:
+        """Build a pandas series backed by the mapped file of a column."""
+        info = self.meta['columns'][column]
+        values = self.array(column)
+        if 'categories' in info:
+            values = pd.Categorical.from_codes(values, categories=info['categories'])
+        elif info.get('datetime'):
+            values = values.view('datetime64[ns]')
+        return pd.Series(values, name=column, copy=False)
+
+    def read(self, columns: list[str], nrows: int = None) -> pd.DataFrame:
+        """Build a dataframe of the given columns without loading them in memory."""
+        columns = [col for col in self.columns if col in set(columns)]
+        data = pd.DataFrame({col: self.series(col) for col in columns}, copy=False)
+        if self.has_index:
+            data.index = self.series(INDEX_COLUMN).rename(None)
+        if nrows is not None:
+            data = data.iloc[:nrows]
+        return data
+
+    def sample(self, nrows: int = 1000) -> pd.DataFrame:
+        """Read the first rows of every column."""
+        return self.read(self.columns, nrows=nrows)
+
+    def load_profile(self, target_name: str, individual_name: str = None, models: list[str] = None, variables: list[str] = ()) -> list[str]:
+        """Every column can be mapped at no cost, so the load profile of a store is the whole file."""
+        return list(self.columns)
+
+class ColumnStoreWriter:
+    """Write the chunks of a result file into a column store."""
+    def __init__(self, path: str, source: dict):
+        self.path = path
+        self.source = source
+        self.rows = 0
+        self.columns = {}
+        self.categories = {}
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, ColumnStore.META)):
+            os.remove(os.path.join(path, ColumnStore.META))
+
+    @classmethod
+    def for_file(cls, file_path: str, root: str, sep: str = ',', has_index: bool = False):
+        """Start the store of a file inside the root directory of the stores."""
+        return cls(store_path_for(file_path, root), {**file_fingerprint(file_path), 'sep': sep, 'has_index': has_index})
+
+    @classmethod
+    def resume(cls, store: ColumnStore, fingerprint: dict):
+        """Reopen a store to append rows read from a newer version of its file, identified by its fingerprint."""
+        writer = cls.__new__(cls)
+        writer.path = store.path
+        writer.source = {**store.meta['source'], **fingerprint}
+        writer.rows = store.rows
+        writer.columns = {col: {key: value for key, value in info.items() if key != 'categories'} for col, info in store.meta['columns'].items()}
+        writer.categories = {col: {value: code for code, value in enumerate(info['categories'])}
+                             for col, info in store.meta['columns'].items() if 'categories' in info}
+        os.remove(os.path.join(store.path, ColumnStore.META))
+        return writer
+
+    def append(self, chunk: pd.DataFrame):
+        """Append the rows of a chunk to the column files."""
+        if self.source.get('has_index'):
+            chunk = chunk.reset_index(names=INDEX_COLUMN)
+        for position, col in enumerate(chunk.columns):
+            values = self._encode(col, position, chunk[col])
+            with open(os.path.join(self.path, self.columns[col]['file']), 'ab') as f:
+                values.tofile(f)
+        self.rows += len(chunk)
+
+    def _encode(self, col: str, position: int, series: pd.Series) -> np.ndarray:
+        """Convert a chunk of a column to the type of its file, creating the file on the first chunk."""
+        if col not in self.columns:
+            info = {'file': f'{position}.bin'}
+            if series.isna().all():
+                # Nothing tells the type of the column yet: missing values are stored as NaN until a chunk holds values
+                info['dtype'] = 'float32' if col.startswith('error_') else 'float64'
+                info['untyped'] = True
+            elif pd.api.types.is_datetime64_any_dtype(series):
+                info['dtype'] = 'int64'
+                info['datetime'] = True
+            elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+                info['dtype'] = 'int64'
+            elif pd.api.types.is_float_dtype(series):
+                info['dtype'] = 'float32' if col.startswith('error_') else 'float64'
+            else:
+                info['dtype'] = 'int32'
+                self.categories[col] = {}
+            self.columns[col] = info
+            open(os.path.join(self.path, info['file']), 'wb').close()
+
+        info = self.columns[col]
+        if info.get('untyped'):
+            if series.isna().all():
+                return np.full(len(series), np.nan, dtype=info['dtype'])
+            self._assign_type(col, series)
+        if col in self.categories:
+            mapping = self.categories[col]
+            local_codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            lookup = np.array([mapping.setdefault(str(value), len(mapping)) for value in uniques] + [-1], dtype=np.int32)
+            if codes_dtype(len(mapping)).itemsize > np.dtype(info['dtype']).itemsize:
+                self._retype(col, codes_dtype(len(mapping)))
+            return lookup[local_codes].astype(info['dtype'])
+        if info.get('datetime'):
+            return pd.to_datetime(series).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        if info['dtype'] == 'int64' and pd.api.types.is_float_dtype(series):
+            self._promote_to_float(col)
+        if not pd.api.types.is_numeric_dtype(series):
+            raise ValueError(f"The type of column '{col}' changes in the file, it cannot be stored.")
+        return series.to_numpy(dtype=info['dtype'])
+
+    def _assign_type(self, col: str, series: pd.Series):
+        """Give its type to a column whose previous chunks only held missing values, from the first chunk holding values."""
+        info = self.columns[col]
+        del info['untyped']
+        if pd.api.types.is_datetime64_any_dtype(series):
+            info['datetime'] = True
+            self._retype(col, np.dtype(np.int64), fill=np.iinfo(np.int64).min)
+        elif not pd.api.types.is_numeric_dtype(series):
+            self.categories[col] = {}
+            self._retype(col, np.dtype(np.int32), fill=-1)
+        # Numbers keep the float type of the missing values already written
+
+    def _promote_to_float(self, col: str):
+        """Rewrite an integer column as float64 when a later chunk holds floats, or missing values."""
+        self._retype(col, np.dtype(np.float64))
+
+    def _retype(self, col: str, dtype: np.dtype, fill=None):
+        """Rewrite the file of a column with another type, every value being replaced by fill when given
+        (missing values of a column that only held missing values)."""
+        info = self.columns[col]
+        file_path = os.path.join(self.path, info['file'])
+        values = np.fromfile(file_path, dtype=info['dtype'])
+        (values.astype(dtype) if fill is None else np.full(len(values), fill, dtype=dtype)).tofile(file_path)
+        info['dtype'] = dtype.name
+
+    def close(self, catalog: Catalog = None) -> ColumnStore:
+        """Shrink the categorical codes, write the metadata (with the catalog of the columns, if any) and open the store."""
+        for col, mapping in self.categories.items():
+            info = self.columns[col]
+            dtype = codes_dtype(len(mapping))
+            if dtype != np.dtype(info['dtype']):
+                self._retype(col, dtype)
+            info['categories'] = list(mapping)
+        meta = {'source': self.source, 'rows': self.rows, 'columns': self.columns}
+        if catalog is not None:
+            meta['catalog'] = catalog.to_dict()
+        with open(os.path.join(self.path, ColumnStore.META), 'w') as f:
+            json.dump(meta, f)
+        return ColumnStore(self.path)
@@ -0,0 +1,75 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+def enable_copy_on_write():
+    """Turn on the copy-on-write mode of pandas (always on from pandas 3), so that column selections
+    and slices share the memory of the loaded data until they are written to."""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        pd.set_option('mode.copy_on_write', True)
+
+def take(data: pd.DataFrame, columns: list[str], rows: np.ndarray = None) -> pd.DataFrame:
+    """Select some columns and, optionally, some rows (positions) of a dataframe.
+    Only the selected rows of the selected columns are ever copied, the other columns are never touched."""
+    view = data[list(dict.fromkeys(col for col in columns if col is not None))]
+    if rows is None:
+        return view
+    return view.iloc[rows]
+
+def filter_mask(data: pd.DataFrame, numerical_filters: dict, categorical_filters: dict, datetime_filters: dict) -> np.ndarray:
+    """Build the boolean mask of the rows kept by the filters of the variables selection window."""
+    mask = np.ones(len(data), dtype=bool)
+    for var, bounds in numerical_filters.items():
+        values = data[var].to_numpy()
+        if bounds['min'] is not None:
+            mask &= values >= bounds['min']
+        if bounds['max'] is not None:
+            mask &= values <= bounds['max']
+    for var, categories in categorical_filters.items():
+        if categories:
+            mask &= data[var].isin(categories).to_numpy()
+    for var, dates in datetime_filters.items():
+        if dates['start'] is None and dates['end'] is None:
+            continue
+        values = pd.to_datetime(data[var]).to_numpy()
+        if dates['start'] is not None:
+            mask &= values >= np.datetime64(pd.to_datetime(dates['start']))
+        if dates['end'] is not None:
+            mask &= values <= np.datetime64(pd.to_datetime(dates['end']))
+    return mask
+
+def filter_rows(data: pd.DataFrame, numerical_filters: dict, categorical_filters: dict, datetime_filters: dict) -> np.ndarray:
+    """Return the positions of the rows kept by the filters, or None when no filter removes any row."""
+    mask = filter_mask(data, numerical_filters, categorical_filters, datetime_filters)
+    if mask.all():
+        return None
+    return np.flatnonzero(mask)
+
+def append_rows(data: pd.DataFrame, chunk: pd.DataFrame) -> pd.DataFrame:
+    """Append new rows to a dataframe, keeping the types of its columns (categories are extended with the new values)
+    and continuing its default index."""
+    chunk = chunk[list(data.columns)]
+    if isinstance(data.index, pd.RangeIndex):
+        chunk = chunk.set_axis(pd.RangeIndex(data.index.stop, data.index.stop + len(chunk) * data.index.step, data.index.step))
+    columns = {}
+    for col in data.columns:
+        series, new = data[col], chunk[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            added = [value for value in pd.unique(new.dropna()) if value not in series.cat.categories]
+            series = series.cat.add_categories(added) if added else series
+            new = pd.Series(pd.Categorical(new, categories=series.cat.categories), index=new.index)
+        elif pd.api.types.is_float_dtype(series) and pd.api.types.is_numeric_dtype(new):
+            new = new.astype(series.dtype)
+        columns[col] = pd.concat([series, new])
+    return pd.DataFrame(columns)
+
+def split_by_label(values: np.ndarray, labels: np.ndarray, n_labels: int) -> list[np.ndarray]:
+    """Split values into one array per label (1 to n_labels) with a single stable sort instead of one mask per label."""
+    order = np.argsort(labels, kind='stable')
+    bounds = np.searchsorted(labels[order], np.arange(1, n_labels + 2))
+    values = np.asarray(values)[order]
+    return [values[bounds[i]:bounds[i + 1]] for i in range(n_labels)]
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import ConvexHull
+
+from .binning import quantile_labels
+from .layout import timestep_window
+from .timing import timings
+
+def mahalanobis_distances(points: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Distances of the errors of two models (one row per point) to their median, with the inverse of their covariance,
+    as scipy.spatial.distance.mahalanobis computes them one row at a time. Returns the median and the distances."""
+    points = np.asarray(points, dtype=np.float64)
+    center = np.nanmedian(points, axis=0)
+    inverse = np.linalg.inv(np.cov(points, rowvar=False))
+    delta = points - center
+    return center, np.sqrt(np.maximum(np.einsum('ij,jk,ik->i', delta, inverse, delta), 0))
+
+def distance_percentiles(distances: np.ndarray) -> np.ndarray:
+    """Percentage of the points at a distance lower than or equal to the distance of every point."""
+    distances = np.asarray(distances)
+    if len(distances) == 0:
+        return np.empty(0)
+    return np.searchsorted(np.sort(distances), distances, side='right') / len(distances) * 100
+
+def hull_edges(points: np.ndarray, distances: np.ndarray, percentage: float) -> np.ndarray:
+    """Edges of the convex hull of the percentage of the points closest to the median, as an array of
+    (edge, vertex, coordinate). Empty when there are not enough points to build a hull."""
+    points = np.asarray(points, dtype=np.float64)
+    if percentage <= 0 or len(points) == 0:
+        return np.empty((0, 2, 2))
+    inside = points[distances <= np.percentile(distances, percentage)]
+    if len(inside) <= 2:
+        return np.empty((0, 2, 2))
+    return inside[ConvexHull(inside).simplices]
+
+def domain_view(data: pd.DataFrame, models: list[str], target_name: str, individual_name: str = None, positions: np.ndarray = None,
+                quantiles: int = 1, bucket: int = 0, low=-1, high=-1, display_mode: str = 'timesteps', percentage: float = 0,
+                distances: np.ndarray = None, percentiles: np.ndarray = None) -> dict:
+    """Content of the domain evolution plot, ready to draw: the errors of both models on the rows of a quantile bucket (1 to
+    quantiles), or on all the rows with a single quantile, their median, the Mahalanobis distance of every point to the
+    median with its percentile, and the edges of the convex hull of the percentage of the closest points. data holds the
+    target, the individual column and the errors of the rows shown (the filtered rows), positions their time steps.
+    Rows are first restricted to the time steps (with an individual column) or index values from low to high, or to the
+    target values from low to high in the target display mode with a single quantile, -1 leaving a side open.
+    The distances and percentiles already computed for these rows can be given."""
+    if display_mode == 'timesteps' or quantiles > 1:
+        if individual_name is not None:
+            if low > 0 or high != -1:
+                window = timestep_window(positions, low, high)
+                data, positions = data[window], positions[window]
+        elif low == -1 and high != -1:
+            data = data.loc[:high]
+        elif low != -1 and high == -1:
+            data = data.loc[low:]
+        elif low != -1:
+            data = data.loc[low:high]
+    elif display_mode == 'target':
+        if low is not None and high is not None:
+            data = data[(data[target_name] >= low) & (data[target_name] <= high)]
+
+    if quantiles > 1:
+        data = data[quantile_labels(data, target_name, individual_name, quantiles, positions) == bucket]
+
+    errors = data[[f'error_{model}' for model in models[:2]]]
+    points = errors.to_numpy(dtype=np.float64)
+    if distances is None:
+        with timings.stage('mahalanobis'):
+            _, distances = mahalanobis_distances(points)
+            percentiles = distance_percentiles(distances)
+    with timings.stage('convex_hull'):
+        edges = hull_edges(points, distances, percentage)
+    return {'points': points, 'median': tuple(errors.median()), 'distances': distances, 'percentiles': percentiles, 'edges': edges,
+            'individuals': data[individual_name].to_numpy() if individual_name is not None else None,
+            'target_range': (data[target_name].min(), data[target_name].max())}
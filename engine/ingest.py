@@ -0,0 +1,76 @@
+import os
+import threading
+
+import pandas as pd
+
+from .catalog import Catalog
+from .colstore import ColumnStoreWriter
+from .loading import CSVSource, downcast
+from .timing import timings
+
+class Ingestion(threading.Thread):
+    """Read a result file chunk by chunk on a background thread.
+    The interface polls bytes_read and rows to show the progress, and can cancel the reading between two chunks.
+    The catalog of the columns, and the column store when store_root is given, are built as the chunks arrive.
+    Without a catalog saved from a previous load, every column is parsed once to summarize it, but only the requested ones are kept.
+    Once finished, result holds the dataframe, or the column store, and error the exception raised, if any."""
+    def __init__(self, source: CSVSource, columns: list[str] = None, store_root: str = None, individual_name: str = None, catalog: Catalog = None, chunksize: int = 100_000):
+        super().__init__(daemon=True)
+        self.source = source
+        self.columns = columns
+        self.store_root = store_root
+        self.chunksize = chunksize
+        self.total_bytes = os.path.getsize(source.file_path)
+        self.bytes_read = 0
+        self.rows = 0
+        self.end_offset = None
+        self.catalog = Catalog(individual_name) if catalog is None else catalog
+        self.summarize = catalog is None
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """Stop the reading after the current chunk."""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def run(self):
+        try:
+            self.result = self._read()
+        except Exception as e:
+            self.error = e
+
+    @timings.timed('ingestion')
+    def _read(self):
+        """Read the chunks, feeding the catalog and the store or the list of chunks."""
+        writer = None
+        if self.store_root is not None:
+            writer = ColumnStoreWriter.for_file(self.source.file_path, self.store_root, self.source.sep, self.source.has_index)
+        chunks = []
+        columns = None if self.summarize else self.columns
+        for chunk, bytes_read in self.source.read_chunks(columns, self.chunksize):
+            if self.cancelled:
+                return None
+            if self.summarize:
+                self.catalog.update(chunk)
+                if self.columns is not None:
+                    chunk = chunk[[col for col in chunk.columns if col in set(self.columns)]]
+            if writer is not None:
+                writer.append(chunk)
+            else:
+                # Categories are only set once all the chunks are read, so that they are the same for every chunk
+                chunks.append(downcast(chunk, categories=False))
+            self.rows += len(chunk)
+            self.bytes_read = bytes_read
+        # Offset of the end of the rows read, from which rows appended later to the file are read
+        self.end_offset = self.bytes_read if self.rows else self.total_bytes
+        self.bytes_read = self.total_bytes
+        if writer is not None:
+            return writer.close(self.catalog)
+        if not chunks:
+            return self.source.read(self.source.columns if self.columns is None else self.columns, nrows=0)
+        return downcast(pd.concat(chunks))
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+JOIN_METHODS = ['hash', 'merge']
+
+def _encode_keys(left_keys: list, right_keys: list) -> tuple[np.ndarray, np.ndarray]:
+    """Encode the key columns of both sides into one int64 code per row, equal codes meaning equal keys.
+    Rows with a missing key get the code -1."""
+    left_codes = np.zeros(len(left_keys[0]), dtype=np.int64)
+    right_codes = np.zeros(len(right_keys[0]), dtype=np.int64)
+    missing_left = np.zeros(len(left_codes), dtype=bool)
+    missing_right = np.zeros(len(right_codes), dtype=bool)
+    for left, right in zip(left_keys, right_keys):
+        codes, uniques = pd.factorize(pd.concat([pd.Series(np.asarray(left)), pd.Series(np.asarray(right))], ignore_index=True))
+        codes_left, codes_right = codes[:len(left_codes)], codes[len(left_codes):]
+        missing_left |= codes_left < 0
+        missing_right |= codes_right < 0
+        left_codes = left_codes * (len(uniques) + 1) + codes_left + 1
+        right_codes = right_codes * (len(uniques) + 1) + codes_right + 1
+    left_codes[missing_left] = -1
+    right_codes[missing_right] = -1
+    return left_codes, right_codes
+
+def join_rows(left_keys: list, right_keys: list, method: str = 'hash') -> tuple[np.ndarray, np.ndarray]:
+    """Match the rows of two result files on one or more key columns (index, or individual and time step).
+    Keys must be unique within each file. Returns the positions of the matched rows in both files, in the order of the left file.
+    The hash join builds a hash table of the right keys, the sort-merge join sorts the keys of both files and
+    merges them with a binary search; both give the same result."""
+    if method not in JOIN_METHODS:
+        raise ValueError(f"Unknown join method '{method}', expected one of {JOIN_METHODS}.")
+    left_codes, right_codes = _encode_keys(left_keys, right_keys)
+    for side, codes in (('first', left_codes), ('second', right_codes)):
+        if not pd.Index(codes[codes >= 0]).is_unique:
+            raise ValueError(f'The keys of the {side} file are not unique, the rows cannot be matched.')
+
+    # Rows with a missing key never match, even between themselves
+    right_codes = np.where(right_codes < 0, -2 - np.arange(len(right_codes)), right_codes)
+    if method == 'hash':
+        right_rows = pd.Index(right_codes).get_indexer(left_codes)
+    else:
+        right_order = np.argsort(right_codes, kind='stable')
+        sorted_codes = right_codes[right_order]
+        left_order = np.argsort(left_codes, kind='stable')
+        found = np.clip(np.searchsorted(sorted_codes, left_codes[left_order]), 0, max(len(sorted_codes) - 1, 0))
+        right_rows = np.full(len(left_codes), -1, dtype=np.int64)
+        if len(sorted_codes):
+            matched = sorted_codes[found] == left_codes[left_order]
+            right_rows[left_order[matched]] = right_order[found[matched]]
+    right_rows[left_codes < 0] = -1
+    left_rows = np.flatnonzero(right_rows >= 0)
+    return left_rows, right_rows[left_rows]
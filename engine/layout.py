@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+class IndividualLayout:
+    """Rows of a dataset grouped by individual, built once from the individual column.
+    order lists the rows sorted by individual then by time step, so that the rows of the i-th individual are
+    order[offsets[i]:offsets[i + 1]], and position holds the time step of every row (its cumcount within its individual).
+    Rows without individual have the position -1."""
+    def __init__(self, individuals, name: str = None):
+        self.name = name
+        codes, individuals = pd.factorize(individuals)
+        self.individuals = pd.Index(individuals)
+        n_individuals = len(self.individuals)
+        self.codes = codes
+        self.order = np.argsort(np.where(codes < 0, n_individuals, codes), kind='stable')
+        self.lengths = np.bincount(codes[codes >= 0], minlength=n_individuals)
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths)))
+        self.position = self._positions(np.ones(len(codes), dtype=bool))
+        self._subset = (None, self.position)
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, individual_name: str):
+        """Build the layout of the individual column of a dataframe."""
+        return cls(data[individual_name], individual_name)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """Arrays describing the layout, to save it with a session."""
+        individuals = np.asarray(self.individuals)
+        if individuals.dtype == object:
+            individuals = individuals.astype(str)
+        return {'individuals': individuals, 'codes': self.codes, 'order': self.order, 'lengths': self.lengths, 'position': self.position}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray], name: str = None):
+        """Rebuild a layout saved with to_arrays, without sorting the rows again."""
+        layout = cls.__new__(cls)
+        layout.name = name
+        layout.individuals = pd.Index(arrays['individuals'])
+        layout.codes = arrays['codes']
+        layout.order = arrays['order']
+        layout.lengths = arrays['lengths']
+        layout.offsets = np.concatenate(([0], np.cumsum(layout.lengths)))
+        layout.position = arrays['position']
+        layout._subset = (None, layout.position)
+        return layout
+
+    def _positions(self, kept: np.ndarray) -> np.ndarray:
+        """Time step of every row among the kept rows of its individual, -1 for the other rows."""
+        grouped = self.offsets[-1]
+        kept_sorted = kept[self.order[:grouped]]
+        counts = np.cumsum(kept_sorted)
+        before = np.concatenate(([0], counts))[self.offsets[:-1]]
+        position = np.full(len(self.codes), -1, dtype=np.int64)
+        position[self.order[:grouped]] = counts - 1 - np.repeat(before, self.lengths)
+        position[~kept] = -1
+        return position
+
+    def positions(self, rows: np.ndarray = None) -> np.ndarray:
+        """Time steps of the given rows (positions, all rows by default) counted among these rows only,
+        as groupby(individual).cumcount() would on the selected rows. The result of the last selection is kept."""
+        if rows is None:
+            return self.position
+        if self._subset[0] is not rows:
+            kept = np.zeros(len(self.codes), dtype=bool)
+            kept[rows] = True
+            self._subset = (rows, self._positions(kept)[rows])
+        return self._subset[1]
+
+    def extend(self, individuals):
+        """Add rows appended at the end of the dataset: their time steps follow the rows already known of their individual
+        and they are inserted at the end of the group of their individual, without sorting the whole dataset again."""
+        individuals = pd.Series(individuals)
+        new_individuals = [value for value in pd.unique(individuals.dropna()) if value not in self.individuals]
+        if new_individuals:
+            self.individuals = self.individuals.append(pd.Index(new_individuals))
+        n_individuals = len(self.individuals)
+        codes = self.individuals.get_indexer(individuals)
+        lengths = np.concatenate([self.lengths, np.zeros(n_individuals - len(self.lengths), dtype=self.lengths.dtype)])
+        ends = np.concatenate([self.offsets[1:], np.full(n_individuals - len(self.lengths), self.offsets[-1])])
+
+        rows = np.arange(len(self.codes), len(self.codes) + len(codes))
+        chunk_order = np.argsort(np.where(codes < 0, n_individuals, codes), kind='stable')
+        chunk_codes = codes[chunk_order]
+        valid = chunk_codes >= 0
+        chunk_lengths = np.bincount(chunk_codes[valid], minlength=n_individuals)
+        chunk_offsets = np.concatenate(([0], np.cumsum(chunk_lengths)))
+        position = np.full(len(codes), -1, dtype=np.int64)
+        position[chunk_order[valid]] = lengths[chunk_codes[valid]] + np.arange(valid.sum()) - chunk_offsets[chunk_codes[valid]]
+
+        insert_at = np.where(valid, ends[np.maximum(chunk_codes, 0)], len(self.order))
+        self.order = np.insert(self.order, insert_at, rows[chunk_order])
+        self.codes = np.concatenate([self.codes, codes])
+        self.lengths = lengths + chunk_lengths
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths)))
+        self.position = np.concatenate([self.position, position])
+        self._subset = (None, self.position)
+
+    def rows_of(self, individual) -> np.ndarray:
+        """Positions of the rows of an individual, in time order."""
+        i = self.individuals.get_loc(individual)
+        return self.order[self.offsets[i]:self.offsets[i + 1]]
+
+def timestep_window(positions: np.ndarray, min: int = -1, max: int = -1) -> np.ndarray:
+    """Mask of the rows whose time step is in [min, max), -1 leaving a bound open."""
+    mask = positions >= (min if min > 0 else 0)
+    if max != -1:
+        mask &= positions < max
+    return mask
@@ -0,0 +1,110 @@
+import hashlib
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+def file_fingerprint(file_path: str) -> dict:
+    """Identify the version of a file by its size and modification time."""
+    stat = os.stat(file_path)
+    return {'file_path': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def store_path_for(file_path: str, root: str) -> str:
+    """Get the directory of the column store of a file inside the root directory of the stores."""
+    name = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(root, name)
+
+def downcast(data: pd.DataFrame, category_ratio: float = 0.5, categories: bool = True) -> pd.DataFrame:
+    """Reduce the memory used by a result dataframe.
+    Error columns are stored as float32 and text columns with few distinct values as categories."""
+    for col in data.columns:
+        series = data[col]
+        if col.startswith('error_') and pd.api.types.is_float_dtype(series):
+            data[col] = series.astype(np.float32)
+        elif categories and (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)) and 'date' not in col.lower():
+            if len(series) > 0 and series.nunique() / len(series) <= category_ratio:
+                data[col] = series.astype('category')
+    return data
+
+def memory_footprint(data: pd.DataFrame) -> int:
+    """Return the number of bytes used by a dataframe, including its index and the content of text columns."""
+    return int(data.memory_usage(index=True, deep=True).sum())
+
+def format_bytes(size: int) -> str:
+    """Format a number of bytes for display."""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TB'
+
+def column_kind(series: pd.Series, name: str) -> str:
+    """Classify a domain variable as 'categorical', 'numerical' or 'datetime' for the filters."""
+    if pd.api.types.is_datetime64_any_dtype(series) or 'date' in name.lower():
+        return 'datetime'
+    if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+        return 'categorical'
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return 'numerical'
+    return 'other'
+
+class CSVSource:
+    """A result file read with column projection: only the requested columns are parsed,
+    the other ones can be loaded later on demand."""
+    def __init__(self, file_path: str, sep: str = ',', has_index: bool = False):
+        self.file_path = file_path
+        self.sep = sep
+        self.has_index = has_index
+        self.raw_columns = list(pd.read_csv(file_path, sep=sep, nrows=0).columns)
+        self.positions = {}
+        for position, col in enumerate(self.raw_columns):
+            if has_index and position == 0:
+                continue
+            self.positions['index' if col == 'Unnamed: 0' else col] = position
+        self.columns = list(self.positions)
+
+    def _usecols(self, columns: list[str]) -> tuple[list[str], list[int]]:
+        """Get the columns in file order and their positions, including the index column."""
+        columns = [col for col in self.columns if col in set(columns)]
+        usecols = sorted(self.positions[col] for col in columns)
+        if self.has_index:
+            usecols = [0] + usecols
+        return columns, usecols
+
+    def read(self, columns: list[str], nrows: int = None) -> pd.DataFrame:
+        """Read the given columns of the file, downcasting them to save memory."""
+        columns, usecols = self._usecols(columns)
+        data = pd.read_csv(self.file_path, sep=self.sep, usecols=usecols, index_col=0 if self.has_index else None, nrows=nrows)
+        data.rename(columns={'Unnamed: 0': 'index'}, inplace=True)
+        return downcast(data[columns])
+
+    def read_chunks(self, columns: list[str] = None, chunksize: int = 100_000):
+        """Read the given columns (all by default) chunk by chunk.
+        Yields each chunk with the number of bytes of the file read so far."""
+        columns, usecols = self._usecols(self.columns if columns is None else columns)
+        with open(self.file_path, 'rb') as f:
+            reader = pd.read_csv(f, sep=self.sep, usecols=usecols, index_col=0 if self.has_index else None, chunksize=chunksize)
+            for chunk in reader:
+                chunk.rename(columns={'Unnamed: 0': 'index'}, inplace=True)
+                yield chunk[columns], f.tell()
+
+    def parse(self, content: bytes, columns: list[str] = None) -> pd.DataFrame:
+        """Parse complete lines of the file without header, for instance rows appended since the file was read."""
+        columns, usecols = self._usecols(self.columns if columns is None else columns)
+        data = pd.read_csv(io.BytesIO(content), sep=self.sep, header=None, names=self.raw_columns, usecols=usecols, index_col=0 if self.has_index else None)
+        data.rename(columns={'Unnamed: 0': 'index'}, inplace=True)
+        return downcast(data[columns], categories=False)
+
+    def sample(self, nrows: int = 1000) -> pd.DataFrame:
+        """Read the first rows of every column, used to know the type of the columns that are not loaded yet."""
+        return self.read(self.columns, nrows=nrows)
+
+    def load_profile(self, target_name: str, individual_name: str = None, models: list[str] = None, variables: list[str] = ()) -> list[str]:
+        """List the columns needed by the views: target, individual, errors of the models (all of them by default) and filter variables."""
+        if models is None:
+            errors = [col for col in self.columns if col.startswith('error_')]
+        else:
+            errors = [f'error_{model}' for model in models]
+        needed = [target_name, individual_name, *errors, *variables]
+        return [col for col in self.columns if col in set(needed)]
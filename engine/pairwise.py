@@ -0,0 +1,52 @@
+import warnings
+
+import numpy as np
+
+def pairwise_win_rates(errors: np.ndarray, labels: np.ndarray, quantiles: int, chunk_size: int = None, max_cells: int = 2**24) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Compare every pair of models on every quantile bucket.
+    errors is an (n_rows, n_models) array and labels holds the 1-based quantile of each row.
+    Returns the number of rows per bucket, the (quantiles, n_models, n_models) fraction of rows where
+    |error_i| < |error_j| and the median of |error_i| - |error_j| on each bucket. Like paired_tests, a pair of models
+    is only compared on the rows where both errors are known: missing errors count neither as wins nor in the rates.
+    The rows are processed in chunks so that the broadcasted comparison never exceeds max_cells values."""
+    abs_errors = np.abs(np.asarray(errors, dtype=np.float64))
+    buckets = np.asarray(labels, dtype=np.int64) - 1
+    abs_errors, buckets = abs_errors[buckets >= 0], buckets[buckets >= 0]
+    n_rows, n_models = abs_errors.shape
+    if chunk_size is None:
+        chunk_size = max(1, max_cells // max(1, n_models * n_models))
+
+    counts = np.bincount(buckets, minlength=quantiles)
+    wins = np.zeros((quantiles, n_models * n_models), dtype=np.float64)
+    valid = np.zeros((quantiles, n_models * n_models), dtype=np.float64)
+    for start in range(0, n_rows, chunk_size):
+        chunk = abs_errors[start:start + chunk_size]
+        chunk_wins = (chunk[:, :, None] < chunk[:, None, :]).reshape(len(chunk), -1)
+        known = ~np.isnan(chunk)
+        chunk_valid = (known[:, :, None] & known[:, None, :]).reshape(len(chunk), -1)
+        one_hot = np.zeros((len(chunk), quantiles), dtype=np.float32)
+        one_hot[np.arange(len(chunk)), buckets[start:start + chunk_size]] = 1
+        wins += one_hot.T @ chunk_wins.astype(np.float32)
+        valid += one_hot.T @ chunk_valid.astype(np.float32)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        win_rates = (wins / valid).reshape(quantiles, n_models, n_models)
+
+    # The median is not decomposable over chunks, so each bucket is reduced one reference model at a time
+    order = np.argsort(buckets, kind='stable')
+    bounds = np.searchsorted(buckets[order], np.arange(quantiles + 1))
+    median_diff = np.full((quantiles, n_models, n_models), np.nan)
+    for b in range(quantiles):
+        rows = abs_errors[order[bounds[b]:bounds[b + 1]]]
+        if len(rows) == 0:
+            continue
+        for i in range(n_models):
+            with np.errstate(invalid='ignore'), warnings.catch_warnings():
+                # A pair without any row where both errors are known has no median
+                warnings.simplefilter('ignore', RuntimeWarning)
+                median_diff[b, i] = np.nanmedian(rows[:, i:i + 1] - rows, axis=0)
+    return counts, win_rates, median_diff
+
+def overall_win_rates(counts: np.ndarray, win_rates: np.ndarray) -> np.ndarray:
+    """Aggregate the per-bucket win rates over the whole dataset, weighting every bucket by its number of rows."""
+    weights = counts / counts.sum()
+    return np.nansum(win_rates * weights[:, None, None], axis=0)
@@ -0,0 +1,64 @@
+import threading
+
+from .analysis import Analysis
+from .timing import timings
+
+class Precomputation(threading.Thread):
+    """Compute on a background thread, for every candidate target, the sorted order of the quantile buckets and the boxplot
+    statistics of the models, so that changing the target only draws the views. The results go to the bucket indexes and
+    to the cache of the analysis, both bounded, the least recently used ones being dropped first. The values of the targets
+    missing from the data are read by read_columns without being added to the data. The interface pauses the computation
+    while it is busy with another job and resumes it once idle, and stops it when the data or the models change.
+    done lists the targets computed, skipped the ones that failed (no numeric value, column that cannot be read...) with
+    their error, the other targets being computed all the same."""
+    def __init__(self, analysis: Analysis, targets: list[str], models: list[str], quantiles: list[int], read_columns=None):
+        super().__init__(daemon=True)
+        self.analysis = analysis
+        self.targets = list(targets)
+        self.models = list(models)
+        self.quantiles = list(quantiles)
+        self.read_columns = read_columns
+        self.done = []
+        self.skipped = {}
+        self.error = None
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stopping = threading.Event()
+
+    def pause(self):
+        """Wait before the next target until resume is called."""
+        self._idle.clear()
+
+    def resume(self):
+        self._idle.set()
+
+    def stop(self):
+        """Stop after the current target."""
+        self._stopping.set()
+        self._idle.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopping.is_set()
+
+    def run(self):
+        try:
+            self._precompute()
+        except Exception as e:
+            self.error = e
+
+    @timings.timed('precompute_targets')
+    def _precompute(self):
+        for target in self.targets:
+            self._idle.wait()
+            if self.stopped:
+                return
+            try:
+                values = None
+                if target not in self.analysis.data.columns:
+                    values = self.read_columns([target])[target].to_numpy()
+                self.analysis.for_target(target, values).precompute(self.models, self.quantiles)
+            except Exception as e:
+                self.skipped[target] = f'{type(e).__name__}: {e}'
+            else:
+                self.done.append(target)
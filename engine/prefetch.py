@@ -0,0 +1,72 @@
+import threading
+
+from .cache import LRUCache
+
+class Prefetcher:
+    """Compute results ahead of their use on a worker thread, for instance the views the user is likely to ask for next,
+    keeping them in an LRU cache. Only the last tasks given are pending, the older ones being dropped, so that prefetching
+    follows the user. Getting a result being computed waits for it instead of computing it twice. A task that fails is
+    dropped: the result is computed again, and the error raised, when it is needed."""
+    def __init__(self, cache: LRUCache = None):
+        self.cache = cache if cache is not None else LRUCache(max_entries=8)
+        self._pending = []
+        self._running = None
+        self._generation = 0
+        self._condition = threading.Condition()
+        self._worker = None
+
+    def prefetch(self, tasks: list[tuple]):
+        """Compute the results of (key, compute) tasks that are not in the cache yet, in this order, replacing the pending ones."""
+        with self._condition:
+            running = self._running[0] if self._running is not None else None
+            self._pending = [(key, compute) for key, compute in tasks if key != running and key not in self.cache]
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, daemon=True)
+                self._worker.start()
+            self._condition.notify()
+
+    def cancel(self):
+        """Drop the pending tasks."""
+        with self._condition:
+            self._pending = []
+
+    def get(self, key, default=None):
+        """Get a result computed ahead, waiting for it when the worker is computing it, or default."""
+        with self._condition:
+            self._pending = [task for task in self._pending if task[0] != key]
+            running = self._running[1] if self._running is not None and self._running[0] == key else None
+        if running is not None:
+            running.wait()
+        return self.cache.get(key, default)
+
+    def put(self, key, value):
+        """Keep a result computed in the foreground."""
+        self.cache.put(key, value)
+
+    def clear(self):
+        """Drop the pending tasks and the results, for instance when the data changes."""
+        with self._condition:
+            self._pending = []
+            # The result of the task running now is not kept
+            self._generation += 1
+        self.cache.clear()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                key, compute = self._pending.pop(0)
+                self._running = (key, threading.Event())
+                generation = self._generation
+            try:
+                value = compute()
+                with self._condition:
+                    if generation == self._generation:
+                        self.cache.put(key, value)
+            except Exception:
+                pass
+            finally:
+                with self._condition:
+                    self._running[1].set()
+                    self._running = None
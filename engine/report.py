@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from .buckets import BucketIndex
+
+REPORT_METRICS = ['RMSE', 'MAE']
+
+def report_labels(values, quantiles: int) -> np.ndarray:
+    """Segment of every row of the report for a domain variable (0 to n_segments - 1).
+    Numeric variables with more distinct values than quantiles are cut into quantiles of their ranked values, rows with
+    a missing value being left out (-1); other variables get one segment per value, missing values being one more segment."""
+    series = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(series) and series.nunique() > quantiles:
+        return BucketIndex(series.to_numpy(dtype=np.float64, na_value=np.nan), ranked=True).labels(quantiles) - 1
+    codes = series.astype('category').cat.codes.to_numpy().astype(np.int64)
+    return np.where(codes < 0, codes.max(initial=-1) + 1, codes)
+
+def _score(metric: str, total: float, count: int) -> float:
+    return float(np.sqrt(total / count)) if metric == 'RMSE' else float(total / count)
+
+def _transform(metric: str, errors: np.ndarray) -> np.ndarray:
+    errors = np.asarray(errors, dtype=np.float64)
+    return errors ** 2 if metric == 'RMSE' else np.abs(errors)
+
+def base_scores(errors: np.ndarray) -> dict[str, float]:
+    """RMSE and MAE of the errors of a model on all the rows."""
+    return {metric: _score(metric, _transform(metric, errors).sum(), len(errors)) for metric in REPORT_METRICS}
+
+def segment_sums(labels: np.ndarray, errors: np.ndarray, n_segments: int = None) -> dict[str, np.ndarray]:
+    """Number of rows and sums of e² and |e| of the errors of a model on every segment, rows labelled -1 being left out."""
+    kept = labels >= 0
+    n_segments = n_segments if n_segments is not None else (int(labels.max()) + 1 if kept.any() else 0)
+    sums = {metric: np.bincount(labels[kept], weights=_transform(metric, errors[kept]), minlength=n_segments) for metric in REPORT_METRICS}
+    sums['count'] = np.bincount(labels[kept], minlength=n_segments)
+    return sums
+
+def hybrid_scores(sums: tuple[dict, dict]) -> dict[str, float]:
+    """Scores of the hybrid oracle taking, on every segment, the predictions of the model with the lowest score,
+    the second model being taken on ties. sums holds the segment sums of both models."""
+    count = sums[0]['count'].sum()
+    # On a segment, both scores are computed on the same rows: comparing the sums compares the scores
+    return {metric: _score(metric, np.where(sums[0][metric] < sums[1][metric], sums[0][metric], sums[1][metric]).sum(), count)
+            for metric in REPORT_METRICS}
+
+def report_row(variable: str, models: list[str], base: dict[str, dict], sums: tuple[dict, dict]) -> dict:
+    """Row of the comparison report for a domain variable: hybrid score, gain over the best model and scores of both models.
+    base holds the base_scores of every model."""
+    row = {'Variable': variable}
+    hybrid = hybrid_scores(sums)
+    for metric in REPORT_METRICS:
+        best = min(base[models[0]][metric], base[models[1]][metric])
+        row[f'Hybrid_{metric}'] = hybrid[metric]
+        row[f'Gain_{metric} (%)'] = (best - hybrid[metric]) / best * 100
+        row[f'{models[0]}_{metric}'] = base[models[0]][metric]
+        row[f'{models[1]}_{metric}'] = base[models[1]][metric]
+    return row
@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+
+import pandas as pd
+
+from .analysis import Analysis
+from .timing import timings
+
+CHECKPOINT_VERSION = 1
+
+class ReportGeneration(threading.Thread):
+    """Compute the comparison report of two models on a background thread, one domain variable after the other.
+    Every row is appended to the report file as soon as its variable is done, and the variables done so far are saved to a
+    checkpoint next to it (<report>.checkpoint.json), so that a cancelled or interrupted generation resumes where it stopped
+    when it is started again on the same file, models, number of quantiles and data. The interface polls done and rows to
+    show the progress and the rows so far, and can cancel the generation between two variables. Variables whose row cannot
+    be computed are listed in failures with their error, and are tried again on the next run; the checkpoint is removed once
+    every variable is done. The values of the variables missing from the data are read by read_columns, batch by batch,
+    unless the sums of the variable are saved in the report store of the analysis.
+    Once finished, error holds the exception raised, if any."""
+    def __init__(self, analysis: Analysis, variables: list[str], models: list[str], quantiles: int, file_path: str,
+                 read_columns=None, source: dict = None, batch: int = 16, sep: str = ';', decimal: str = ','):
+        super().__init__(daemon=True)
+        self.analysis = analysis
+        self.variables = list(variables)
+        self.models = list(models[:2])
+        self.quantiles = quantiles
+        self.file_path = file_path
+        self.read_columns = read_columns
+        self.source = source
+        self.batch = batch
+        self.sep = sep
+        self.decimal = decimal
+        self.rows = []
+        self.done = []
+        self.failures = {}
+        self.resumed = 0
+        self.error = None
+        self._cancel = threading.Event()
+
+    @property
+    def checkpoint_path(self) -> str:
+        return self.file_path + '.checkpoint.json'
+
+    @property
+    def total(self) -> int:
+        return len(self.variables)
+
+    def cancel(self):
+        """Stop the generation after the current variable, keeping the checkpoint to resume it."""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def _header(self) -> dict:
+        return {'version': CHECKPOINT_VERSION, 'models': self.models, 'quantiles': self.quantiles, 'source': self.source}
+
+    def checkpoint(self) -> dict:
+        """Checkpoint left by a previous generation of this report, or None when there is none or when it was saved for
+        other models, another number of quantiles or another version of the data."""
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self.file_path) or any(state.get(key) != value for key, value in self._header().items()):
+            return None
+        return state
+
+    def discard_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _save_checkpoint(self):
+        state = dict(self._header(), done=self.done, failures=self.failures)
+        with open(self.checkpoint_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(self.checkpoint_path + '.tmp', self.checkpoint_path)
+
+    def _resume(self):
+        """Take back the rows of the variables done by the previous run. Rows appended after its last checkpoint are dropped."""
+        state = self.checkpoint()
+        if state is None:
+            if os.path.exists(self.file_path):
+                os.remove(self.file_path)
+            return
+        done = set(state['done'])
+        rows = pd.read_csv(self.file_path, sep=self.sep, decimal=self.decimal, dtype={'Variable': str})
+        rows = rows[rows['Variable'].isin(done)].drop_duplicates('Variable', keep='last')
+        rows.to_csv(self.file_path + '.tmp', index=False, sep=self.sep, decimal=self.decimal)
+        os.replace(self.file_path + '.tmp', self.file_path)
+        self.rows = rows.to_dict('records')
+        self.done = rows['Variable'].tolist()
+        self.resumed = len(self.done)
+
+    def _append(self, row: dict):
+        header = not os.path.exists(self.file_path)
+        with open(self.file_path, 'a', encoding='utf-8', newline='') as f:
+            pd.DataFrame([row]).to_csv(f, header=header, index=False, sep=self.sep, decimal=self.decimal)
+
+    def run(self):
+        try:
+            self._generate()
+        except Exception as e:
+            self.error = e
+
+    @timings.timed('generate_report')
+    def _generate(self):
+        self._resume()
+        done = set(self.done)
+        pending = [variable for variable in self.variables if variable not in done]
+        for start in range(0, len(pending), self.batch):
+            if self.cancelled:
+                return
+            variables = pending[start:start + self.batch]
+            missing = [variable for variable in variables if variable not in self.analysis.data.columns
+                       and not self.analysis.report_saved(variable, self.models, self.quantiles)]
+            loaded = self.read_columns(missing) if missing and self.read_columns is not None else None
+            for variable in variables:
+                if self.cancelled:
+                    return
+                try:
+                    values = loaded[variable].to_numpy() if loaded is not None and variable in loaded.columns else None
+                    # The sums of every segment give the scores of both models and of the hybrid oracle without grouping the rows
+                    row = self.analysis.report_row(variable, self.models, self.quantiles, values)
+                except Exception as e:
+                    self.failures[variable] = f'{type(e).__name__}: {e}'
+                else:
+                    self._append(row)
+                    self.rows.append(row)
+                    self.done.append(variable)
+                    self.failures.pop(variable, None)
+                self._save_checkpoint()
+        if not self.failures:
+            self.discard_checkpoint()
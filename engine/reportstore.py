@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from . import report
+from .loading import store_path_for
+
+class ReportStore:
+    """Segments of the domain variables of the comparison report and sums of the errors of the models on them, saved on disk
+    for a version of a result file, so that generating the report again for other models or another number of quantiles
+    only computes what was never computed. The segments of a variable are saved per number of quantiles, and the number
+    of rows and sums of e² and |e| of a model per variable and number of quantiles: the scores of every metric and of
+    every pair of models, hybrid oracle included, are derived from the sums without reading the rows. A report with one
+    more model only reads the errors of that model. Everything is dropped when the data changes, source identifying the
+    version of the data (fingerprint of the file, rows...). Models joined from another file (model@label) are not saved,
+    the version of that file being unknown."""
+    def __init__(self, path: str, source: dict):
+        self.path = path
+        self.source = source
+
+    @classmethod
+    def open(cls, file_path: str, root: str, source: dict):
+        """Open the store of a file inside the root directory of the stores, emptying it when it was saved for another source."""
+        path = store_path_for(file_path, root)
+        manifest = os.path.join(path, 'manifest.json')
+        try:
+            with open(manifest, encoding='utf-8') as f:
+                saved = json.load(f).get('source')
+        except (OSError, ValueError):
+            saved = None
+        if saved != source:
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+            with open(manifest, 'w', encoding='utf-8') as f:
+                json.dump({'source': source}, f)
+        return cls(path, source)
+
+    @staticmethod
+    def saved(model: str) -> bool:
+        """Whether the sums of a model are saved."""
+        return '@' not in model
+
+    def _file(self, kind: str, *names, extension: str = 'npz') -> str:
+        digest = '-'.join(hashlib.sha1(str(name).encode('utf-8')).hexdigest()[:16] for name in names)
+        return os.path.join(self.path, f'{kind}-{digest}.{extension}')
+
+    def _write(self, path: str, write):
+        with open(path + '.tmp', 'wb') as f:
+            write(f)
+        os.replace(path + '.tmp', path)
+
+    def contains(self, variable: str, models: list[str], quantiles: int) -> bool:
+        """Whether the segments of a variable, or the sums of all the models on them, are saved, the values of the variable
+        being then never read."""
+        return (os.path.exists(self._file('labels', variable, quantiles, extension='npy'))
+                or all(self.saved(model) and os.path.exists(self._file('sums', variable, model, quantiles)) for model in models))
+
+    def labels(self, variable: str, quantiles: int, values) -> np.ndarray:
+        """Segment of every row for a variable (report_labels), computed from values() when it is not saved."""
+        path = self._file('labels', variable, quantiles, extension='npy')
+        if os.path.exists(path):
+            return np.load(path).astype(np.int64)
+        labels = report.report_labels(values(), quantiles)
+        # Segments are stored in the smallest integer type, -1 marking rows left out
+        dtype = next(dtype for dtype in (np.int8, np.int16, np.int32, np.int64) if labels.max(initial=0) <= np.iinfo(dtype).max)
+        self._write(path, lambda f: np.save(f, labels.astype(dtype)))
+        return labels
+
+    def segment_sums(self, variable: str, models: list[str], quantiles: int, values, errors) -> tuple[dict, ...]:
+        """segment_sums of every model on the segments of a variable. Only the sums that are not saved are computed, from the
+        segments and from errors(model); the values of the variable are only read, with values(), when its segments are not saved."""
+        sums, labels = [], None
+        for model in models:
+            path = self._file('sums', variable, model, quantiles)
+            if self.saved(model) and os.path.exists(path):
+                with np.load(path) as content:
+                    sums.append({name: content[name] for name in content.files})
+                continue
+            if labels is None:
+                labels = self.labels(variable, quantiles, values)
+            model_sums = report.segment_sums(labels, errors(model), int(labels.max(initial=-1)) + 1)
+            if self.saved(model):
+                self._write(path, lambda f: np.savez(f, **model_sums))
+            sums.append(model_sums)
+        return tuple(sums)
+
+    def scores(self, model: str, compute) -> dict[str, float]:
+        """base_scores of a model, computed with compute() when they are not saved."""
+        path = self._file('scores', model, extension='json')
+        if self.saved(model) and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        scores = compute()
+        if self.saved(model):
+            self._write(path, lambda f: f.write(json.dumps(scores).encode('utf-8')))
+        return scores
@@ -0,0 +1,296 @@
+"""
+Local analysis server: result files are loaded once and the computations behind the views of DEPlot are served as JSON or PNG
+to every client, from an LRU cache shared by all of them. Identical requests received while a result is being computed wait
+for that computation instead of starting their own.
+
+Usage: python -m engine.server results.csv --target RUL --individual unit --port 8765
+
+Endpoints (models are given as models=a,b):
+    GET  /datasets                                               loaded datasets
+    POST /datasets  {"file": ..., "target": ..., "individual": ..., "name": ..., "sep": ..., "has_index": ...}   load a file
+    GET  /datasets/<name>/metrics?models=a,b                     RMSE and MAE of the models (all by default)
+    GET  /datasets/<name>/quantiles[.png]?models=a,b&q=10        statistics of the errors on every quantile
+    GET  /datasets/<name>/domain[.png]?models=a,b&q=10&bucket=1  points of a quantile with their distances and percentiles
+    GET  /datasets/<name>/hull?models=a,b&q=10&bucket=1&percentage=80   convex hull of the points of a quantile
+    GET  /cache                                                  state of the cache and timings of the computations
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from .analysis import Analysis
+from .cache import LRUCache
+from .loading import file_fingerprint
+from .timing import timings
+
+def to_json(value):
+    """Convert results (arrays, dataframes, numpy scalars) to JSON values, NaN and infinite values becoming null."""
+    if isinstance(value, pd.DataFrame):
+        return to_json(value.to_dict(orient='records'))
+    if isinstance(value, np.ndarray):
+        return to_json(value.tolist())
+    if isinstance(value, dict):
+        return {str(key): to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+class AnalysisServer:
+    """Datasets loaded once and served to every client. The computations run on a pool of threads, so that the server keeps
+    answering while a large file is binned, and their results, as well as the rendered responses, are kept in a shared cache."""
+    def __init__(self, cache: LRUCache = None, store_root: str = None, workers: int = None):
+        self.cache = cache if cache is not None else LRUCache(max_entries=512)
+        self.store_root = store_root
+        self.datasets = {}
+        self.sources = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = {}
+
+    def load(self, file_path: str, target_name: str, individual_name: str = None, name: str = None, sep: str = ',', has_index: bool = False) -> Analysis:
+        """Load a result file, or return the dataset already loaded under this name when the file did not change."""
+        name = name or os.path.splitext(os.path.basename(file_path))[0]
+        fingerprint = {**file_fingerprint(file_path), 'target': target_name, 'individual': individual_name, 'sep': sep, 'has_index': has_index}
+        if name in self.datasets and self.sources[name] == fingerprint:
+            return self.datasets[name]
+        # The results computed on a previous version of the file are dropped
+        self.cache.discard(lambda key: len(key) > 1 and isinstance(key[1], tuple) and key[1][:1] == (name,))
+        self.datasets[name] = Analysis.load(file_path, target_name, individual_name, sep=sep, has_index=has_index,
+                                            store_root=self.store_root, name=name, cache=self.cache)
+        self.sources[name] = fingerprint
+        return self.datasets[name]
+
+    def describe(self, name: str) -> dict:
+        analysis = self.datasets[name]
+        return {'name': name, 'file': self.sources[name]['file_path'], 'target': analysis.target_name,
+                'individual': analysis.individual_name, 'rows': len(analysis.data), 'models': analysis.models}
+
+    async def run(self, function, *args):
+        """Run a computation on the pool of threads."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def cached(self, key, function, *args):
+        """Get a response from the cache, computing it once even when several clients ask for it at the same time."""
+        value = self.cache.get(key, self)
+        if value is not self:
+            return value
+        if key in self._pending:
+            return await asyncio.shield(self._pending[key])
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            value = await self.run(function, *args)
+            self.cache.put(key, value)
+            future.set_result(value)
+            return value
+        except Exception as error:
+            future.set_exception(error)
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+    def dataset(self, name: str) -> Analysis:
+        if name not in self.datasets:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f'Unknown dataset: {name}')
+        return self.datasets[name]
+
+    @staticmethod
+    def requested_models(analysis: Analysis, query: dict, default: list[str] = None) -> list[str]:
+        """Models of a request, default when none is given."""
+        models = query['models'][0].split(',') if 'models' in query else default
+        unknown = [model for model in models or [] if model not in analysis.models]
+        if unknown:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f'Unknown models: {", ".join(unknown)}')
+        return models
+
+    @classmethod
+    def parameters(cls, analysis: Analysis, query: dict) -> tuple[list[str], int, int]:
+        """Models, number of quantiles and bucket of a request, the models being the two first ones by default.
+        The number of quantiles goes from 1 to the number of rows, the bucket from 1 to the number of quantiles."""
+        models = cls.requested_models(analysis, query, analysis.models[:2])
+        try:
+            quantiles, bucket = int(query.get('q', ['10'])[0]), int(query.get('bucket', ['1'])[0])
+        except ValueError as error:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(error))
+        if not 1 <= quantiles <= len(analysis.data):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f'The number of quantiles must be between 1 and {len(analysis.data)}, got {quantiles}')
+        if not 1 <= bucket <= quantiles:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f'The bucket must be between 1 and {quantiles}, got {bucket}')
+        return models, quantiles, bucket
+
+    async def handle(self, method: str, target: str, body: bytes) -> tuple[HTTPStatus, str, bytes]:
+        """Answer a request, returning the status, content type and content of the response."""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split('/') if part]
+
+        if parts == ['datasets'] and method == 'POST':
+            try:
+                request = json.loads(body or b'{}')
+                arguments = (request['file'], request['target'], request.get('individual'), request.get('name'),
+                             request.get('sep', ','), bool(request.get('has_index', False)))
+            except (ValueError, KeyError) as error:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f'Expected a JSON body with the file and the target: {error}')
+            analysis = await self.run(self.load, *arguments)
+            return self.json(self.describe(analysis.name))
+        if method != 'GET':
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f'Unsupported method: {method}')
+        if parts in ([], ['datasets']):
+            return self.json({'datasets': [self.describe(name) for name in self.datasets]})
+        if parts == ['cache']:
+            return self.json({'cache': self.cache.stats(), 'timings': timings.summary()})
+        if len(parts) != 3 or parts[0] != 'datasets':
+            raise HTTPError(HTTPStatus.NOT_FOUND, f'Unknown path: {url.path}')
+
+        analysis = self.dataset(parts[1])
+        view, extension = os.path.splitext(parts[2])
+        key = ('response', analysis.key, view, extension, tuple(sorted((name, tuple(values)) for name, values in query.items())))
+        if view == 'metrics' and not extension:
+            # All the models by default, the number of quantiles and the bucket being unused
+            return self.json(await self.cached(key, analysis.metrics, self.requested_models(analysis, query)))
+        if view not in ('quantiles', 'domain', 'hull'):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f'Unknown view: {parts[2]}')
+        models, quantiles, bucket = self.parameters(analysis, query)
+        if view == 'quantiles' and not extension:
+            return self.json(await self.cached(key, analysis.quantile_stats, models, quantiles))
+        if view == 'quantiles' and extension == '.png':
+            return HTTPStatus.OK, 'image/png', await self.cached(key, render_quantiles, analysis, models, quantiles)
+        if view == 'domain' and not extension:
+            return self.json(await self.cached(key, analysis.domain, models, quantiles, bucket))
+        if view == 'domain' and extension == '.png':
+            percentage = float(query.get('percentage', ['0'])[0])
+            return HTTPStatus.OK, 'image/png', await self.cached(key, render_domain, analysis, models, quantiles, bucket, percentage)
+        if view == 'hull' and not extension:
+            percentage = float(query.get('percentage', ['80'])[0])
+            return self.json({'edges': await self.cached(key, analysis.hull, models, quantiles, bucket, percentage)})
+        raise HTTPError(HTTPStatus.NOT_FOUND, f'Unknown view: {parts[2]}')
+
+    @staticmethod
+    def json(value) -> tuple[HTTPStatus, str, bytes]:
+        return HTTPStatus.OK, 'application/json', json.dumps(to_json(value)).encode('utf-8')
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer the requests of a connection, kept open between requests as HTTP/1.1 does by default."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                try:
+                    status, content_type, content = await self.handle(method, target, body)
+                except HTTPError as error:
+                    status, content_type, content = error.status, 'application/json', json.dumps({'error': str(error)}).encode('utf-8')
+                except (KeyError, ValueError, np.linalg.LinAlgError) as error:
+                    status, content_type, content = HTTPStatus.BAD_REQUEST, 'application/json', json.dumps({'error': str(error)}).encode('utf-8')
+                except Exception as error:
+                    status, content_type, content = HTTPStatus.INTERNAL_SERVER_ERROR, 'application/json', json.dumps({'error': repr(error)}).encode('utf-8')
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                writer.write((f'HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: {content_type}\r\n'
+                              f'Content-Length: {len(content)}\r\nConnection: {"keep-alive" if keep_alive else "close"}\r\n\r\n').encode('latin-1') + content)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765):
+        server = await asyncio.start_server(self.serve_client, host, port)
+        print(f'Serving {len(self.datasets)} datasets on http://{host}:{port}')
+        async with server:
+            await server.serve_forever()
+
+def _png(figure) -> bytes:
+    content = io.BytesIO()
+    figure.savefig(content, format='png')
+    return content.getvalue()
+
+def render_quantiles(analysis: Analysis, models: list[str], quantiles: int) -> bytes:
+    """Quantile evolution plot of the errors of two models, drawn without pyplot so that no figure is left open."""
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=(10, 5))
+    ax = figure.subplots()
+    ax.axhline(y=0, color='black', linestyle='-')
+    boxes = []
+    for model, hatch, color in zip(models[:2], ['///', '\\\\\\'], ['tab:orange', 'tab:green']):
+        boxes.append(ax.bxp(analysis.box_stats(model, quantiles), positions=range(1, quantiles + 1), widths=0.8, patch_artist=True, showfliers=False,
+                            boxprops=dict(facecolor='none', hatch=hatch, edgecolor=color), medianprops=dict(color='black'))['boxes'][0])
+    ax.set_xlim(0, quantiles + 1)
+    ax.set_xticks(range(0, quantiles + 1, max(1, quantiles // 5)))
+    ax.set_xlabel('Data Quantile')
+    ax.set_ylabel('Errors')
+    ax.legend(boxes, models[:2], loc='lower right')
+    return _png(figure)
+
+def render_domain(analysis: Analysis, models: list[str], quantiles: int, bucket: int, percentage: float = 0) -> bytes:
+    """Domain evolution plot of the points of a quantile, coloured by percentile, with the convex hull of percentage of them."""
+    from matplotlib.figure import Figure
+    domain = analysis.domain(models, quantiles, bucket)
+    figure = Figure(figsize=(6, 6))
+    ax = figure.subplots()
+    scatter = ax.scatter(domain['points'][:, 0], domain['points'][:, 1], s=50, c=domain['percentiles'], cmap='Spectral', vmin=0, vmax=100)
+    ax.plot(domain['center'][0], domain['center'][1], 'x', color='black', markersize=10, alpha=0.7)
+    if percentage > 0:
+        for edge in analysis.hull(models, quantiles, bucket, percentage):
+            ax.plot(edge[:, 0], edge[:, 1], 'k-', lw=1)
+    ax.axhline(0, color='black', linewidth=1)
+    ax.axvline(0, color='black', linewidth=1)
+    ax.set_xlabel(f'Errors of {models[0]}', color='tab:orange')
+    ax.set_ylabel(f'Errors of {models[1]}', color='tab:green')
+    ax.set_title(f'Evolution of errors for quantile {bucket}')
+    figure.colorbar(scatter, ax=ax).set_label('Percentile')
+    return _png(figure)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='result files loaded at start, named after the file')
+    parser.add_argument('--target', help='target column of the files')
+    parser.add_argument('--individual', default=None, help='individual column of the files, none by default')
+    parser.add_argument('--sep', default=',')
+    parser.add_argument('--has-index', action='store_true', help='the first column of the files is an index')
+    parser.add_argument('--stores', default=None, help='directory of the column stores built by DEPlot, read instead of the files when up to date')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None, help='number of threads computing the results')
+    parser.add_argument('--cache-entries', type=int, default=512)
+    parser.add_argument('--cache-mb', type=float, default=None, help='memory limit of the cache in MB, none by default')
+    args = parser.parse_args()
+    if args.files and args.target is None:
+        parser.error('--target is required to load files')
+
+    server = AnalysisServer(LRUCache(args.cache_entries, int(args.cache_mb * 2**20) if args.cache_mb else None), args.stores, args.workers)
+    for file_path in args.files:
+        print(f'Loading {file_path}')
+        server.load(file_path, args.target, args.individual, sep=args.sep, has_index=args.has_index)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
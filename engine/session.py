@@ -0,0 +1,86 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .loading import file_fingerprint, store_path_for
+
+SESSION_VERSION = 1
+
+class Session:
+    """Snapshot of a session on a file: the state of the interface (models, filters, number of quantiles, convex hull percentage,
+    display mode...) and the arrays computed for it (filtered rows, sorted orders, bucket edges, distances...).
+    Both are saved in a single uncompressed .npz file, next to the fingerprint of the file they were computed on. The columns
+    loaded from a CSV file can be saved with them (store_frame), so that reopening the file restores the view without parsing,
+    sorting nor computing anything again; files opened as a column store are read from the store instead.
+    The arrays are only given back while the file is unchanged, the state of the interface is always kept."""
+    def __init__(self, state: dict, arrays: dict[str, np.ndarray] = None, source: dict = None):
+        self.state = state
+        self.arrays = arrays or {}
+        self.source = source
+
+    @property
+    def computed(self) -> bool:
+        """Whether the computed arrays can be used, the file being the one they were computed on."""
+        return self.source is not None
+
+    @classmethod
+    def open(cls, file_path: str, root: str):
+        """Open the session saved for a file, or return None when there is none or when it was saved by another version."""
+        try:
+            with np.load(store_path_for(file_path, root) + '.npz', allow_pickle=False) as content:
+                arrays = {name: content[name] for name in content.files}
+            header = json.loads(arrays.pop('__session__').tobytes().decode('utf-8'))
+        except (OSError, ValueError, KeyError):
+            return None
+        if header.get('version') != SESSION_VERSION:
+            return None
+        if header['source'] is None or header['source'] != file_fingerprint(file_path):
+            return cls(header['state'])
+        return cls(header['state'], arrays, header['source'])
+
+    def save(self, file_path: str, root: str):
+        """Save the session of a file inside the root directory of the sessions. The arrays are only saved with a source,
+        the fingerprint of the version of the file they were computed on."""
+        os.makedirs(root, exist_ok=True)
+        header = json.dumps({'version': SESSION_VERSION, 'state': self.state, 'source': self.source}).encode('utf-8')
+        arrays = self.arrays if self.source is not None else {}
+        path = store_path_for(file_path, root) + '.npz'
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, __session__=np.frombuffer(header, dtype=np.uint8), **arrays)
+        os.replace(path + '.tmp', path)
+
+    def store_frame(self, data: pd.DataFrame):
+        """Save the columns of the data and its index with the arrays. Columns that numpy cannot store without pickling
+        (text, categories) are saved as category codes and categories, and converted back to their type by frame."""
+        columns = []
+        for key, series in [('frame.index', data.index.to_series()), *((f'frame.{position}', data[col]) for position, col in enumerate(data.columns))]:
+            values = series.to_numpy()
+            if isinstance(series.dtype, pd.CategoricalDtype) or values.dtype == object:
+                categorical = series.astype('category').array
+                categories = categorical.categories.to_numpy()
+                self.arrays[f'{key}.codes'] = categorical.codes
+                self.arrays[f'{key}.categories'] = categories.astype(str) if categories.dtype == object else categories
+            else:
+                self.arrays[key] = values
+            columns.append([key, str(series.dtype)])
+        self.state['frame'] = {'index': data.index.name, 'names': list(data.columns), 'columns': columns}
+
+    def frame(self) -> pd.DataFrame:
+        """Data saved with store_frame, None when it was not saved or when the file changed since."""
+        if not self.computed or 'frame' not in self.state:
+            return None
+        series = []
+        for key, dtype in self.state['frame']['columns']:
+            if key in self.arrays:
+                series.append(pd.Series(self.arrays[key]))
+                continue
+            values = pd.Series(pd.Categorical.from_codes(self.arrays[f'{key}.codes'], self.arrays[f'{key}.categories']))
+            series.append(values if dtype == 'category' else values.astype(dtype))
+        index = pd.Index(series[0], name=self.state['frame']['index'])
+        return pd.DataFrame({name: values.set_axis(index) for name, values in zip(self.state['frame']['names'], series[1:])}, index=index)
+
+    def prefixed(self, prefix: str) -> dict[str, np.ndarray]:
+        """Arrays saved under a prefix (prefix.name), without the prefix."""
+        return {name[len(prefix) + 1:]: array for name, array in self.arrays.items() if name.startswith(prefix + '.')}
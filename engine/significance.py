@@ -0,0 +1,156 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+TESTS = ('wilcoxon', 'dm')
+LOSSES = ('absolute', 'squared')
+CORRECTIONS = ('holm', 'fdr_bh', 'bonferroni', 'none')
+
+def loss_differential(errors_1: np.ndarray, errors_2: np.ndarray, loss: str = 'absolute') -> np.ndarray:
+    """Compute the loss differential between two models, negative values meaning that the first model is better."""
+    errors_1 = np.asarray(errors_1, dtype=np.float64)
+    errors_2 = np.asarray(errors_2, dtype=np.float64)
+    if loss == 'absolute':
+        return np.abs(errors_1) - np.abs(errors_2)
+    if loss == 'squared':
+        return errors_1 ** 2 - errors_2 ** 2
+    raise ValueError(f"Unknown loss '{loss}', expected one of {LOSSES}")
+
+def _wilcoxon(d: np.ndarray, labels: np.ndarray, n_buckets: int):
+    """Wilcoxon signed-rank test run on every bucket at once with the normal approximation.
+    Zero differences are discarded and tied absolute differences get their average rank."""
+    keep = d != 0
+    d = d[keep]
+    labels = labels[keep]
+    abs_d = np.abs(d)
+
+    order = np.lexsort((abs_d, labels))
+    d, labels, abs_d = d[order], labels[order], abs_d[order]
+    n = np.bincount(labels, minlength=n_buckets).astype(np.float64)
+
+    # Average ranks of tied values, restarting at 1 in every bucket
+    positions = np.arange(len(d))
+    new_group = np.ones(len(d), dtype=bool)
+    new_group[1:] = (labels[1:] != labels[:-1]) | (abs_d[1:] != abs_d[:-1])
+    group_first = positions[new_group]
+    group_last = np.append(group_first[1:] - 1, len(d) - 1)
+    group_ids = np.cumsum(new_group) - 1
+    bucket_start = np.searchsorted(labels, labels, side='left')
+    ranks = (group_first[group_ids] + group_last[group_ids]) / 2 - bucket_start + 1
+
+    w_plus = np.bincount(labels, weights=ranks * (d > 0), minlength=n_buckets)
+    tie_sizes = (group_last - group_first + 1).astype(np.float64)
+    tie_term = np.bincount(labels[group_first], weights=tie_sizes ** 3 - tie_sizes, minlength=n_buckets)
+
+    mean = n * (n + 1) / 4
+    var = n * (n + 1) * (2 * n + 1) / 24 - tie_term / 48
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(var > 0, (w_plus - mean) / np.sqrt(var), np.nan)
+    p_values = 2 * stats.norm.sf(np.abs(z))
+    return z, p_values
+
+def _diebold_mariano(d: np.ndarray, labels: np.ndarray, n_buckets: int):
+    """Diebold-Mariano test (one step horizon) with the Harvey-Leybourne-Newbold small sample correction, run on every bucket at once."""
+    n = np.bincount(labels, minlength=n_buckets).astype(np.float64)
+    sums = np.bincount(labels, weights=d, minlength=n_buckets)
+    sums_sq = np.bincount(labels, weights=d ** 2, minlength=n_buckets)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = sums / n
+        gamma0 = sums_sq / n - mean ** 2
+        dm = mean / np.sqrt(gamma0 / n)
+        dm *= np.sqrt((n - 1) / n)
+        dm = np.where((n > 1) & (gamma0 > 0), dm, np.nan)
+    p_values = 2 * stats.t.sf(np.abs(dm), df=np.maximum(n - 1, 1))
+    return dm, p_values
+
+def adjust_pvalues(p_values: np.ndarray, method: str = 'holm') -> np.ndarray:
+    """Correct p-values for multiple testing (Holm, Benjamini-Hochberg or Bonferroni). NaN values are left untouched."""
+    p_values = np.asarray(p_values, dtype=np.float64)
+    adjusted = np.full_like(p_values, np.nan)
+    valid = ~np.isnan(p_values)
+    p = p_values[valid]
+    m = len(p)
+    if m == 0 or method == 'none':
+        adjusted[valid] = p
+        return adjusted
+
+    if method == 'bonferroni':
+        result = np.minimum(p * m, 1)
+    elif method == 'holm':
+        order = np.argsort(p)
+        stepped = np.maximum.accumulate(p[order] * (m - np.arange(m)))
+        result = np.empty(m)
+        result[order] = np.minimum(stepped, 1)
+    elif method == 'fdr_bh':
+        order = np.argsort(p)[::-1]
+        stepped = np.minimum.accumulate(p[order] * m / np.arange(m, 0, -1))
+        result = np.empty(m)
+        result[order] = np.minimum(stepped, 1)
+    else:
+        raise ValueError(f"Unknown correction '{method}', expected one of {CORRECTIONS}")
+    adjusted[valid] = result
+    return adjusted
+
+def _pair_table(errors_1, errors_2, labels, quantiles, test, loss):
+    """Run the paired test of one pair of models on every quantile bucket."""
+    d = loss_differential(errors_1, errors_2, loss)
+    buckets = np.asarray(labels, dtype=np.int64) - 1
+    valid = ~np.isnan(d) & (buckets >= 0)
+    d, buckets = d[valid], buckets[valid]
+
+    if test == 'wilcoxon':
+        statistic, p_values = _wilcoxon(d, buckets, quantiles)
+    elif test == 'dm':
+        statistic, p_values = _diebold_mariano(d, buckets, quantiles)
+    else:
+        raise ValueError(f"Unknown test '{test}', expected one of {TESTS}")
+
+    n = np.bincount(buckets, minlength=quantiles)
+    with np.errstate(invalid='ignore'):
+        mean_diff = np.bincount(buckets, weights=d, minlength=quantiles) / n
+    return pd.DataFrame({
+        'quantile': np.arange(1, quantiles + 1),
+        'n': n,
+        'mean_loss_diff': mean_diff,
+        'statistic': statistic,
+        'p_value': p_values,
+    })
+
+def paired_tests(errors_1: np.ndarray, errors_2: np.ndarray, labels: np.ndarray, quantiles: int,
+                 test: str = 'wilcoxon', loss: str = 'absolute', correction: str = 'holm', alpha: float = 0.05) -> pd.DataFrame:
+    """Compare two models inside every quantile bucket with a paired test.
+    labels holds the 1-based quantile of each row, as returned by quantile_labels.
+    A negative mean loss differential means that the first model is better on the bucket,
+    the better column is 1 or 2 for a significant win of the first or second model and 0 otherwise."""
+    table = _pair_table(errors_1, errors_2, labels, quantiles, test, loss)
+    return _finalize(table, correction, alpha)
+
+def paired_tests_batch(errors: dict[str, np.ndarray], labels: np.ndarray, quantiles: int, pairs: list[tuple[str, str]] = None,
+                       test: str = 'wilcoxon', loss: str = 'absolute', correction: str = 'holm', alpha: float = 0.05,
+                       max_workers: int = None) -> pd.DataFrame:
+    """Run the paired tests on several pairs of models in a worker pool.
+    Every pair is vectorized over the buckets and the correction is applied to the whole family of tests."""
+    if pairs is None:
+        pairs = list(combinations(errors.keys(), 2))
+
+    def run(pair):
+        table = _pair_table(errors[pair[0]], errors[pair[1]], labels, quantiles, test, loss)
+        table.insert(0, 'model_2', pair[1])
+        table.insert(0, 'model_1', pair[0])
+        return table
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        tables = list(executor.map(run, pairs))
+    if not tables:
+        return pd.DataFrame(columns=['model_1', 'model_2', 'quantile', 'n', 'mean_loss_diff', 'statistic', 'p_value', 'p_adjusted', 'significant', 'better'])
+    return _finalize(pd.concat(tables, ignore_index=True), correction, alpha)
+
+def _finalize(table: pd.DataFrame, correction: str, alpha: float) -> pd.DataFrame:
+    """Add the corrected p-values and the winning model of every test."""
+    table['p_adjusted'] = adjust_pvalues(table['p_value'].to_numpy(), correction)
+    table['significant'] = table['p_adjusted'] < alpha
+    table['better'] = np.where(~table['significant'], 0, np.where(table['mean_loss_diff'] < 0, 1, 2))
+    return table
@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .dataset import split_by_label
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin, Lang and Liberty, 2016) holding at most about 3k values whatever the number of rows.
+    Values are kept in levels of compactors, a value of level h standing for 2**h rows. When a level is full it is sorted
+    and one value out of two, starting at a random offset, is promoted to the next level.
+    The rank of a quantile returned by the sketch is off by at most about 1.7 / k of the number of rows with a probability of 99%
+    (1% for the default k=200), whatever the distribution, the order of the rows and the way the sketches are merged.
+    The minimum and maximum are exact."""
+    def __init__(self, k: int = 200, seed: int = None):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        """Number of values a level can hold, the top level holding k values and the lower ones geometrically less."""
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        """Compact the lowest full level until the sketch holds no more values than the sum of the capacities."""
+        while self.size > sum(self._capacity(level) for level in range(len(self.levels))):
+            level = next(level for level, items in enumerate(self.levels) if len(items) >= self._capacity(level))
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            odd = len(items) % 2
+            self.levels[level] = items[:odd]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[odd + self._rng.integers(2)::2]])
+
+    def update(self, values: np.ndarray):
+        """Add values to the sketch, missing values being ignored."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch'):
+        """Add the values summarized by another sketch to this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Return the approximate quantiles q (between 0 and 1) of the values, NaN for an empty sketch."""
+        q = np.asarray(q, dtype=np.float64)
+        if self.n == 0:
+            return np.full(q.shape, np.nan)[()]
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, cumulated = values[order], np.cumsum(weights[order])
+        indices = np.clip(np.searchsorted(cumulated, q * cumulated[-1], side='left'), 0, len(values) - 1)
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, values[indices]))
+        return result[()]
+
+    @property
+    def size(self) -> int:
+        """Number of values stored by the sketch."""
+        return sum(len(items) for items in self.levels)
+
+def boxplot_stats(sketch: KLLSketch, whis: float = 1.5) -> dict:
+    """Build the statistics drawn by Axes.bxp from a sketch.
+    Whiskers end at 1.5 IQR from the box, or at the exact minimum and maximum when they are closer;
+    fliers are not kept by the sketch."""
+    q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    return {'med': median, 'q1': q1, 'q3': q3, 'whislo': max(sketch.min, q1 - whis * iqr), 'whishi': min(sketch.max, q3 + whis * iqr),
+            'fliers': [], 'n': sketch.n}
+
+def _chunks(n_rows: int, chunk_size: int) -> list[slice]:
+    return [slice(start, start + chunk_size) for start in range(0, n_rows, chunk_size)]
+
+def _merge_all(sketches: list[KLLSketch]) -> KLLSketch:
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    return merged
+
+def sketch_buckets(keys: np.ndarray, errors: list[np.ndarray], quantiles: int, k: int = 200, chunk_size: int = 1_000_000,
+                   max_workers: int = None, seed: int = 0) -> tuple[np.ndarray, list[list[KLLSketch]]]:
+    """Approximate version of the quantile evolution buckets, with constant memory per bucket.
+    keys is the value ranked to build the buckets (the target, or the time step within the individual) and errors holds
+    one array per model. The rows are read in chunks in a worker pool: a first pass sketches the keys to find the
+    bucket edges, a second pass sketches the errors of every model on every bucket.
+    Returns the edges of the buckets and the sketches of every (model, bucket), rows of a bucket being those whose key
+    is in (edges[b], edges[b + 1]] as done by pd.qcut. The arrays can be memory-mapped columns, only one chunk
+    per worker being read at a time."""
+    chunks = _chunks(len(keys), chunk_size)
+
+    def sketch_keys(index_chunk):
+        index, chunk = index_chunk
+        return KLLSketch(k, seed + index).update(keys[chunk])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        key_sketch = _merge_all(list(executor.map(sketch_keys, enumerate(chunks))))
+        edges = np.atleast_1d(key_sketch.quantile(np.linspace(0, 1, quantiles + 1)))
+
+        def sketch_errors(index_chunk):
+            index, chunk = index_chunk
+            chunk_keys = np.asarray(keys[chunk], dtype=np.float64)
+            labels = np.searchsorted(edges[1:-1], chunk_keys, side='left') + 1
+            labels[np.isnan(chunk_keys)] = 0
+            result = []
+            for model_errors in errors:
+                buckets = split_by_label(np.asarray(model_errors[chunk]), labels, quantiles)
+                result.append([KLLSketch(k, seed + index).update(values) for values in buckets])
+            return result
+
+        partial = list(executor.map(sketch_errors, enumerate(chunks)))
+    bucket_sketches = [[_merge_all([part[model][bucket] for part in partial]) for bucket in range(quantiles)] for model in range(len(errors))]
+    return edges, bucket_sketches
@@ -0,0 +1,75 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+class StageTimings:
+    """Durations of the stages of the interactions (loading, filtering, binning, distances, drawing...), kept in a ring buffer
+    of the last capacity records. Every record has a category, 'compute' or 'render', so that a slow interaction can be
+    attributed to the computations or to the drawing of the canvases. Stages can be nested."""
+    def __init__(self, capacity: int = 10_000):
+        self.records = deque(maxlen=capacity)
+        self.enabled = True
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, category: str = 'compute'):
+        """Time the code run inside the with block as a stage."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.records.append((name, category, start - self._origin, time.perf_counter() - start, threading.get_ident()))
+
+    def timed(self, name: str = None, category: str = 'compute'):
+        """Decorator timing every call of a function as a stage, named after the function by default."""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name or function.__name__, category):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def instrument_canvas(self, canvas, name: str):
+        """Time the draws of a matplotlib canvas, including the idle draws, as render stages."""
+        draw = canvas.draw
+
+        def timed_draw(*args, **kwargs):
+            with self.stage(name, 'render'):
+                return draw(*args, **kwargs)
+        canvas.draw = timed_draw
+        return canvas
+
+    def clear(self):
+        self.records.clear()
+
+    def summary(self) -> dict[str, dict]:
+        """Number of calls and last, mean and maximum durations (in milliseconds) of every stage, in order of first record."""
+        summary = {}
+        for name, category, _, duration, _ in list(self.records):
+            stats = summary.setdefault(name, {'category': category, 'count': 0, 'total': 0.0, 'max': 0.0})
+            stats['count'] += 1
+            stats['total'] += duration * 1000
+            stats['max'] = max(stats['max'], duration * 1000)
+            stats['last'] = duration * 1000
+        for stats in summary.values():
+            stats['mean'] = stats.pop('total') / stats['count']
+        return summary
+
+    def export_chrome_trace(self, file_path: str):
+        """Write the records as a Chrome trace (JSON trace event format), to open in chrome://tracing or Perfetto."""
+        pid = os.getpid()
+        events = [{'name': name, 'cat': category, 'ph': 'X', 'ts': start * 1e6, 'dur': duration * 1e6, 'pid': pid, 'tid': tid}
+                  for name, category, start, duration, tid in list(self.records)]
+        with open(file_path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+# Timings of the application, shared by the interface and the engine
+timings = StageTimings()
@@ -0,0 +1,66 @@
+import os
+import queue
+import threading
+
+from .loading import CSVSource, file_fingerprint
+
+class FileWatcher(threading.Thread):
+    """Follow a result file to which rows are appended, as done by evaluation jobs scoring new batches.
+    Every interval seconds the size of the file is checked and only the bytes appended since offset are read,
+    up to the last complete line. The parsed rows are put in the rows queue with the fingerprint of the file at that time,
+    the interface applies them when it polls. error is set, and the watch stops, when the file is truncated or rewritten."""
+    def __init__(self, source: CSVSource, offset: int, columns: list[str] = None, interval: float = 1.0, max_bytes: int = 64 * 2**20):
+        super().__init__(daemon=True)
+        self.source = source
+        self.offset = offset
+        self.columns = columns
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.rows = queue.Queue()
+        self.error = None
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Stop the watch before the next check of the file."""
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._check()
+            except Exception as e:
+                self.error = e
+                return
+
+    def _check(self):
+        """Read the complete lines appended since the last check, by blocks of at most max_bytes."""
+        while not self.stopped:
+            size = os.path.getsize(self.source.file_path)
+            if size < self.offset:
+                raise ValueError(f'{os.path.basename(self.source.file_path)} is shorter than the rows already read, it was rewritten.')
+            if size == self.offset:
+                return
+            with open(self.source.file_path, 'rb') as f:
+                f.seek(self.offset)
+                content = f.read(min(size - self.offset, self.max_bytes))
+            end = content.rfind(b'\n') + 1
+            if end == 0:
+                # The last line is still being written
+                return
+            fingerprint = file_fingerprint(self.source.file_path)
+            chunk = self.source.parse(content[:end], self.columns)
+            self.offset += end
+            self.rows.put((chunk, self.offset, fingerprint))
+
+    def pending(self) -> list:
+        """Take the chunks read since the last call, in file order."""
+        chunks = []
+        while True:
+            try:
+                chunks.append(self.rows.get_nowait())
+            except queue.Empty:
+                return chunks
@@ -0,0 +1,108 @@
+"""Check the vectorized kernels of the engine against the reference they replace, on random data with ties and NaN."""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from engine import BucketIndex, adjust_pvalues, join_rows, pairwise_win_rates
+from engine.significance import _wilcoxon
+
+SEEDS = range(5)
+
+def _values(rng: np.random.Generator, n: int, missing: float = 0.1) -> np.ndarray:
+    """Random values rounded to get ties, a fraction of them missing."""
+    values = np.round(rng.normal(size=n), 1)
+    values[rng.random(n) < missing] = np.nan
+    return values
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('quantiles', [1, 4, 10])
+def test_bucket_labels_match_qcut(seed, quantiles):
+    rng = np.random.default_rng(seed)
+    keys = _values(rng, 500)
+    expected = pd.qcut(pd.Series(keys).rank(method='first'), quantiles, labels=False)
+    expected = np.nan_to_num(expected.to_numpy(dtype=np.float64), nan=-1).astype(np.int64) + 1
+    np.testing.assert_array_equal(BucketIndex(keys).labels(quantiles), expected)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_extended_bucket_labels_match_new_index(seed):
+    rng = np.random.default_rng(seed)
+    keys = _values(rng, 400)
+    index = BucketIndex(keys[:300])
+    index.extend(keys[300:])
+    np.testing.assert_array_equal(index.labels(7), BucketIndex(keys).labels(7))
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_wilcoxon_matches_scipy(seed):
+    rng = np.random.default_rng(seed)
+    n_buckets = 4
+    d = np.round(rng.normal(0.1, 1, size=400), 1)
+    labels = rng.integers(0, n_buckets, size=len(d))
+    _, p_values = _wilcoxon(d, labels, n_buckets)
+    for bucket in range(n_buckets):
+        expected = stats.wilcoxon(d[labels == bucket], zero_method='wilcox', method='approx', correction=False).pvalue
+        assert p_values[bucket] == pytest.approx(expected, rel=1e-9)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_hash_and_merge_joins_agree(seed):
+    rng = np.random.default_rng(seed)
+    def keys(n):
+        # Unique pairs of keys, some of them missing
+        pairs = rng.permutation(60 * 10)[:n]
+        first, second = (pairs // 10).astype(np.float64), (pairs % 10).astype(np.float64)
+        first[rng.random(n) < 0.05] = np.nan
+        return [first, second]
+    left, right = keys(300), keys(250)
+    left_hash, right_hash = join_rows(left, right, 'hash')
+    left_merge, right_merge = join_rows(left, right, 'merge')
+    np.testing.assert_array_equal(left_hash, left_merge)
+    np.testing.assert_array_equal(right_hash, right_merge)
+
+    expected = pd.merge(pd.DataFrame({'a': left[0], 'b': left[1], 'left': np.arange(300)}).dropna(),
+                        pd.DataFrame({'a': right[0], 'b': right[1], 'right': np.arange(250)}).dropna(), on=['a', 'b'])
+    expected = expected.sort_values('left')
+    np.testing.assert_array_equal(left_hash, expected['left'])
+    np.testing.assert_array_equal(right_hash, expected['right'])
+
+def _naive_adjust(p_values: np.ndarray, method: str) -> np.ndarray:
+    """Holm and Benjamini-Hochberg corrections written step by step from their definition."""
+    valid = np.flatnonzero(~np.isnan(p_values))
+    ranked = sorted(valid, key=lambda i: p_values[i])
+    m = len(ranked)
+    adjusted = np.full(len(p_values), np.nan)
+    if method == 'holm':
+        running = 0
+        for k, i in enumerate(ranked):
+            running = max(running, min(1, (m - k) * p_values[i]))
+            adjusted[i] = running
+    else:
+        running = 1
+        for k in range(m - 1, -1, -1):
+            running = min(running, m * p_values[ranked[k]] / (k + 1))
+            adjusted[ranked[k]] = running
+    return adjusted
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('method', ['holm', 'fdr_bh'])
+def test_adjust_pvalues_match_definition(seed, method):
+    rng = np.random.default_rng(seed)
+    p_values = np.round(rng.random(50) ** 3, 2)
+    p_values[rng.random(50) < 0.1] = np.nan
+    np.testing.assert_allclose(adjust_pvalues(p_values, method), _naive_adjust(p_values, method), rtol=1e-12)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_pairwise_win_rates_match_loop(seed):
+    rng = np.random.default_rng(seed)
+    quantiles, n_models = 3, 4
+    errors = np.stack([_values(rng, 300, missing=0.2) for _ in range(n_models)], axis=1)
+    labels = rng.integers(0, quantiles + 1, size=300)
+    counts, win_rates, median_diff = pairwise_win_rates(errors, labels, quantiles, chunk_size=64)
+    abs_errors = np.abs(errors)
+    for b in range(quantiles):
+        rows = abs_errors[labels == b + 1]
+        assert counts[b] == len(rows)
+        for i in range(n_models):
+            for j in range(n_models):
+                both = ~np.isnan(rows[:, i]) & ~np.isnan(rows[:, j])
+                assert win_rates[b, i, j] == pytest.approx(np.mean(rows[both, i] < rows[both, j]))
+                assert median_diff[b, i, j] == pytest.approx(np.median(rows[both, i] - rows[both, j]))